@@ -0,0 +1,378 @@
+"""
+Database workload benchmark for utils/database.py.
+
+Builds synthetic guild histories (a few large guilds and many small ones,
+realistic event mixes, some users with long warning records) and, as the
+tables grow through each scale point, measures:
+
+- per-call insert latency and throughput of log_server_event and add_warning,
+  exactly as the bot calls them (a connection and a commit per call)
+- batched insert throughput of server_logs rows at several batch sizes
+- query latency percentiles of get_warnings, get_warning_count,
+  get_server_logs and get_server_logs_page (unfiltered, by type, by user)
+- database file size and bytes per row
+- and, at the largest scale, concurrent writer threads calling
+  log_server_event: throughput, latency and writes lost to lock errors
+
+Every combination of journal mode and index set gets a fresh database
+file. Index sets: `current` (what init_database creates), `minimal` (one
+guild/timestamp index per table) and `none` (primary keys only). Journal
+modes are the ones that persist in the file and so apply to the bot's own
+connections: delete and wal.
+
+    python benchmarks/db_workload.py                               # quick run
+    python benchmarks/db_workload.py --scales 100000,1000000,3000000 --json db.json
+    python benchmarks/db_workload.py --journal-modes wal --index-sets current,none
+
+The JSON report (--json) is meant to be diffed between storage-layer
+changes; the same numbers are printed as tables.
+"""
+import os
+import sys
+import json
+import time
+import random
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPORT_SCHEMA = 'db_workload/1'
+
+# Event mix of a typical server's log
+EVENT_TYPES = [('message_deleted', 40), ('message_edited', 35), ('member_joined', 10), ('member_left', 8),
+               ('spam_detected', 5), ('inappropriate_content', 2)]
+WARNING_REASONS = ["spam", "being rude", "off-topic in #general", "posting links", "caps lock abuse",
+                   "ignoring the rules after being asked twice", "self-promotion"]
+WORDS = ("the a game tonight link match lol anyone server voice music play queue update rules help "
+         "channel meme stream clip raid event".split())
+
+# Indexes each index set drops from what init_database creates
+INDEX_SETS = {
+    'current': [],
+    'minimal': ['idx_server_logs_guild_event_ts', 'idx_server_logs_guild_user_ts',
+                'idx_server_logs_guild_channel_ts', 'idx_warnings_active_ts'],
+    'none': ['idx_server_logs_guild_ts', 'idx_server_logs_guild_event_ts', 'idx_server_logs_guild_user_ts',
+             'idx_server_logs_guild_channel_ts', 'idx_warnings_guild_user_ts', 'idx_warnings_active_ts'],
+}
+JOURNAL_MODES = ('delete', 'wal')
+
+class Workload:
+    """Synthetic guilds: sizes follow a power law, so a few guilds hold most of the history"""
+
+    def __init__(self, guilds, seed):
+        self.rng = random.Random(seed)
+        self.guilds = []
+        for index in range(guilds):
+            guild_id = 1_000_000 + index
+            members = max(5, int(20_000 / (index + 1) ** 1.1))
+            channels = max(3, members // 400)
+            self.guilds.append((guild_id, members, channels))
+        self.weights = [members for _, members, _ in self.guilds]
+        self.event_names = [name for name, _ in EVENT_TYPES]
+        self.event_weights = [weight for _, weight in EVENT_TYPES]
+        self.now = datetime(2025, 1, 1)
+
+    def guild(self):
+        return self.rng.choices(self.guilds, self.weights)[0]
+
+    def user(self, guild):
+        guild_id, members, _ = guild
+        # Activity is skewed towards a core of regulars
+        return guild_id * 100_000 + int(members * self.rng.random() ** 3)
+
+    def description(self, event_type, channel_id):
+        text = ' '.join(self.rng.choice(WORDS) for _ in range(self.rng.randint(3, 25)))
+        if event_type == 'message_deleted':
+            return f"Message deleted in #chat-{channel_id % 100}: {text[:100]}..."
+        if event_type == 'message_edited':
+            return f"Message edited in #chat-{channel_id % 100}"
+        return f"user ({channel_id}) {event_type.replace('_', ' ')}: {text[:40]}"
+
+    def log_row(self, timestamp):
+        guild = self.guild()
+        guild_id, _, channels = guild
+        event_type = self.rng.choices(self.event_names, self.event_weights)[0]
+        channel_id = guild_id * 1_000 + self.rng.randrange(channels)
+        return (guild_id, event_type, self.user(guild), channel_id, self.description(event_type, channel_id),
+                timestamp)
+
+    def warning_row(self, timestamp):
+        guild = self.guild()
+        return (self.user(guild), guild[0], guild[0] * 100_000, self.rng.choice(WARNING_REASONS), timestamp)
+
+    def timestamps(self, count, days=90):
+        """count ascending timestamps spread over the last `days` days"""
+        start = self.now - timedelta(days=days)
+        step = days * 86_400 / max(count, 1)
+        return [(start + timedelta(seconds=index * step)).strftime('%Y-%m-%d %H:%M:%S') for index in range(count)]
+
+def _summary(values, seconds=None):
+    values = sorted(values)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+    summary = {
+        'count': len(values),
+        'p50_ms': pick(0.50),
+        'p95_ms': pick(0.95),
+        'p99_ms': pick(0.99),
+        'max_ms': values[-1] * 1000 if values else 0.0,
+    }
+    if seconds:
+        summary['ops_per_sec'] = len(values) / seconds
+    return summary
+
+def _timed_calls(func, argument_lists):
+    durations = []
+    started = time.perf_counter()
+    for args in argument_lists:
+        start = time.perf_counter()
+        func(*args)
+        durations.append(time.perf_counter() - start)
+    return durations, time.perf_counter() - started
+
+def _file_bytes(path):
+    return sum(os.path.getsize(path + suffix) for suffix in ('', '-wal') if os.path.exists(path + suffix))
+
+def _table_rows(path, table):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+    finally:
+        conn.close()
+
+def _seed(path, workload, logs, warnings):
+    """Bulk-load history (10k-row transactions) - fast enough for millions of rows"""
+    conn = sqlite3.connect(path)
+    try:
+        for offset in range(0, logs, 10_000):
+            stamps = workload.timestamps(min(10_000, logs - offset))
+            conn.executemany('''INSERT INTO server_logs (guild_id, event_type, user_id, channel_id, description, timestamp)
+                                VALUES (?, ?, ?, ?, ?, ?)''', [workload.log_row(stamp) for stamp in stamps])
+            conn.commit()
+        rows = [workload.warning_row(stamp) for stamp in workload.timestamps(warnings)]
+        conn.executemany('''INSERT INTO warnings (user_id, guild_id, moderator_id, reason, timestamp)
+                            VALUES (?, ?, ?, ?, ?)''', rows)
+        conn.executemany('''INSERT INTO warning_counts (guild_id, user_id, active_count, total_count)
+                            VALUES (?, ?, 1, 1)
+                            ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                                active_count = active_count + 1, total_count = total_count + 1''',
+                         [(guild_id, user_id) for user_id, guild_id, _, _, _ in rows])
+        conn.commit()
+    finally:
+        conn.close()
+
+def _batched_inserts(path, workload, batch_sizes, rows_per_size):
+    """server_logs insert throughput when rows are written batch_size per transaction"""
+    results = {}
+    for batch_size in batch_sizes:
+        total = max(batch_size, rows_per_size // batch_size * batch_size)
+        stamps = workload.timestamps(total, days=1)
+        rows = [workload.log_row(stamp) for stamp in stamps]
+        durations = []
+        started = time.perf_counter()
+        for offset in range(0, total, batch_size):
+            start = time.perf_counter()
+            conn = sqlite3.connect(path)
+            conn.executemany('''INSERT INTO server_logs (guild_id, event_type, user_id, channel_id, description, timestamp)
+                                VALUES (?, ?, ?, ?, ?, ?)''', rows[offset:offset + batch_size])
+            conn.commit()
+            conn.close()
+            durations.append(time.perf_counter() - start)
+        elapsed = time.perf_counter() - started
+        results[str(batch_size)] = {
+            'rows': total,
+            'rows_per_sec': total / elapsed,
+            'batch_latency': _summary(durations),
+        }
+    return results
+
+def _queries(database, workload, count):
+    rng = workload.rng
+    users = [(workload.user(guild), guild[0]) for guild in (workload.guild() for _ in range(count))]
+    guilds = [(workload.guild()[0],) for _ in range(count)]
+    event_types = [(workload.guild()[0], rng.choices(workload.event_names, workload.event_weights)[0])
+                   for _ in range(count)]
+    results = {}
+    for name, func, argument_lists in (
+        ('get_warnings', database.get_warnings, users),
+        ('get_warning_count', database.get_warning_count, users),
+        ('get_server_logs', database.get_server_logs, guilds),
+        ('get_server_logs_page', database.get_server_logs_page, guilds),
+        ('get_server_logs_page_by_type', lambda guild_id, event_type: database.get_server_logs_page(
+            guild_id, event_type=event_type), event_types),
+        ('get_server_logs_page_by_user', lambda user_id, guild_id: database.get_server_logs_page(
+            guild_id, user_id=user_id), users),
+    ):
+        durations, elapsed = _timed_calls(func, argument_lists)
+        results[name] = _summary(durations, elapsed)
+    return results
+
+def _concurrent_writers(database, path, workload, threads, writes_per_thread):
+    before = _table_rows(path, 'server_logs')
+    argument_lists = [[workload.log_row(None)[:5] for _ in range(writes_per_thread)] for _ in range(threads)]
+    durations = []
+    lock = threading.Lock()
+
+    def writer(rows):
+        local = []
+        for row in rows:
+            start = time.perf_counter()
+            database.log_server_event(*row)
+            local.append(time.perf_counter() - start)
+        with lock:
+            durations.extend(local)
+
+    workers = [threading.Thread(target=writer, args=(rows,)) for rows in argument_lists]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    written = _table_rows(path, 'server_logs') - before
+    return {
+        'threads': threads,
+        'writes': threads * writes_per_thread,
+        'lost_writes': threads * writes_per_thread - written,  # log_server_event swallows "database is locked"
+        'latency': _summary(durations, elapsed),
+    }
+
+def run_config(journal_mode, index_set, args, workdir):
+    from utils import database
+
+    path = os.path.join(workdir, f"bench-{journal_mode}-{index_set}.db")
+    os.environ['DATABASE_PATH'] = path
+    database.init_database()
+    conn = sqlite3.connect(path)
+    conn.execute(f'PRAGMA journal_mode = {journal_mode}')
+    for index in INDEX_SETS[index_set]:
+        conn.execute(f'DROP INDEX IF EXISTS {index}')
+    conn.commit()
+    conn.close()
+
+    workload = Workload(args.guilds, args.seed)
+    points = []
+    seeded = 0
+    for scale in args.scales:
+        # Warnings are rare next to log events. Rows written by the measurements
+        # themselves stay too, so 'rows' in the report is a little above the scale.
+        _seed(path, workload, scale - seeded, max(1, (scale - seeded) // 100))
+        seeded = scale
+        log_rows = _table_rows(path, 'server_logs')
+        file_bytes = _file_bytes(path)
+
+        # The bot's own calls leave timestamp to the column default
+        log_args = [workload.log_row(None)[:5] for _ in range(args.calls)]
+        warning_args = [workload.warning_row(None)[:4] for _ in range(max(1, args.calls // 5))]
+        log_durations, log_elapsed = _timed_calls(database.log_server_event, log_args)
+        warning_durations, warning_elapsed = _timed_calls(database.add_warning, warning_args)
+
+        point = {
+            'rows': log_rows,
+            'warnings': _table_rows(path, 'warnings'),
+            'file_bytes': file_bytes,
+            'bytes_per_row': file_bytes / log_rows if log_rows else 0.0,
+            'inserts': {
+                'log_server_event': _summary(log_durations, log_elapsed),
+                'add_warning': _summary(warning_durations, warning_elapsed),
+            },
+            'batched_inserts': _batched_inserts(path, workload, args.batch_sizes, args.batch_rows),
+            'queries': _queries(database, workload, args.queries),
+        }
+        points.append(point)
+        print(f"  {journal_mode}/{index_set} @ {log_rows:,} rows: "
+              f"{point['inserts']['log_server_event']['ops_per_sec']:,.0f} log inserts/s, "
+              f"get_warnings p99 {point['queries']['get_warnings']['p99_ms']:.2f} ms, "
+              f"{file_bytes / 1_048_576:,.1f} MiB", flush=True)
+
+    return {
+        'journal_mode': journal_mode,
+        'index_set': index_set,
+        'dropped_indexes': INDEX_SETS[index_set],
+        'scale_points': points,
+        'concurrent_writers': _concurrent_writers(database, path, workload, args.writers, args.writes_per_writer),
+    }
+
+def print_tables(report):
+    print(f"\n{'config':<16} {'rows':>10} {'MiB':>8} {'B/row':>6} {'log ins/s':>10} {'warn ins/s':>10} "
+          f"{'batch100/s':>11} {'warnings p99':>13} {'logs p99':>9} {'by user p99':>12}")
+    for run in report['runs']:
+        label = f"{run['journal_mode']}/{run['index_set']}"
+        for point in run['scale_points']:
+            queries = point['queries']
+            batch = point['batched_inserts'].get('100', {}).get('rows_per_sec', 0.0)
+            print(f"{label:<16} {point['rows']:>10,} {point['file_bytes'] / 1_048_576:>8.1f} "
+                  f"{point['bytes_per_row']:>6.0f} {point['inserts']['log_server_event']['ops_per_sec']:>10,.0f} "
+                  f"{point['inserts']['add_warning']['ops_per_sec']:>10,.0f} {batch:>11,.0f} "
+                  f"{queries['get_warnings']['p99_ms']:>11.2f}ms {queries['get_server_logs']['p99_ms']:>7.2f}ms "
+                  f"{queries['get_server_logs_page_by_user']['p99_ms']:>10.2f}ms")
+    print(f"\n{'config':<16} {'writers':>8} {'writes/s':>9} {'p99 ms':>8} {'max ms':>8} {'lost':>6}")
+    for run in report['runs']:
+        concurrent = run['concurrent_writers']
+        latency = concurrent['latency']
+        print(f"{run['journal_mode'] + '/' + run['index_set']:<16} {concurrent['threads']:>8} "
+              f"{latency['ops_per_sec']:>9,.0f} {latency['p99_ms']:>8.1f} {latency['max_ms']:>8.1f} "
+              f"{concurrent['lost_writes']:>6}")
+
+def _int_list(text):
+    return [int(part) for part in text.split(',') if part.strip()]
+
+def _name_list(choices):
+    def parse(text):
+        names = [part.strip() for part in text.split(',') if part.strip()]
+        unknown = [name for name in names if name not in choices]
+        if unknown:
+            raise argparse.ArgumentTypeError(f"unknown {', '.join(unknown)} (choose from {', '.join(choices)})")
+        return names
+    return parse
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--scales', type=_int_list, default=[10_000, 100_000],
+                        help="server_logs row counts to measure at, ascending (e.g. 100000,1000000)")
+    parser.add_argument('--journal-modes', type=_name_list(JOURNAL_MODES), default=list(JOURNAL_MODES))
+    parser.add_argument('--index-sets', type=_name_list(list(INDEX_SETS)), default=list(INDEX_SETS))
+    parser.add_argument('--batch-sizes', type=_int_list, default=[1, 10, 100, 1000])
+    parser.add_argument('--batch-rows', type=int, default=2000, help="Rows inserted per batch size and scale point")
+    parser.add_argument('--calls', type=int, default=300, help="Per-call log_server_event inserts per scale point")
+    parser.add_argument('--queries', type=int, default=200, help="Calls per query type per scale point")
+    parser.add_argument('--guilds', type=int, default=200)
+    parser.add_argument('--writers', type=int, default=8, help="Concurrent writer threads")
+    parser.add_argument('--writes-per-writer', type=int, default=100)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workdir', help="Keep the database files here (default: a temporary directory)")
+    parser.add_argument('--json', help="Write the machine-readable report here")
+    args = parser.parse_args()
+    args.scales = sorted(args.scales)
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='db-workload-')
+    os.makedirs(workdir, exist_ok=True)
+    os.environ.setdefault('LOG_LEVEL', 'CRITICAL')  # Lock errors are counted as lost writes instead
+
+    report = {
+        'schema': REPORT_SCHEMA,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('json', 'workdir')},
+        'runs': [],
+    }
+    for journal_mode in args.journal_modes:
+        for index_set in args.index_sets:
+            report['runs'].append(run_config(journal_mode, index_set, args, workdir))
+
+    print_tables(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+        print(f"\n📄 Report written to {args.json}")
+
+if __name__ == '__main__':
+    main()
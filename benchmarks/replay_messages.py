@@ -0,0 +1,449 @@
+"""
+Replay load test for the on_message pipeline.
+
+Replays a message stream through the real MyClient.on_message and its
+handler chain (search, fun, utility, moderation, music, help, then the
+spam and bad-word checks), with fake Guild/Member/Channel/Message objects
+in place of the gateway and a fake REST sink counting every call the bot
+would make to Discord. External APIs (Gemini/Wikipedia search, the meme
+API) are faked too, so runs are offline and repeatable; the database is a
+fresh SQLite file in a temporary directory.
+
+    python benchmarks/replay_messages.py                      # synthetic stream
+    python benchmarks/replay_messages.py --stream msgs.jsonl  # recorded stream
+    python benchmarks/replay_messages.py --json report.json --baseline baseline.json
+
+A recorded stream is JSON lines of
+{"guild_id", "channel_id", "author_id", "author_name", "content", "bot", "mod"}
+(only content is required). The stream is replayed once as a warm-up, then
+--repeats times; the report gives the median messages/sec and CPU time per
+message over the repeats, latency per stage and end to end, and REST calls
+per message. With --baseline the run exits with status 1 if CPU time per
+message or REST calls per message grew by more than --tolerance, so it can
+gate CI - CPU time per message hardly moves on a busy shared runner, where
+wall-clock throughput can swing by more than any sensible tolerance.
+"""
+import gc
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import statistics
+import argparse
+import tempfile
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+
+# Handlers main_bot.on_message calls, in order; each is timed as a stage
+STAGES = [
+    'handle_search_command', 'handle_private_search_command', 'process_fun_command_private',
+    'process_fun_command', 'handle_entertainment_commands', 'process_utility_commands',
+    'process_moderation_commands', 'process_music_commands', 'send_help_message',
+    'send_admin_help_message', 'is_spam', 'contains_bad_words', 'log_server_event',
+]
+
+class RestSink:
+    """Counts the REST calls the bot makes; optional latency simulates Discord's round trip"""
+
+    def __init__(self, latency=0.0):
+        self.calls = Counter()
+        self.latency = latency
+
+    async def call(self, kind):
+        self.calls[kind] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+class FakeMember:
+    def __init__(self, sink, guild, user_id, name, bot=False, mod=False):
+        self.sink = sink
+        self.guild = guild
+        self.id = user_id
+        self.name = self.display_name = self.global_name = name
+        self.discriminator = '0'
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+        self.guild_permissions = discord.Permissions.all() if mod else discord.Permissions.none()
+        self.status = discord.Status.online
+        self.voice = None
+        self.roles = []
+        self.top_role = None
+        self.avatar = self.display_avatar = None
+        self.created_at = self.joined_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+    def __str__(self):
+        return self.name
+
+    async def send(self, *args, **kwargs):
+        await self.sink.call('dm')
+
+class FakeChannel:
+    def __init__(self, sink, guild, channel_id, name):
+        self.sink = sink
+        self.guild = guild
+        self.id = channel_id
+        self.name = name
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content=None, *, delete_after=None, **kwargs):
+        await self.sink.call('send')
+        if delete_after is not None:
+            self.sink.calls['delete'] += 1  # Scheduled by discord.py; counted, not waited for
+        return FakeMessage(self.sink, self.guild, self, self.guild.me, content or '')
+
+    def typing(self):
+        return _Typing(self.sink)
+
+class _Typing:
+    def __init__(self, sink):
+        self.sink = sink
+
+    async def __aenter__(self):
+        await self.sink.call('typing')
+
+    async def __aexit__(self, *exc):
+        pass
+
+class FakeGuild:
+    def __init__(self, sink, guild_id, member_count):
+        self.sink = sink
+        self.id = guild_id
+        self.name = f"guild-{guild_id}"
+        self.chunked = True
+        self.created_at = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        self.roles = []
+        self.icon = None
+        self.me = FakeMember(sink, self, 1, 'bot', bot=True)
+        self._members = {}
+        for index in range(member_count):
+            member_id = guild_id * 10_000 + index
+            self._members[member_id] = FakeMember(sink, self, member_id, f"user{index}", mod=index == 0)
+        self.channels = [FakeChannel(sink, self, guild_id * 100 + index, f"chat-{index}") for index in range(3)]
+        self.text_channels = self.channels
+        self.system_channel = self.channels[0]
+        self.owner = self._members[guild_id * 10_000]
+
+    @property
+    def members(self):
+        return list(self._members.values())
+
+    @property
+    def member_count(self):
+        return len(self._members)
+
+    def get_member(self, user_id):
+        return self._members.get(user_id)
+
+    def get_channel(self, channel_id):
+        return next((channel for channel in self.channels if channel.id == channel_id), None)
+
+    async def fetch_member(self, user_id):
+        await self.sink.call('fetch_member')
+        raise discord.NotFound(_FakeResponse(404), 'Unknown Member')
+
+class _FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = 'Not Found'
+
+class FakeMessage:
+    _next_id = 1
+
+    def __init__(self, sink, guild, channel, author, content):
+        self.sink = sink
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.id = FakeMessage._next_id
+        FakeMessage._next_id += 1
+        self.created_at = datetime.now(timezone.utc)
+        self.mentions = [guild.get_member(int(word[2:-1].lstrip('!'))) for word in content.split()
+                         if word.startswith('<@') and word.endswith('>') and word[2:-1].lstrip('!').isdigit()]
+        self.mentions = [member for member in self.mentions if member is not None]
+        self.attachments = []
+
+    async def delete(self):
+        await self.sink.call('delete')
+
+    async def add_reaction(self, emoji):
+        await self.sink.call('reaction')
+
+    async def edit(self, **kwargs):
+        await self.sink.call('edit')
+
+    async def reply(self, *args, **kwargs):
+        await self.sink.call('send')
+
+# Synthetic stream: (weight, content template) - mostly chatter, as in a real server
+SYNTHETIC_MIX = [
+    (60, "{chatter}"),
+    (4, "hello"),
+    (2, "game?"),
+    (2, "ep"),
+    (3, "!myid"),
+    (2, "!stats"),
+    (2, "!help"),
+    (2, "!queue"),
+    (1, "!nowplaying"),
+    (2, "!warnings <@{member}>"),
+    (2, "--what is todays date"),
+    (1, "--python"),
+    (1, "$meme"),
+    (1, "?hello"),
+    (3, "that's a scam {chatter}"),
+]
+CHATTER = ["lol", "anyone up for a game tonight", "brb", "did you see the match", "ok", "nice one",
+           "what time is it there", "haha true", "send the link", "gg"]
+
+def synthetic_stream(count, guilds, members, seed):
+    rng = random.Random(seed)
+    weights = [weight for weight, _ in SYNTHETIC_MIX]
+    templates = [template for _, template in SYNTHETIC_MIX]
+    events = []
+    while len(events) < count:
+        guild_id = rng.randrange(1, guilds + 1)
+        author = rng.randrange(members)
+        if rng.random() < 0.01:
+            # Spam burst: one member repeating themselves
+            text = rng.choice(CHATTER)
+            events.extend({'guild_id': guild_id, 'author_index': author, 'content': text} for _ in range(7))
+            continue
+        template = rng.choices(templates, weights)[0]
+        content = template.format(chatter=rng.choice(CHATTER),
+                                  member=guild_id * 10_000 + rng.randrange(members))
+        events.append({'guild_id': guild_id, 'author_index': author, 'content': content})
+    return events[:count]
+
+def load_stream(path):
+    with open(path, encoding='utf-8') as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def _summary(values):
+    return {
+        'count': len(values),
+        'avg_ms': sum(values) / len(values) * 1000 if values else 0.0,
+        'p50_ms': _percentile(values, 0.50) * 1000,
+        'p95_ms': _percentile(values, 0.95) * 1000,
+        'p99_ms': _percentile(values, 0.99) * 1000,
+        'max_ms': max(values) * 1000 if values else 0.0,
+    }
+
+def _instrument(main_bot, timings):
+    """Wrap each stage main_bot looks up at call time so its duration is recorded"""
+    for name in STAGES:
+        original = getattr(main_bot, name)
+        if asyncio.iscoroutinefunction(original):
+            async def timed(*args, _original=original, _name=name, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await _original(*args, **kwargs)
+                finally:
+                    timings[_name].append(time.perf_counter() - start)
+        else:
+            def timed(*args, _original=original, _name=name, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return _original(*args, **kwargs)
+                finally:
+                    timings[_name].append(time.perf_counter() - start)
+        setattr(main_bot, name, timed)
+
+def _fake_external_apis():
+    from utils import helpers
+    import commands.search
+    import commands.fun
+    fake_topic = lambda topic: {'title': topic.title(), 'extract': f"{topic} is a topic.", 'url': None}
+    fake_meme = lambda: 'https://example.com/meme.png'
+    helpers.search_topic = commands.search.search_topic = fake_topic
+    helpers.get_meme = commands.fun.get_meme = fake_meme
+
+async def replay(events, *, members, concurrency, rest_latency, db_path, repeats=5, warmup=500):
+    import main_bot
+    from utils.database import init_database
+    from commands.music import initialize_music_player
+
+    os.environ['DATABASE_PATH'] = db_path  # On Railway, main_bot's setup points it at /app/data on import
+    init_database()
+    _fake_external_apis()
+    timings = defaultdict(list)
+    _instrument(main_bot, timings)
+    client = main_bot.client
+    client.music_player = initialize_music_player(client)
+
+    sink = RestSink(rest_latency)
+    fake_guilds = {}
+
+    def build(events):
+        # Fresh messages per run; guilds and members carry over like on a live bot
+        messages = []
+        for event in events:
+            guild_id = event.get('guild_id', 1)
+            guild = fake_guilds.get(guild_id)
+            if guild is None:
+                guild = fake_guilds[guild_id] = FakeGuild(sink, guild_id, members)
+            author = None
+            if 'author_id' in event:
+                author = guild.get_member(event['author_id'])
+                if author is None:
+                    author = guild._members[event['author_id']] = FakeMember(
+                        sink, guild, event['author_id'], event.get('author_name', 'user'),
+                        bot=event.get('bot', False), mod=event.get('mod', False))
+            else:
+                author = guild.members[event.get('author_index', 0) % len(guild.members)]
+            channel = guild.get_channel(event.get('channel_id')) or guild.channels[author.id % len(guild.channels)]
+            messages.append(FakeMessage(sink, guild, channel, author, event['content']))
+        return messages
+
+    errors = Counter()
+    end_to_end = []
+    gate = asyncio.Semaphore(concurrency)
+
+    async def dispatch(message):
+        async with gate:
+            start = time.perf_counter()
+            try:
+                await client.on_message(message)
+            except Exception as e:
+                errors[f"{type(e).__name__}: {e}"[:200]] += 1
+            end_to_end.append(time.perf_counter() - start)
+
+    async def run(messages):
+        # Every run starts with no spam history, so each makes the same decisions
+        main_bot.spam_tracker.clear()
+        gc.collect()  # Don't bill one run for the previous run's garbage
+        started, cpu_started = time.perf_counter(), time.process_time()
+        await asyncio.gather(*(dispatch(message) for message in messages))
+        elapsed, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+        return {
+            'seconds': elapsed,
+            'messages_per_sec': len(messages) / elapsed if elapsed else 0.0,
+            'cpu_ms_per_message': cpu / len(messages) * 1000 if messages else 0.0,
+        }
+
+    # Warm-up: first-call imports, lazy caches and SQLite's page cache aren't measured
+    if warmup:
+        await run(build(events[:warmup]))
+    sink.calls.clear()
+    timings.clear()
+    errors.clear()
+    end_to_end.clear()
+
+    runs = [await run(build(events)) for _ in range(max(1, repeats))]
+    measured = len(events) * len(runs)
+    rest_total = sum(sink.calls.values())
+    return {
+        'messages': len(events),
+        'warmup': min(warmup, len(events)),
+        'repeats': len(runs),
+        'seconds': statistics.median(run['seconds'] for run in runs),
+        'messages_per_sec': statistics.median(run['messages_per_sec'] for run in runs),
+        'cpu_ms_per_message': statistics.median(run['cpu_ms_per_message'] for run in runs),
+        'runs': runs,
+        'concurrency': concurrency,
+        'rest_latency_ms': rest_latency * 1000,
+        'rest_calls': rest_total,
+        'rest_calls_per_message': rest_total / measured if measured else 0.0,
+        'rest_calls_by_kind': dict(sink.calls),
+        'end_to_end': _summary(end_to_end),
+        'stages': {name: _summary(timings[name]) for name in STAGES if timings[name]},
+        'errors': dict(errors),
+    }
+
+def compare(report, baseline, tolerance):
+    """Regressions against a baseline report, as readable strings (empty if none)"""
+    problems = []
+    if 'cpu_ms_per_message' in baseline:
+        ceiling = baseline['cpu_ms_per_message'] * (1 + tolerance)
+        if report['cpu_ms_per_message'] > ceiling:
+            problems.append(f"CPU time per message {report['cpu_ms_per_message']:.3f} ms is above {ceiling:.3f} ms "
+                            f"(baseline {baseline['cpu_ms_per_message']:.3f} ms)")
+    else:
+        # Baselines from before CPU time was recorded only have throughput
+        floor = baseline['messages_per_sec'] * (1 - tolerance)
+        if report['messages_per_sec'] < floor:
+            problems.append(f"throughput {report['messages_per_sec']:.0f} msg/s is below {floor:.0f} "
+                            f"(baseline {baseline['messages_per_sec']:.0f})")
+    ceiling = baseline['rest_calls_per_message'] * (1 + tolerance) + 1e-9
+    if report['rest_calls_per_message'] > ceiling:
+        problems.append(f"REST calls per message {report['rest_calls_per_message']:.3f} is above {ceiling:.3f} "
+                        f"(baseline {baseline['rest_calls_per_message']:.3f})")
+    if report['errors'] and not baseline.get('errors'):
+        problems.append(f"{sum(report['errors'].values())} message(s) raised in handlers")
+    return problems
+
+def print_report(report):
+    print(f"📨 {report['messages']:,} messages in {report['seconds']:.2f}s "
+          f"→ {report['messages_per_sec']:,.0f} msg/s, {report['cpu_ms_per_message']:.3f} ms CPU per message "
+          f"(median of {report['repeats']} runs after {report['warmup']:,} warm-up, concurrency {report['concurrency']})")
+    print(f"🌐 {report['rest_calls']:,} REST calls, {report['rest_calls_per_message']:.3f} per message: "
+          + ', '.join(f"{kind}={count}" for kind, count in sorted(report['rest_calls_by_kind'].items())))
+    e2e = report['end_to_end']
+    print(f"⏱️ on_message p50 {e2e['p50_ms']:.3f} ms, p99 {e2e['p99_ms']:.3f} ms, max {e2e['max_ms']:.1f} ms")
+    print(f"  {'stage':<32} {'calls':>8} {'avg ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for name, stage in report['stages'].items():
+        print(f"  {name:<32} {stage['count']:>8,} {stage['avg_ms']:>9.3f} {stage['p50_ms']:>9.3f} "
+              f"{stage['p99_ms']:>9.3f} {stage['max_ms']:>9.3f}")
+    for error, count in report['errors'].items():
+        print(f"❌ {count}× {error}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0].strip())
+    parser.add_argument('--stream', help="JSON lines message stream to replay (default: synthetic)")
+    parser.add_argument('--messages', type=int, default=5000, help="Synthetic messages to generate")
+    parser.add_argument('--guilds', type=int, default=20, help="Guilds in the synthetic stream")
+    parser.add_argument('--members', type=int, default=200, help="Members per fake guild")
+    parser.add_argument('--concurrency', type=int, default=64, help="Messages in flight at once")
+    parser.add_argument('--rest-latency-ms', type=float, default=0.0, help="Simulated Discord round trip")
+    parser.add_argument('--repeats', type=int, default=5, help="Measured replays of the stream (the median is reported)")
+    parser.add_argument('--warmup', type=int, default=500, help="Messages replayed first and not measured")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help="Write the report here as JSON")
+    parser.add_argument('--baseline', help="Fail if this run regressed against a previous JSON report")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed regression vs the baseline (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    # Fresh database and quiet logs; set before the bot's modules are imported
+    db_path = os.path.join(tempfile.mkdtemp(prefix='replay-'), 'bench.db')
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    os.environ.setdefault('METRICS_ENABLED', 'false')
+
+    events = load_stream(args.stream) if args.stream else synthetic_stream(args.messages, args.guilds,
+                                                                            args.members, args.seed)
+    report = asyncio.run(replay(events, members=args.members,
+                                concurrency=args.concurrency, rest_latency=args.rest_latency_ms / 1000,
+                                db_path=db_path, repeats=args.repeats, warmup=args.warmup))
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as output:
+            json.dump(report, output, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as baseline_file:
+            problems = compare(report, json.load(baseline_file), args.tolerance)
+        for problem in problems:
+            print(f"📉 Regression: {problem}")
+        if problems:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,6 @@
 import discord
 from utils.helpers import get_meme
+from utils.loop_monitor import loop_monitor
 
 async def handle_hello(message, is_private=False):
     """Handle hello command"""
@@ -35,6 +36,7 @@ async def handle_mic(message, is_private=False):
         await message.channel.send(response_text)
 
 
+@loop_monitor.commands('fun')
 async def handle_entertainment_commands(message):
     """Handle entertainment commands"""
     content = message.content.lower()
@@ -54,6 +56,7 @@ async def handle_entertainment_commands(message):
     return False
 
 # Fun command processors
+@loop_monitor.commands('fun')
 async def process_fun_command(message, is_private=False):
     """Process fun commands"""
     content = message.content.lower()
@@ -1,6 +1,20 @@
 import discord
-from utils.database import add_warning, get_warnings, log_server_event
-from utils.permissions import has_mod_permissions, get_user_from_mention
+from datetime import datetime, timedelta
+from utils.database import add_warning, get_warnings, get_warning_count, log_server_event
+from config.settings import WARNING_ESCALATION_THRESHOLD
+from utils.permissions import has_mod_permissions, resolve_user, suggest_members
+from utils.log_archive import get_log_retention, set_log_retention
+from ui.log_views import LogsPaginationView
+from utils.loop_monitor import loop_monitor
+
+async def send_user_not_found(message, query):
+    """Tell the moderator the user wasn't found, suggesting close name matches"""
+    suggestions = suggest_members(message, query)
+    if suggestions:
+        names = "\n".join(f"• {member.display_name} (`{member}` - {member.id})" for member in suggestions)
+        await message.channel.send(f"❌ User not found! Did you mean:\n{names}")
+    else:
+        await message.channel.send("❌ User not found!")
 
 async def handle_warn_command(message):
     """Handle !warn command"""
@@ -18,9 +32,9 @@ async def handle_warn_command(message):
     reason = parts[2]
     
     # Get user from mention
-    user = get_user_from_mention(message, user_mention)
+    user = await resolve_user(message, user_mention)
     if not user:
-        await message.channel.send("❌ User not found!")
+        await send_user_not_found(message, user_mention)
         return True
     
     # Add warning to database
@@ -36,6 +50,8 @@ async def handle_warn_command(message):
         embed.add_field(name="Moderator", value=f"{message.author.mention}", inline=True)
         embed.add_field(name="Reason", value=reason, inline=False)
         embed.add_field(name="Total Warnings", value=f"{warning_count}", inline=True)
+        if warning_count >= WARNING_ESCALATION_THRESHOLD:
+            embed.add_field(name="🚨 Escalation", value=f"User has reached {warning_count} active warnings - consider a kick or ban.", inline=False)
         embed.set_footer(text=f"Warning #{warning_count}")
         
         await message.channel.send(embed=embed)
@@ -79,9 +95,9 @@ async def handle_kick_command(message):
     reason = parts[2]
     
     # Get user from mention
-    user = get_user_from_mention(message, user_mention)
+    user = await resolve_user(message, user_mention)
     if not user:
-        await message.channel.send("❌ User not found!")
+        await send_user_not_found(message, user_mention)
         return True
     
     # Check if user can be kicked
@@ -145,9 +161,9 @@ async def handle_ban_command(message):
     reason = parts[2]
     
     # Get user from mention
-    user = get_user_from_mention(message, user_mention)
+    user = await resolve_user(message, user_mention)
     if not user:
-        await message.channel.send("❌ User not found!")
+        await send_user_not_found(message, user_mention)
         return True
     
     # Check if user can be banned
@@ -210,18 +226,19 @@ async def handle_warnings_command(message):
     user_mention = parts[1]
     
     # Get user from mention
-    user = get_user_from_mention(message, user_mention)
+    user = await resolve_user(message, user_mention)
     if not user:
-        await message.channel.send("❌ User not found!")
+        await send_user_not_found(message, user_mention)
         return True
     
     # Get warnings from database
-    warnings = get_warnings(user.id, message.guild.id)
-    
-    if not warnings:
+    active_count, total_count = get_warning_count(user.id, message.guild.id)
+    if not active_count:
         await message.channel.send(f"✅ {user.mention} has no warnings!")
         return True
     
+    warnings = get_warnings(user.id, message.guild.id)
+    
     embed = discord.Embed(
         title=f"⚠️ Warnings for {user.display_name}",
         color=0xffa500,
@@ -235,10 +252,10 @@ async def handle_warnings_command(message):
             inline=False
         )
     
-    if len(warnings) > 10:
-        embed.set_footer(text=f"Showing last 10 of {len(warnings)} warnings")
-    else:
-        embed.set_footer(text=f"Total: {len(warnings)} warnings")
+    footer = f"Showing last {len(warnings)} of {active_count} warnings" if active_count > len(warnings) else f"Total: {active_count} warnings"
+    if total_count > active_count:
+        footer += f" ({total_count - active_count} expired)"
+    embed.set_footer(text=footer)
     
     await message.channel.send(embed=embed)
     return True
@@ -306,29 +323,106 @@ async def handle_announce_command(message):
     
     return True
 
+def parse_log_time(value, end_of_day=False):
+    """Parse a relative (30m, 24h, 7d) or absolute (YYYY-MM-DD) time into a UTC timestamp string.
+
+    With end_of_day, a date means the start of the following day, so an
+    exclusive upper bound still includes the whole named day.
+    """
+    units = {'m': 'minutes', 'h': 'hours', 'd': 'days', 'w': 'weeks'}
+    value = value.strip().lower()
+    if value[-1:] in units and value[:-1].isdigit():
+        moment = datetime.utcnow() - timedelta(**{units[value[-1]]: int(value[:-1])})
+    else:
+        moment = datetime.strptime(value, "%Y-%m-%d")
+        if end_of_day:
+            moment += timedelta(days=1)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+async def parse_logs_filters(message, args):
+    """Parse `key:value` filters for !logs into get_server_logs_page kwargs"""
+    filters = {}
+    for arg in args:
+        if ':' not in arg:
+            raise ValueError(f"Unknown filter `{arg}`")
+        key, value = arg.split(':', 1)
+        key = key.lower()
+        if key == 'type':
+            filters['event_type'] = value.lower()
+        elif key == 'user':
+            user = await resolve_user(message, value)
+            if not user:
+                raise ValueError(f"User `{value}` not found")
+            filters['user_id'] = user.id
+        elif key == 'channel':
+            channel_id = value.strip('<#>')
+            if not channel_id.isdigit():
+                raise ValueError(f"Invalid channel `{value}`")
+            filters['channel_id'] = int(channel_id)
+        elif key in ('since', 'until'):
+            try:
+                filters[key] = parse_log_time(value, end_of_day=key == 'until')
+            except ValueError:
+                raise ValueError(f"Invalid time `{value}` (use 30m, 24h, 7d or YYYY-MM-DD)")
+        else:
+            raise ValueError(f"Unknown filter `{key}`")
+    return filters
+
 async def handle_logs_command(message):
     """Handle !logs command"""
     if not has_mod_permissions(message.author):
         await message.channel.send("❌ You don't have permission to use this command!")
         return True
     
-    # This would typically show recent server logs
-    # For now, we'll show a placeholder
-    embed = discord.Embed(
-        title="📋 Server Logs",
-        description="Recent server activity logs would be displayed here.",
-        color=0x9b59b6
-    )
-    embed.add_field(
-        name="Available Logs",
-        value="• Member joins/leaves\n• Message edits/deletes\n• Moderation actions\n• Auto-moderation triggers",
-        inline=False
-    )
-    embed.set_footer(text="Logs are stored in the database for security purposes")
+    # Parse command: !logs [type:<event>] [user:@user] [channel:#channel] [since:24h] [until:2024-01-31]
+    args = message.content.split()[1:]
+    try:
+        filters = await parse_logs_filters(message, args)
+    except ValueError as e:
+        await message.channel.send(f"❌ {e}\nUsage: `!logs [type:<event>] [user:@user] [channel:#channel] [since:24h] [until:YYYY-MM-DD]`")
+        return True
     
-    await message.channel.send(embed=embed)
+    view = LogsPaginationView(message.guild.id, message.author.id, filters)
+    await view.load_page()
+    view.message = await message.channel.send(embed=view.create_embed(), view=view)
+    return True
+
+async def handle_logretention_command(message):
+    """Handle !logretention command"""
+    if not has_mod_permissions(message.author):
+        await message.channel.send("❌ You don't have permission to use this command!")
+        return True
+    
+    # Parse command: !logretention [days|default]
+    parts = message.content.split()
+    if len(parts) < 2:
+        days = get_log_retention(message.guild.id)
+        status = "forever" if not days else f"{days} days"
+        await message.channel.send(f"🗄️ Server logs are kept for **{status}** before being archived.")
+        return True
+    
+    value = parts[1].lower()
+    if value == 'default':
+        days = None
+    elif value.isdigit():
+        days = int(value)
+    else:
+        await message.channel.send("❌ Usage: `!logretention [days|default]` (0 keeps logs forever)")
+        return True
+    
+    if not set_log_retention(message.guild.id, days):
+        await message.channel.send("❌ Failed to update log retention!")
+        return True
+    
+    days = get_log_retention(message.guild.id)
+    status = "forever" if not days else f"{days} days"
+    await message.channel.send(f"✅ Server logs will now be kept for **{status}**. Older entries are archived and still searchable with `!logs`.")
+    
+    log_server_event(message.guild.id, "log_retention_changed", message.author.id, message.channel.id,
+                    f"Log retention set to {status} by {message.author.display_name}")
     return True
 
+@loop_monitor.commands('moderation')
 async def process_moderation_commands(message):
     """Process all moderation commands"""
     content = message.content.lower()
@@ -345,7 +439,9 @@ async def process_moderation_commands(message):
         return await handle_poll_command(message)
     elif content.startswith('!announce '):
         return await handle_announce_command(message)
-    elif content == '!logs':
+    elif content == '!logs' or content.startswith('!logs '):
         return await handle_logs_command(message)
+    elif content == '!logretention' or content.startswith('!logretention '):
+        return await handle_logretention_command(message)
     
     return False
@@ -5,11 +5,22 @@ from discord.errors import HTTPException
 import asyncio
 import time
 from utils.music_sources import MusicPlayer, YTDLSource
-from ui.music_views import SpotifyMusicCard, FastMusicSearchModal, MusicPlayerView
+from utils.search_orchestrator import hedged_search
+from utils import play_history
+from utils.track_matcher import resolve_audio_url
+from ui.music_views import SpotifyMusicCard, FastMusicSearchModal, RecentTracksView, create_card_embed, card_buttons
+from config.settings import PLAY_HISTORY_RECENT_LIMIT
+from utils.loop_monitor import loop_monitor
+from utils.logging_setup import get_logger
+from utils.metrics import registry
+
+log = get_logger('music')
 
 # Global music player instance
 music_player = None
 
+_send_failures = registry.counter('bot_send_failures_total', "Messages given up on after retries")
+
 # Rate limiting cooldown tracking
 _last_error_message = {}
 _error_cooldown = 2.0  # seconds
@@ -31,7 +42,7 @@ async def safe_send_message(channel_or_interaction, message, ephemeral=True, max
     
     if message.startswith("❌") and user_id in _last_error_message:
         if current_time - _last_error_message[user_id] < _error_cooldown:
-            print(f"Rate limiting error message for user {user_id}")
+            log.debug("Rate limiting error message for user %s", user_id)
             return False
     
     # Update cooldown for error messages
@@ -49,24 +60,30 @@ async def safe_send_message(channel_or_interaction, message, ephemeral=True, max
         except HTTPException as e:
             if e.status == 429:  # Rate limited
                 retry_after = e.retry_after if hasattr(e, 'retry_after') else 1.0
-                print(f"Rate limited, waiting {retry_after}s (attempt {attempt + 1}/{max_retries})")
+                log.warning("Rate limited, waiting %ss (attempt %s/%s)", retry_after, attempt + 1, max_retries)
                 await asyncio.sleep(retry_after)
             else:
-                print(f"HTTP error {e.status}: {e}")
+                log.warning("HTTP error %s: %s", e.status, e)
                 break
         except Exception as e:
-            print(f"Error sending message: {e}")
+            log.warning("Error sending message: %s", e)
             break
     
-    print(f"Failed to send message after {max_retries} attempts")
+    _send_failures.inc()
+    log.warning("Failed to send message after %s attempts", max_retries)
     return False
 
 def initialize_music_player(bot):
     """Initialize the global music player"""
     global music_player
-    print("🎵 Initializing music player...")
+    if music_player is not None:
+        # on_ready fires again after reconnects - keep the existing sessions
+        return music_player
+    log.info("🎵 Initializing music player...")
     music_player = MusicPlayer(bot)
-    print(f"✅ Music player initialized: {music_player}")
+    # One persistent view serves the buttons of every card, including ones posted before a restart
+    bot.add_view(SpotifyMusicCard(music_player))
+    log.info("✅ Music player initialized: %s", music_player)
     return music_player
 
 async def handle_music_command(message):
@@ -83,12 +100,11 @@ async def handle_music_command(message):
         return True
     
     # Create the Spotify-like music card
-    music_card = SpotifyMusicCard(music_player, message.guild.id)
-    embed = await music_card.create_spotify_card()
+    embed = create_card_embed(music_player, message.guild.id)
     
-    # Send the card and store the message reference
-    sent_message = await message.channel.send(embed=embed, view=music_card)
-    music_card.message = sent_message
+    # Send the card and keep it up to date from now on
+    sent_message = await message.channel.send(embed=embed, view=card_buttons(music_player))
+    music_player.music_cards[message.guild.id] = (sent_message.channel.id, sent_message.id)
     return True
 
 async def handle_search_command(message):
@@ -118,7 +134,13 @@ async def handle_search_command(message):
     # Search for the song
     loading_msg = await message.channel.send(f"🔍 Searching for: `{query}`...")
     
-    url, title, duration, thumbnail, uploader, view_count = await YTDLSource.search_youtube(query)
+    # Songs this server has played before are found without a network search
+    local = await play_history.best_match(message.guild.id, query)
+    if local:
+        url, title, duration, thumbnail, uploader = (local['url'], local['title'], local['duration'],
+                                                     local['thumbnail'], local['artist'])
+    else:
+        url, title, duration, thumbnail, uploader, view_count = await YTDLSource.search_youtube(query, guild_id=message.guild.id)
     if not url:
         await loading_msg.edit(content="❌ No results found for your search.")
         return True
@@ -130,6 +152,8 @@ async def handle_search_command(message):
     embed.add_field(name="Duration", value=duration_str, inline=True)
     if thumbnail:
         embed.set_thumbnail(url=thumbnail)
+    if local:
+        embed.set_footer(text=f"🕘 From this server's history - played {local['play_count']}×")
     
     # Create simple play button
     class QuickPlayView(View):
@@ -152,6 +176,7 @@ async def handle_search_command(message):
                 'url': self.url,
                 'title': self.title,
                 'duration': self.duration_str,
+                'duration_seconds': duration,
                 'thumbnail': self.thumbnail,
                 'requester': self.requester,
                 'uploader': uploader
@@ -160,19 +185,22 @@ async def handle_search_command(message):
             if not voice_client.is_playing():
                 music_player.current_songs[interaction.guild.id] = song_info
                 try:
-                    player = await YTDLSource.from_url(self.url, stream=True)
-                    player.volume = music_player.volumes[interaction.guild.id]
-                    voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(music_player.play_next(interaction.guild.id), music_player.bot.loop))
+                    # History hits can be Spotify tracks, which resolve through the match table
+                    audio_url = await resolve_audio_url(song_info, guild_id=interaction.guild.id)
+                    if not audio_url:
+                        await interaction.response.send_message(f"❌ Couldn't find audio for: {self.title}", ephemeral=True)
+                        return
+                    player = await YTDLSource.from_url(audio_url, stream=True, guild_id=interaction.guild.id,
+                                                       volume=music_player.volumes[interaction.guild.id])
+                    music_player.start_playback(interaction.guild.id, voice_client, player, song_info)
                     
-                    # Create music player embed with controls
-                    view = MusicPlayerView(music_player, interaction.guild.id)
-                    embed = await view.create_now_playing_embed(song_info)
-                    await interaction.response.edit_message(embed=embed, view=view)
+                    # Turn the search result into a music card with controls
+                    embed = create_card_embed(music_player, interaction.guild.id)
+                    await interaction.response.edit_message(embed=embed, view=card_buttons(music_player))
+                    music_player.music_cards[interaction.guild.id] = (interaction.channel_id, interaction.message.id)
                 except Exception as e:
                     error_msg = f"❌ Error playing song: {type(e).__name__}: {str(e)}"
-                    print(f"Music playback error: {error_msg}")
-                    import traceback
-                    traceback.print_exc()
+                    log.exception("Music playback error: %s", error_msg, extra={'guild_id': interaction.guild.id})
                     await interaction.response.send_message(error_msg, ephemeral=True)
             else:
                 music_player.queues[interaction.guild.id].append(song_info)
@@ -185,6 +213,24 @@ async def handle_search_command(message):
     await loading_msg.edit(content="", embed=embed, view=view)
     return True
 
+async def handle_recent_command(message):
+    """Handle !recent command - pick from the server's recently played tracks"""
+    tracks = await play_history.recent(message.guild.id, PLAY_HISTORY_RECENT_LIMIT)
+    if not tracks:
+        await safe_send_message(message.channel, "📭 Nothing has been played in this server yet.")
+        return True
+    
+    embed = discord.Embed(title="🕘 Recently Played", color=0x1DB954)
+    lines = []
+    for index, track in enumerate(tracks, 1):
+        lines.append(f"**{index}.** {track['title']} - {track['artist'] or 'Unknown'} ({track['play_count']}×)")
+    embed.description = "\n".join(lines)
+    embed.set_footer(text="Pick a track below to queue it again")
+    
+    view = RecentTracksView(music_player, message.guild.id, tracks)
+    await message.channel.send(embed=embed, view=view)
+    return True
+
 async def handle_play_command(message):
     """Handle !play command (legacy support)"""
     try:
@@ -222,11 +268,7 @@ async def handle_play_command(message):
             # Direct URL
             url = query
             try:
-                import yt_dlp
-                ytdl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
-                data = await asyncio.get_event_loop().run_in_executor(None, lambda: ytdl.extract_info(url, download=False))
-                if 'entries' in data:
-                    data = data['entries'][0]
+                data = await YTDLSource.fetch_info(url, guild_id=message.guild.id)
                 title = data.get('title', 'Unknown Title')
                 duration = data.get('duration', 0)
                 thumbnail = data.get('thumbnail', '')
@@ -235,11 +277,18 @@ async def handle_play_command(message):
                 await loading_msg.edit(content=f"❌ Error loading URL: {str(e)}")
                 return True
         else:
-            # Search YouTube
-            url, title, duration, thumbnail, uploader, view_count = await YTDLSource.search_youtube(query)
-            if not url:
+            # A YouTube hit is directly playable; a Spotify hit needs another
+            # YouTube match search, so Spotify is only asked once YouTube failed
+            result = await hedged_search(query, providers=('youtube',), fallbacks=('spotify',),
+                                         guild_id=message.guild.id)
+            if not result:
                 await loading_msg.edit(content="❌ No results found for your search.")
                 return True
+            url = result['url']
+            title = result['title']
+            duration = result['duration']
+            thumbnail = result['thumbnail']
+            uploader = result['artist']
         
         # Format duration
         duration_str = f"{duration//60}:{duration%60:02d}" if duration else "Unknown"
@@ -248,6 +297,7 @@ async def handle_play_command(message):
             'url': url,
             'title': title,
             'duration': duration_str,
+            'duration_seconds': duration,
             'thumbnail': thumbnail,
             'requester': message.author.display_name,
             'uploader': uploader
@@ -257,9 +307,14 @@ async def handle_play_command(message):
         if not voice_client.is_playing():
             music_player.current_songs[message.guild.id] = song_info
             try:
-                player = await YTDLSource.from_url(url, stream=True)
-                player.volume = music_player.volumes[message.guild.id]
-                voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(music_player.play_next(message.guild.id), music_player.bot.loop))
+                # Spotify results go through the match table to find their audio
+                audio_url = await resolve_audio_url(song_info, guild_id=message.guild.id)
+                if not audio_url:
+                    await loading_msg.edit(content=f"❌ Couldn't find audio for: {title}")
+                    return True
+                player = await YTDLSource.from_url(audio_url, stream=True, guild_id=message.guild.id,
+                                                   volume=music_player.volumes[message.guild.id])
+                music_player.start_playback(message.guild.id, voice_client, player, song_info)
                 
                 embed = discord.Embed(title="🎵 Now Playing", color=0x00ff00)
                 embed.add_field(name="Title", value=title, inline=False)
@@ -297,7 +352,7 @@ async def handle_music_control_commands(message):
         if message.guild.id in music_player.voice_clients:
             voice_client = music_player.voice_clients[message.guild.id]
             if voice_client.is_playing():
-                voice_client.pause()
+                music_player.pause(message.guild.id)
                 await message.channel.send("⏸️ Music paused.")
             else:
                 await safe_send_message(message.channel, "❌ Nothing is currently playing.")
@@ -310,7 +365,7 @@ async def handle_music_control_commands(message):
         if message.guild.id in music_player.voice_clients:
             voice_client = music_player.voice_clients[message.guild.id]
             if voice_client.is_paused():
-                voice_client.resume()
+                music_player.resume(message.guild.id)
                 await message.channel.send("▶️ Music resumed.")
             else:
                 await safe_send_message(message.channel, "❌ Music is not paused.")
@@ -418,11 +473,7 @@ async def handle_music_control_commands(message):
     # Leave voice channel command
     if content.startswith('!leave'):
         if message.guild.id in music_player.voice_clients:
-            await music_player.voice_clients[message.guild.id].disconnect()
-            del music_player.voice_clients[message.guild.id]
-            music_player.queues[message.guild.id].clear()
-            if message.guild.id in music_player.current_songs:
-                del music_player.current_songs[message.guild.id]
+            await music_player.disconnect(message.guild.id)
             await message.channel.send("👋 Left the voice channel.")
         else:
             await safe_send_message(message.channel, "❌ Bot is not connected to a voice channel.")
@@ -451,6 +502,7 @@ async def handle_music_control_commands(message):
     
     return False
 
+@loop_monitor.commands('music')
 async def process_music_commands(message):
     """Process all music-related commands"""
     global music_player
@@ -459,7 +511,7 @@ async def process_music_commands(message):
     
     # Check if music player is initialized for any music command
     if music_player is None:
-        if any(content.startswith(cmd) for cmd in ['!music', '!play', '!pause', '!resume', '!skip', '!stop', '!queue', '!volume', '!loop', '!leave', '!nowplaying']):
+        if any(content.startswith(cmd) for cmd in ['!music', '!play', '!recent', '!pause', '!resume', '!skip', '!stop', '!queue', '!volume', '!loop', '!leave', '!nowplaying']):
             await safe_send_message(message.channel, "❌ Music player is not initialized yet. Please wait for the bot to fully start up.")
             return True
         return False
@@ -469,6 +521,8 @@ async def process_music_commands(message):
         return await handle_music_command(message)
     elif content.startswith('!search'):
         return await handle_search_command(message)
+    elif content.startswith('!recent'):
+        return await handle_recent_command(message)
     elif content.startswith('!play'):
         return await handle_play_command(message)
     else:
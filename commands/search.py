@@ -1,5 +1,7 @@
 from utils.helpers import search_topic, get_current_date_info
+from utils.loop_monitor import loop_monitor
 
+@loop_monitor.commands('search', label='--topic')
 async def handle_search_command(message, is_private=False):
     """Handle search commands that start with --"""
     content = message.content.lower()
@@ -34,6 +36,7 @@ async def handle_search_command(message, is_private=False):
     
     return False
 
+@loop_monitor.commands('search', label='?--topic')
 async def handle_private_search_command(message):
     """Handle private search commands that start with ?--"""
     if message.content.startswith('?'):
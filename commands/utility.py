@@ -1,5 +1,13 @@
+import io
 import discord
+from datetime import datetime
 from utils.permissions import is_admin
+from utils.guild_stats import guild_stats
+from utils.member_cache import ensure_chunked, memory_report
+from utils.extraction_pool import extraction_pool
+from utils.loop_monitor import loop_monitor
+from utils import profiler
+from config.settings import PROFILER_MAX_SECONDS, PROFILER_TOP_N
 
 async def handle_myid(message):
     """Handle !myid command"""
@@ -117,26 +125,193 @@ async def handle_stats(message):
         embed.add_field(name="📅 Created", value=message.guild.created_at.strftime("%B %d, %Y"), inline=True)
         embed.add_field(name="👑 Owner", value=message.guild.owner.display_name if message.guild.owner else "Unknown", inline=True)
         
+        # Counters are maintained from gateway events, so this is O(1)
+        # (the guild's member list is chunked once, the first time it's needed)
+        await ensure_chunked(message.guild)
+        stats = guild_stats.get(message.guild)
+        
         # Channel counts
-        text_channels = len(message.guild.text_channels)
-        voice_channels = len(message.guild.voice_channels)
-        embed.add_field(name="💬 Text Channels", value=str(text_channels), inline=True)
-        embed.add_field(name="🔊 Voice Channels", value=str(voice_channels), inline=True)
+        embed.add_field(name="💬 Text Channels", value=str(stats.text_channels), inline=True)
+        embed.add_field(name="🔊 Voice Channels", value=str(stats.voice_channels), inline=True)
         embed.add_field(name="🎭 Roles", value=str(len(message.guild.roles)), inline=True)
         
         # Member status
-        online = sum(1 for member in message.guild.members if member.status != discord.Status.offline)
-        embed.add_field(name="🟢 Online", value=str(online), inline=True)
-        embed.add_field(name="🔴 Offline", value=str(message.guild.member_count - online), inline=True)
+        embed.add_field(name="🟢 Online", value=str(stats.online), inline=True)
+        embed.add_field(name="🔴 Offline", value=str(max(message.guild.member_count - stats.online, 0)), inline=True)
         
         # Bot stats
-        bots = sum(1 for member in message.guild.members if member.bot)
-        embed.add_field(name="🤖 Bots", value=str(bots), inline=True)
+        embed.add_field(name="🤖 Bots", value=str(stats.bots), inline=True)
+        
+        # Activity
+        messages_per_min = stats.messages.total(10) / 10
+        embed.add_field(name="💬 Messages/min", value=f"{messages_per_min:.1f}", inline=True)
+        embed.add_field(name="📥 Joins/hour", value=str(stats.joins.total(60)), inline=True)
+        embed.add_field(name="📤 Leaves/hour", value=str(stats.leaves.total(60)), inline=True)
         
         await message.channel.send(embed=embed)
     except Exception as e:
         await message.channel.send(f"❌ Error getting stats: {str(e)}")
 
+async def handle_memreport(message, client):
+    """Handle !memreport command - admin only"""
+    if not is_admin(message.author):
+        await message.channel.send("❌ You don't have permission to use this command")
+        return
+    
+    report = memory_report(client)
+    rss = f"{report['rss_kb'] / 1024:.1f} MiB" if report['rss_kb'] else "Unknown"
+    embed = discord.Embed(title="🧠 Member Cache Report", color=0x9b59b6)
+    embed.add_field(name="Policy", value=f"`{report['policy']}`" + (" (members intent)" if report['members_intent'] else ""), inline=True)
+    embed.add_field(name="Process RSS", value=rss, inline=True)
+    embed.add_field(name="Cached Members", value=f"{report['total_cached_members']:,} / {report['total_members']:,}", inline=True)
+    
+    for guild in report['guilds']:
+        embed.add_field(
+            name=guild['name'][:50],
+            value=(f"👥 {guild['cached_members']:,} / {guild['member_count']:,} cached"
+                   f"{' • chunked' if guild['chunked'] else ''}\n"
+                   f"🆔 {guild['departed_ids']:,} departed IDs ({guild['departed_ids_bytes'] / 1024:.1f} KiB)"
+                   f" • 🔤 {guild['name_index_keys']:,} index keys"),
+            inline=False
+        )
+    
+    await message.channel.send(embed=embed)
+
+async def handle_poolstats(message):
+    """Handle !poolstats command - admin only"""
+    if not is_admin(message.author):
+        await message.channel.send("❌ You don't have permission to use this command")
+        return
+    
+    stats = extraction_pool.stats()
+    embed = discord.Embed(title="⚙️ yt-dlp Worker Pool", color=0xe67e22)
+    embed.add_field(name="Workers", value=f"{stats['running']} / {stats['workers']} busy ({stats['mode']})", inline=True)
+    embed.add_field(name="Cancelled", value=f"{stats['cancelled']:,}", inline=True)
+    embed.add_field(name="Coalesced", value=f"{stats['coalesced']:,} ({stats['inflight_keys']} in flight)", inline=True)
+    
+    for name, entry in stats['classes'].items():
+        embed.add_field(
+            name=name.replace('_', ' ').title(),
+            value=(f"📥 {entry['queued']} queued from {entry['guilds']} guild(s)\n"
+                   f"✅ {entry['completed']:,} done • ⏳ {entry['avg_wait'] * 1000:.0f} ms avg wait"),
+            inline=False
+        )
+    
+    await message.channel.send(embed=embed)
+
+async def handle_voicereport(message, client):
+    """Handle !voicereport command - admin only"""
+    if not is_admin(message.author):
+        await message.channel.send("❌ You don't have permission to use this command")
+        return
+    
+    music_player = getattr(client, 'music_player', None)
+    if music_player is None:
+        await message.channel.send("❌ Music player is not initialized yet")
+        return
+    
+    report = music_player.sessions.report()
+    embed = discord.Embed(title="🔊 Voice Sessions", color=0x1abc9c)
+    embed.add_field(name="Connected", value=f"{report['sessions']}", inline=True)
+    embed.add_field(name="Playing / Paused", value=f"{report['playing']} / {report['paused']}", inline=True)
+    embed.add_field(name="Empty / Idle", value=f"{report['alone']} / {report['idle']}", inline=True)
+    embed.add_field(name="FFmpeg Processes", value=f"{report['ffmpeg_processes']}", inline=True)
+    embed.add_field(name="Opus Passthrough", value=f"{report['opus_sources']}", inline=True)
+    embed.add_field(name="Queued Songs", value=f"{report['queued_songs']:,}", inline=True)
+    progress = music_player.progress.stats()
+    embed.add_field(name="Card Progress Edits", value=f"{progress['edits']:,} ({progress['deferred']:,} deferred)", inline=True)
+    embed.add_field(
+        name="Per-guild State",
+        value="\n".join(f"`{name}`: {count}" for name, count in report['state_entries'].items()),
+        inline=False
+    )
+    embed.set_footer(text=f"{report['reaped']} idle session(s) closed since startup")
+    
+    await message.channel.send(embed=embed)
+
+@loop_monitor.commands('utility')
+async def handle_loopreport(message):
+    """Handle !loopreport command - admin only"""
+    if not is_admin(message.author):
+        await message.channel.send("❌ You don't have permission to use this command")
+        return
+    
+    report = loop_monitor.report()
+    lag = report['lag']
+    embed = discord.Embed(title="🐢 Event Loop", color=0x95a5a6)
+    embed.add_field(name="Lag p50 / p99", value=f"{lag['p50'] * 1000:.1f} / {lag['p99'] * 1000:.1f} ms", inline=True)
+    embed.add_field(name="Max Lag", value=f"{lag['max'] * 1000:.0f} ms", inline=True)
+    embed.add_field(name="Blocked", value=f"{report['stalls']:,} time(s)", inline=True)
+    
+    if report['handlers']:
+        embed.add_field(
+            name="Slowest Handlers (p99)",
+            value="\n".join(f"`{name}` {entry['p99'] * 1000:.0f} ms p99 • {entry['avg'] * 1000:.0f} ms avg • {entry['count']:,}×"
+                            for kind, name, entry in report['handlers'])[:1024],
+            inline=False
+        )
+    
+    slow = report['slow_callbacks']
+    files = []
+    if slow:
+        embed.add_field(
+            name="Recent Blocking",
+            value="\n".join(f"{datetime.fromtimestamp(entry['at']):%H:%M:%S} - {entry['seconds'] * 1000:.0f} ms"
+                            for entry in slow[-5:]),
+            inline=False
+        )
+        # Full stacks of the blocking code go in an attachment
+        text = "\n\n".join(f"{datetime.fromtimestamp(entry['at']):%Y-%m-%d %H:%M:%S} blocked {entry['seconds'] * 1000:.0f} ms\n"
+                            f"{entry['stack'] or '(stack not captured)'}" for entry in reversed(slow))
+        files.append(discord.File(io.BytesIO(text.encode()), filename="slow_callbacks.txt"))
+    
+    await message.channel.send(embed=embed, files=files)
+
+async def handle_profile(message):
+    """Handle !profile [seconds] command - admin only"""
+    if not is_admin(message.author):
+        await message.channel.send("❌ You don't have permission to use this command")
+        return
+    
+    parts = message.content.split()
+    try:
+        seconds = int(parts[1]) if len(parts) > 1 else 10
+    except ValueError:
+        await message.channel.send(f"❌ Usage: `!profile [seconds]` (1-{PROFILER_MAX_SECONDS})")
+        return
+    seconds = max(1, min(seconds, PROFILER_MAX_SECONDS))
+    if profiler.is_running():
+        await message.channel.send("❌ A profile is already running")
+        return
+    
+    await message.channel.send(f"🔬 Profiling for {seconds}s...")
+    profile = await profiler.profile_for(seconds)
+    
+    embed = discord.Embed(title="🔬 Profile", color=0x9b59b6)
+    embed.add_field(name="Samples", value=f"{profile.samples:,} over {profile.seconds:.1f}s", inline=True)
+    busy = profile.loop_busy / profile.loop_samples * 100 if profile.loop_samples else 0
+    embed.add_field(name="Event Loop Busy", value=f"{busy:.0f}%", inline=True)
+    
+    top = profile.top_functions(PROFILER_TOP_N)
+    if top:
+        embed.add_field(
+            name="Hot Functions (self / total samples)",
+            value="\n".join(f"`{label[:70]}` {own:,} / {total:,}" for label, own, total in top)[:1024],
+            inline=False
+        )
+    awaits = profile.top_awaits(PROFILER_TOP_N)
+    if awaits:
+        embed.add_field(
+            name="Awaited Coroutines (task samples)",
+            value="\n".join(f"`{label[:70]}` {count:,}" for label, count in awaits)[:1024],
+            inline=False
+        )
+    embed.set_footer(text="Attachment is in collapsed-stack format - open it in speedscope or flamegraph.pl")
+    
+    stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+    attachment = discord.File(io.BytesIO(profile.collapsed().encode()), filename=f"profile-{stamp}.folded")
+    await message.channel.send(embed=embed, file=attachment)
+
 async def process_utility_commands(message, client):
     """Process utility commands"""
     content = message.content.lower()
@@ -156,5 +331,20 @@ async def process_utility_commands(message, client):
     elif message.content.startswith('!stats'):
         await handle_stats(message)
         return True
+    elif message.content.startswith('!memreport'):
+        await handle_memreport(message, client)
+        return True
+    elif message.content.startswith('!poolstats'):
+        await handle_poolstats(message)
+        return True
+    elif message.content.startswith('!voicereport'):
+        await handle_voicereport(message, client)
+        return True
+    elif message.content.startswith('!loopreport'):
+        await handle_loopreport(message)
+        return True
+    elif message.content.startswith('!profile'):
+        await handle_profile(message)
+        return True
     
     return False
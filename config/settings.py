@@ -19,6 +19,102 @@ BAD_WORDS = [
     # Add more as needed - keeping it mild for demonstration
 ]
 
+# Warning settings
+WARNING_EXPIRY_DAYS = 0  # Warnings older than this stop counting (0 = never expire)
+WARNING_SWEEP_INTERVAL_MINUTES = 60  # How often expired warnings are swept
+WARNING_ESCALATION_THRESHOLD = 3  # Active warnings before moderators are told to escalate
+
+# Member caching
+MEMBER_CACHE_POLICY = os.getenv('MEMBER_CACHE_POLICY', 'lazy')  # full, lazy or minimal
+MEMBERS_INTENT = os.getenv('MEMBERS_INTENT', 'false').lower() == 'true'  # Privileged - enable in the developer portal first
+
+# Member name index
+MEMBER_INDEX_MAX_GUILDS = 50  # Guild name indexes kept in memory (least recently used are rebuilt)
+
+# Guild statistics
+STATS_RECONCILE_MINUTES = 30  # How often !stats counters are checked against a full recount
+
+# Server log retention
+LOG_RETENTION_DAYS = 90  # Default days of logs kept in the database (0 = keep forever)
+LOG_ARCHIVE_DIR = os.getenv('LOG_ARCHIVE_DIR')  # Defaults to log_archives/ next to the database
+LOG_ARCHIVE_CHUNK_SIZE = 5000  # Rows exported and deleted per transaction
+LOG_ARCHIVE_INTERVAL_HOURS = 6  # How often expired logs are archived
+LOG_ARCHIVE_SEGMENTS_PER_PAGE = 7  # Archived day segments read for one !logs page at most
+
+# Logging
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # Default level for every subsystem
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')  # Per-subsystem overrides, e.g. "music=DEBUG,db=WARNING,discord=WARNING"
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # json (one object per line) or text
+LOG_QUEUE_SIZE = 10000  # Records buffered for the writer thread before new ones are dropped
+LOG_REPEAT_BURST = 5  # Identical messages written per window before sampling starts
+LOG_REPEAT_WINDOW_SECONDS = 60
+LOG_REPEAT_SAMPLE_EVERY = 50  # Past the burst, one in this many identical messages is written
+
+# Event loop monitoring
+LOOP_LAG_SAMPLE_SECONDS = 0.5  # How often event-loop lag is sampled
+LOOP_SLOW_CALLBACK_SECONDS = 0.25  # Blocking the loop this long records the blocking code's stack
+LOOP_SLOW_CALLBACK_HISTORY = 20  # Slow callbacks kept for !loopreport
+LOOP_MONITOR_MAX_HANDLERS = 200  # Distinct event/command latency histograms before new ones share 'other'
+
+# Metrics endpoint
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')  # 0.0.0.0 to let an external Prometheus scrape it
+METRICS_PORT = int(os.getenv('METRICS_PORT', '8080'))
+
+# Sampling profiler (!profile)
+PROFILER_SAMPLE_HZ = 100  # Stack samples per second while a profile runs
+PROFILER_MAX_SECONDS = 60  # Longest profile an admin can request
+PROFILER_TOP_N = 10  # Hot functions and awaited coroutines listed in the summary
+
+# Music search
+SEARCH_PROVIDER_DEADLINES = {'spotify': 3.0, 'youtube': 8.0}  # Seconds each provider gets per search
+SEARCH_PREFERENCE_GRACE = 0.5  # Extra seconds the preferred provider gets once another has answered
+SEARCH_PROVIDER_COOLDOWN = 60  # Seconds a repeatedly failing provider is skipped
+
+# yt-dlp extraction
+EXTRACTION_HEDGE_DELAY = 4.0  # Seconds before a slow extraction gets a parallel backup attempt
+EXTRACTION_MAX_PARALLEL = 2  # Attempts allowed in flight per track
+EXTRACTION_WORKERS = int(os.getenv('EXTRACTION_WORKERS', '4'))  # Dedicated yt-dlp workers
+EXTRACTION_POOL_MODE = os.getenv('EXTRACTION_POOL_MODE', 'thread')  # thread or process
+EXTRACTION_BACKGROUND_WORKERS = 1  # Workers background jobs (downloads, loudness analysis) may hold at once
+
+# Local audio cache
+AUDIO_CACHE_ENABLED = os.getenv('AUDIO_CACHE_ENABLED', 'false').lower() == 'true'
+AUDIO_CACHE_DIR = os.getenv('AUDIO_CACHE_DIR')  # Defaults to audio_cache/ next to the database
+AUDIO_CACHE_MAX_BYTES = int(os.getenv('AUDIO_CACHE_MAX_MB', '2048')) * 1024 * 1024
+AUDIO_CACHE_MIN_PLAYS = 3  # Plays before a track is downloaded in the background
+AUDIO_CACHE_MAX_TRACK_SECONDS = 900  # Longer tracks (mixes, streams) are never cached
+AUDIO_CACHE_HALF_LIFE_HOURS = 72  # How quickly old plays stop counting towards keeping a file
+AUDIO_CACHE_PLAYS_RETENTION_DAYS = 30  # Play counts of uncached tracks are dropped after this
+OPUS_STORE_BITRATE = 128  # kbps for cached tracks stored pre-encoded as Ogg/Opus
+AUDIO_CACHE_SWEEP_HOURS = 6  # How often partial downloads are cleaned up and the budget re-checked
+
+# Loudness normalization
+LOUDNESS_NORMALIZATION = os.getenv('LOUDNESS_NORMALIZATION', 'true').lower() == 'true'
+LOUDNESS_TARGET_LUFS = -14.0  # Integrated loudness tracks are normalized to
+LOUDNESS_TRUE_PEAK = -1.0  # dBTP ceiling a boost may not push peaks past
+LOUDNESS_MAX_GAIN_DB = 12.0  # Largest boost or cut applied to one track
+LOUDNESS_ANALYSIS_MAX_SECONDS = 600  # Only the start of very long tracks is measured
+
+# Voice session lifecycle
+VOICE_ALONE_GRACE_SECONDS = 120  # Disconnect after the channel has had no listeners this long (paused meanwhile)
+VOICE_IDLE_GRACE_SECONDS = 300  # Disconnect after nothing has played for this long
+VOICE_PAUSED_GRACE_SECONDS = 900  # Disconnect after being paused by a user for this long
+VOICE_REAPER_INTERVAL_SECONDS = 30  # How often idle sessions are checked
+
+# Play history
+PLAY_HISTORY_LOCAL_FIRST = os.getenv('PLAY_HISTORY_LOCAL_FIRST', 'true').lower() == 'true'  # Answer repeat searches from history
+PLAY_HISTORY_MIN_COVERAGE = 0.8  # Share of a history track's title words a query must name to skip the network
+PLAY_HISTORY_FLUSH_SECONDS = 15  # How often buffered plays are written in one batch
+PLAY_HISTORY_MAX_PENDING = 100  # Buffered tracks that trigger an early flush
+PLAY_HISTORY_RECENT_LIMIT = 10  # Tracks offered by !recent
+
+# Music card progress bar
+CARD_PROGRESS_TICK_SECONDS = 1  # How often the shared ticker looks for cards that are due
+CARD_PROGRESS_INTERVAL_SECONDS = 15  # How often each playing card's progress bar is refreshed
+CARD_PROGRESS_EDITS_PER_CHANNEL = 1  # Card edits per channel per tick (Discord rate-limits edits per channel)
+CARD_PROGRESS_MAX_EDITS_PER_TICK = 10  # Card edits per tick across all guilds
+
 # Music player configuration
 YTDL_FORMAT_OPTIONS = {
     'format': 'bestaudio/best',
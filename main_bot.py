@@ -1,5 +1,15 @@
-import discord
-from discord.ext import commands
+# Startup timing starts before anything heavy is imported
+from utils.startup import startup_timer, warm_up
+from utils.logging_setup import setup_logging, get_logger
+
+# Logs go through a background queue (discord.py's included) so they never block the gateway
+setup_logging()
+log = get_logger('bot')
+
+with startup_timer.phase('import_discord'):
+    import discord
+    from discord.ext import commands, tasks
+import os
 import asyncio
 import time
 from collections import defaultdict, deque
@@ -7,27 +17,49 @@ from collections import defaultdict, deque
 # Import configuration
 from config.settings import TOKEN
 
-# Railway database setup
-try:
-    from railway_db_setup import setup_railway_database
-    setup_railway_database()
-except ImportError:
-    pass  # Local development
+# Railway database setup - only on Railway, which sets these variables; elsewhere
+# (local runs, CI, the benchmarks) DATABASE_PATH or the default is used as-is
+if any(os.getenv(name) for name in ('RAILWAY_ENVIRONMENT', 'RAILWAY_PROJECT_ID', 'RAILWAY_VOLUME_MOUNT_PATH')):
+    try:
+        from railway_db_setup import setup_railway_database
+        setup_railway_database()
+    except ImportError:
+        pass
 
 # Import utilities
-from utils.database import init_database, log_server_event
-from utils.permissions import has_mod_permissions
+with startup_timer.phase('import_utils'):
+    from utils.database import init_database, log_server_event, expire_warnings
+    from utils.permissions import has_mod_permissions
+    from utils.member_index import member_index
+    from utils.guild_stats import guild_stats
+    from utils.member_cache import configure_intents, client_cache_options, note_member, forget_member, forget_guild
+    from utils.extraction_pool import extraction_pool
+    from utils import audio_cache
+    from utils import play_history
+    from utils.database import clear_play_history
+    from utils.loop_monitor import loop_monitor
+    from utils.metrics import registry, http_trace, start_server as start_metrics_server
 
-# Import command handlers
-from commands.fun import process_fun_command, handle_entertainment_commands
-from commands.search import handle_search_command, handle_private_search_command
-from commands.utility import process_utility_commands
-from commands.music import process_music_commands, initialize_music_player
-from commands.moderation import process_moderation_commands
+# Import command handlers (heavy SDKs inside them load lazily - see utils.startup)
+with startup_timer.phase('import_commands'):
+    from commands.fun import process_fun_command, handle_entertainment_commands
+    from commands.search import handle_search_command, handle_private_search_command
+    from commands.utility import process_utility_commands
+    from commands.music import process_music_commands, initialize_music_player
+    from commands.moderation import process_moderation_commands
+
+# Bot-level metrics
+messages_received = registry.counter('bot_messages_received_total', "Messages seen on the gateway")
+last_message_at = registry.gauge('bot_last_message_timestamp_seconds', "Unix time of the last message seen (activity)")
+automod_actions = registry.counter('bot_automod_actions_total', "Messages removed by auto-moderation", ('reason',))
 
 # Auto-moderation settings
 spam_tracker = defaultdict(lambda: deque(maxlen=5))
 from config.settings import BAD_WORDS as bad_words
+from config.settings import WARNING_EXPIRY_DAYS, WARNING_SWEEP_INTERVAL_MINUTES, LOG_ARCHIVE_INTERVAL_HOURS
+from config.settings import STATS_RECONCILE_MINUTES, AUDIO_CACHE_ENABLED, AUDIO_CACHE_SWEEP_HOURS
+from config.settings import VOICE_REAPER_INTERVAL_SECONDS, PLAY_HISTORY_FLUSH_SECONDS, CARD_PROGRESS_TICK_SECONDS
+from utils.log_archive import run_log_retention
 
 # Auto-moderation functions
 def is_spam(user_id, message_content):
@@ -59,13 +91,103 @@ def contains_bad_words(message_content):
     content_lower = message_content.lower()
     return any(word in content_lower for word in bad_words)
 
+@tasks.loop(minutes=WARNING_SWEEP_INTERVAL_MINUTES)
+async def warning_expiry_sweep():
+    """Periodically deactivate expired warnings"""
+    expired = await asyncio.get_running_loop().run_in_executor(None, expire_warnings, WARNING_EXPIRY_DAYS)
+    if expired:
+        log.info("⏳ Expired %s warnings", expired)
+
+@tasks.loop(hours=LOG_ARCHIVE_INTERVAL_HOURS)
+async def log_retention_sweep():
+    """Periodically roll expired server logs into the archive"""
+    archived = await asyncio.get_running_loop().run_in_executor(None, run_log_retention)
+    if archived:
+        log.info("🗄️ Archived %s server log entries", archived)
+
+@tasks.loop(minutes=STATS_RECONCILE_MINUTES)
+async def stats_reconcile():
+    """Periodically correct !stats counters against a full recount"""
+    # Staleness a little under the period: the last run's recounts finished
+    # just after its start, so they are always slightly younger than one period
+    await guild_stats.reconcile(client, STATS_RECONCILE_MINUTES * 60 * 0.9)
+
+@tasks.loop(hours=AUDIO_CACHE_SWEEP_HOURS)
+async def audio_cache_sweep():
+    """Periodically remove partial downloads and keep the audio cache within budget"""
+    removed = await audio_cache.sweep()
+    if any(removed.values()):
+        log.info("💾 Audio cache sweep: %s", removed)
+
+@tasks.loop(seconds=VOICE_REAPER_INTERVAL_SECONDS)
+async def voice_session_reaper():
+    """Periodically disconnect voice sessions that are empty or idle"""
+    music_player = getattr(client, 'music_player', None)
+    if music_player is not None:
+        await music_player.sessions.reap()
+
+@tasks.loop(seconds=PLAY_HISTORY_FLUSH_SECONDS)
+async def play_history_flush():
+    """Periodically write buffered plays to the play history in one batch"""
+    await play_history.flush()
+
+@tasks.loop(seconds=CARD_PROGRESS_TICK_SECONDS)
+async def card_progress_ticker():
+    """Single ticker refreshing the progress bar of every playing music card"""
+    music_player = getattr(client, 'music_player', None)
+    if music_player is not None:
+        await music_player.progress.tick()
+
 class MyClient(discord.Client):
+    async def setup_hook(self):
+        startup_timer.mark('setup_hook')
+        loop_monitor.start(self.loop)
+        await start_metrics_server()
+        # Database migrations run alongside login/gateway connect instead of before it
+        startup_timer.run_in_background('init_database', init_database)
+
+    async def close(self):
+        # Plays buffered since the last batch would otherwise be lost
+        try:
+            await play_history.flush()
+        except Exception as e:
+            log.warning("Final play history flush failed: %s", e)
+        await super().close()
+
     async def on_ready(self):
-        print(f'Logged on as {self.user}!')
+        first_ready = 'ready' not in startup_timer.marks
+        startup_timer.mark('ready')
+        log.info('Logged on as %s!', self.user)
         # Initialize music player
-        initialize_music_player(self)
+        self.music_player = initialize_music_player(self)
+        
+        await startup_timer.wait_for('init_database')
+        if first_ready:
+            # Heavy subsystems load after we're online rather than before
+            self.loop.create_task(warm_up())
+        
+        # Start background maintenance (on_ready fires again after reconnects)
+        if WARNING_EXPIRY_DAYS > 0 and not warning_expiry_sweep.is_running():
+            warning_expiry_sweep.start()
+        if not log_retention_sweep.is_running():
+            log_retention_sweep.start()
+        if not stats_reconcile.is_running():
+            stats_reconcile.start()
+        if AUDIO_CACHE_ENABLED and not audio_cache_sweep.is_running():
+            audio_cache_sweep.start()
+        if not voice_session_reaper.is_running():
+            voice_session_reaper.start()
+        if not play_history_flush.is_running():
+            play_history_flush.start()
+        if not card_progress_ticker.is_running():
+            card_progress_ticker.start()
 
+    @loop_monitor.event
     async def on_member_join(self, member):
+        member_index.on_member_join(member)
+        guild_stats.on_member_join(member)
+        note_member(member.guild.id, member.id)
+        
         channel = member.guild.system_channel
         if channel is not None:
             await channel.send(f'{member.display_name} has joined the server!')
@@ -75,11 +197,52 @@ class MyClient(discord.Client):
                         channel.id if channel else None, 
                         f"{member.display_name} ({member.id}) joined the server")
 
+    @loop_monitor.event
     async def on_member_remove(self, member):
+        member_index.on_member_remove(member)
+        guild_stats.on_member_remove(member)
+        forget_member(member.guild.id, member.id)
+        
         # Log the leave event
         log_server_event(member.guild.id, "member_left", member.id, None, 
                         f"{member.display_name} ({member.id}) left the server")
 
+    @loop_monitor.event
+    async def on_member_update(self, before, after):
+        member_index.on_member_update(before, after)
+
+    @loop_monitor.event
+    async def on_user_update(self, before, after):
+        member_index.on_user_update(before, after, self.get_guild)
+
+    @loop_monitor.event
+    async def on_guild_remove(self, guild):
+        member_index.on_guild_remove(guild)
+        guild_stats.on_guild_remove(guild)
+        forget_guild(guild.id)
+        extraction_pool.cancel_guild(guild.id)
+        await play_history.forget_guild(guild.id)
+        await asyncio.get_running_loop().run_in_executor(None, clear_play_history, guild.id)
+
+    @loop_monitor.event
+    async def on_voice_state_update(self, member, before, after):
+        music_player = getattr(self, 'music_player', None)
+        if music_player is not None:
+            await music_player.sessions.on_voice_state_update(member, before, after)
+
+    @loop_monitor.event
+    async def on_presence_update(self, before, after):
+        guild_stats.on_presence_update(before, after)
+
+    @loop_monitor.event
+    async def on_guild_channel_create(self, channel):
+        guild_stats.on_guild_channel_create(channel)
+
+    @loop_monitor.event
+    async def on_guild_channel_delete(self, channel):
+        guild_stats.on_guild_channel_delete(channel)
+
+    @loop_monitor.event
     async def on_message_edit(self, before, after):
         if before.author.bot:
             return
@@ -89,6 +252,7 @@ class MyClient(discord.Client):
             log_server_event(after.guild.id, "message_edited", after.author.id, after.channel.id,
                             f"Message edited in #{after.channel.name}")
 
+    @loop_monitor.event
     async def on_message_delete(self, message):
         if message.author.bot:
             return
@@ -97,16 +261,16 @@ class MyClient(discord.Client):
         log_server_event(message.guild.id, "message_deleted", message.author.id, message.channel.id,
                         f"Message deleted in #{message.channel.name}: {message.content[:100]}...")
 
+    @loop_monitor.event
     async def on_message(self, message):
+        await startup_timer.wait_for('init_database')
         if message.author == self.user:
             return
         
-        # Update activity for auto-stop functionality
-        try:
-            import requests
-            requests.post('http://localhost:8080/activity', timeout=1)
-        except:
-            pass  # Health server might not be running
+        guild_stats.on_message(message)
+        # Activity for auto-stop / health checks is read from /metrics
+        messages_received.inc()
+        last_message_at.set(time.time())
         
         # Process commands FIRST (before spam detection)
         if message.guild:
@@ -169,12 +333,10 @@ class MyClient(discord.Client):
                         color=0xff0000
                     )
                     embed.add_field(name="Action", value="Message deleted", inline=False)
-                    warning_msg = await message.channel.send(embed=embed)
-                    
-                    # Auto-delete the warning after 5 seconds
-                    await asyncio.sleep(5)
-                    await warning_msg.delete()
+                    # Auto-delete the warning after 5 seconds (scheduled, so the handler doesn't wait)
+                    await message.channel.send(embed=embed, delete_after=5)
                     
+                    automod_actions.labels('spam').inc()
                     log_server_event(message.guild.id, "spam_detected", message.author.id, message.channel.id, 
                                    "Spam message auto-deleted")
                     return
@@ -193,12 +355,10 @@ class MyClient(discord.Client):
                         color=0xff0000
                     )
                     embed.add_field(name="Action", value="Message deleted", inline=False)
-                    warning_msg = await message.channel.send(embed=embed)
-                    
-                    # Auto-delete the warning after 5 seconds
-                    await asyncio.sleep(5)
-                    await warning_msg.delete()
+                    # Auto-delete the warning after 5 seconds (scheduled, so the handler doesn't wait)
+                    await message.channel.send(embed=embed, delete_after=5)
                     
+                    automod_actions.labels('bad_words').inc()
                     log_server_event(message.guild.id, "inappropriate_content", message.author.id, message.channel.id, 
                                    "Inappropriate content auto-deleted")
                     return
@@ -243,7 +403,7 @@ async def send_help_message(message):
     # Music Commands (Separate Message)
     embed2 = discord.Embed(title="🎵 Music Commands", color=0x1DB954)
     embed2.add_field(name="⚠️ Important Note", value="**You must be in a voice channel to use music commands!**", inline=False)
-    embed2.add_field(name="🎵 Music Player", value="`!music` - Interactive music player\n`!play <song>` - Play music\n`!search <song>` - Quick search", inline=True)
+    embed2.add_field(name="🎵 Music Player", value="`!music` - Interactive music player\n`!play <song>` - Play music\n`!search <song>` - Quick search\n`!recent` - Recently played", inline=True)
     embed2.add_field(name="🎵 Music Controls", value="`!pause` - Pause music\n`!resume` - Resume music\n`!skip` - Skip song\n`!stop` - Stop music\n`!queue` - Show queue\n`!volume <0-100>` - Set volume\n`!loop` - Toggle loop\n`!leave` - Leave voice channel\n`!nowplaying` - Current song", inline=True)
     embed2.set_footer(text="Join a voice channel to start using music commands! 🎧")
     
@@ -260,10 +420,10 @@ async def send_admin_help_message(message):
     embed1 = discord.Embed(title="🔒 Admin Commands Help - Part 1", color=0xe74c3c)
     embed1.add_field(name="👥 User Management", value="`!getid @user` - Get user ID\n`!warn @user <reason>` - Issue warning\n`!kick @user <reason>` - Kick user\n`!ban @user <reason>` - Ban user\n`!warnings @user` - Check warnings", inline=False)
     embed1.add_field(name="💬 DM Commands", value="`!dm @user message` - Send DM\n`!dmid 123456789 message` - DM by ID", inline=False)
-    embed1.add_field(name="📊 Server Management", value="`!poll <question>` - Create poll\n`!announce <message>` - Server announcement\n`!logs` - View server logs", inline=False)
+    embed1.add_field(name="📊 Server Management", value="`!poll <question>` - Create poll\n`!announce <message>` - Server announcement\n`!logs [type:] [user:] [channel:] [since:] [until:]` - Browse server logs\n`!logretention [days]` - Log retention", inline=False)
     
     embed2 = discord.Embed(title="🔒 Admin Commands Help - Part 2", color=0x8e44ad)
-    embed2.add_field(name="🔧 Bot Management", value="`!ahelp` - Show this admin help\n`!stats` - Detailed server statistics", inline=False)
+    embed2.add_field(name="🔧 Bot Management", value="`!ahelp` - Show this admin help\n`!stats` - Detailed server statistics\n`!memreport` - Member cache memory report\n`!poolstats` - yt-dlp worker pool status\n`!voicereport` - Voice session resources\n`!loopreport` - Event loop lag and slow handlers\n`!profile [seconds]` - Sample a CPU profile", inline=False)
     embed2.add_field(name="📈 Monitoring", value="**Activity Logging** - Tracks all server events\n**Auto-Moderation** - Spam and content filtering\n**Member Tracking** - Join/leave events", inline=False)
     embed2.add_field(name="⚠️ Important Notes", value="• Admin commands require proper permissions\n• All actions are logged for security\n• Use moderation commands responsibly", inline=False)
     embed2.set_footer(text="Admin commands - Use responsibly! 🛡️")
@@ -271,15 +431,14 @@ async def send_admin_help_message(message):
     await message.channel.send(embed=embed1)
     await message.channel.send(embed=embed2)
 
-# Initialize database
-init_database()
-
 # Setup Discord intents
 intents = discord.Intents.default()
 intents.message_content = True
+configure_intents(intents)
 
-# Create and run client
-client = MyClient(intents=intents)
+# Create and run client (member caching follows MEMBER_CACHE_POLICY; REST calls are counted for /metrics)
+client = MyClient(intents=intents, http_trace=http_trace(), **client_cache_options(intents))
+startup_timer.mark('module_loaded')
 
 if __name__ == "__main__":
-    client.run(token=TOKEN)
+    client.run(token=TOKEN, log_handler=None)  # Logging is already set up
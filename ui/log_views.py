@@ -0,0 +1,138 @@
+import asyncio
+import discord
+from discord.ui import View, Button
+from discord import ButtonStyle
+from utils.database import get_server_logs_page
+from utils.log_archive import get_archived_logs_page, has_archived_logs
+
+LOGS_PAGE_SIZE = 10
+
+# Event type -> emoji used in the log viewer
+EVENT_ICONS = {
+    'member_joined': '📥',
+    'member_left': '📤',
+    'message_edited': '✏️',
+    'message_deleted': '🗑️',
+    'warning_issued': '⚠️',
+    'user_kicked': '👢',
+    'user_banned': '🔨',
+    'spam_detected': '🚫',
+    'inappropriate_content': '🚫',
+    'poll_created': '📊',
+    'announcement_made': '📢',
+}
+
+class LogsPaginationView(View):
+    """Button-driven keyset pagination over server_logs.
+
+    The view keeps a stack of page cursors instead of offsets, so moving
+    forward or back is always a single indexed range query. Once the live
+    table has no older matches, the next page continues into the archive,
+    a bounded number of day segments at a time.
+    """
+
+    def __init__(self, guild_id, author_id, filters, page_size=LOGS_PAGE_SIZE):
+        super().__init__(timeout=120)
+        self.guild_id = guild_id
+        self.author_id = author_id
+        self.filters = filters
+        self.page_size = page_size
+        self.cursors = [(None, False)]  # (cursor, in archive) each visited page started from
+        self.rows = []
+        self.has_older = False
+        self.older_cursor = None  # Where the next older page starts
+        self.message = None
+
+    def fetch_page(self):
+        """Read the page for the current cursor (blocking; one extra row detects a next page)"""
+        cursor, archived = self.cursors[-1]
+        if archived:
+            rows, resume = get_archived_logs_page(self.guild_id, before=cursor, limit=self.page_size + 1,
+                                                  **self.filters)
+        else:
+            rows = get_server_logs_page(self.guild_id, before=cursor, limit=self.page_size + 1, **self.filters)
+            resume = None
+        self.rows = rows[:self.page_size]
+        last = (self.rows[-1][5], self.rows[-1][0]) if self.rows else cursor
+        if len(rows) > self.page_size:
+            self.older_cursor = (last, archived)
+        elif resume is not None:
+            self.older_cursor = (resume, True)
+        elif not archived and has_archived_logs(self.guild_id, self.filters.get('since'),
+                                                self.filters.get('until'), last):
+            # Live matches ran out; the archive is only opened if the user asks for older
+            self.older_cursor = (last, True)
+        else:
+            self.older_cursor = None
+        self.has_older = self.older_cursor is not None
+        return self.rows
+
+    async def load_page(self):
+        """Fetch the current page in the executor and update the buttons"""
+        await asyncio.get_running_loop().run_in_executor(None, self.fetch_page)
+        self.newer_button.disabled = len(self.cursors) <= 1
+        self.older_button.disabled = not self.has_older
+        return self.rows
+
+    def create_embed(self):
+        """Create the embed for the current page"""
+        embed = discord.Embed(title="📋 Server Logs", color=0x9b59b6)
+
+        active_filters = []
+        if self.filters.get('event_type'):
+            active_filters.append(f"type: `{self.filters['event_type']}`")
+        if self.filters.get('user_id'):
+            active_filters.append(f"user: <@{self.filters['user_id']}>")
+        if self.filters.get('channel_id'):
+            active_filters.append(f"channel: <#{self.filters['channel_id']}>")
+        if self.filters.get('since'):
+            active_filters.append(f"since: `{self.filters['since']}`")
+        if self.filters.get('until'):
+            active_filters.append(f"before: `{self.filters['until']}`")  # Exclusive bound
+        if active_filters:
+            embed.description = "**Filters:** " + " • ".join(active_filters)
+
+        if not self.rows:
+            embed.add_field(name="", value="*No log entries found*", inline=False)
+
+        for log_id, event_type, user_id, channel_id, description, timestamp in self.rows:
+            icon = EVENT_ICONS.get(event_type, '📝')
+            value = description or "No description"
+            if len(value) > 200:
+                value = value[:197] + "..."
+            if user_id:
+                value += f"\n👤 <@{user_id}>"
+            if channel_id:
+                value += f" • 💬 <#{channel_id}>"
+            embed.add_field(name=f"{icon} {event_type} • {timestamp}", value=value, inline=False)
+
+        archived = " • From the archive" if self.cursors[-1][1] else ""
+        embed.set_footer(text=f"Page {len(self.cursors)}{archived} • Times are UTC")
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("❌ Only the moderator who ran `!logs` can page through it.", ephemeral=True)
+            return False
+        return True
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(view=None)
+            except:
+                pass  # Ignore errors if message was deleted
+
+    @discord.ui.button(label='◀️ Newer', style=ButtonStyle.secondary)
+    async def newer_button(self, interaction: discord.Interaction, button: Button):
+        if len(self.cursors) > 1:
+            self.cursors.pop()
+        await self.load_page()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
+
+    @discord.ui.button(label='Older ▶️', style=ButtonStyle.secondary)
+    async def older_button(self, interaction: discord.Interaction, button: Button):
+        if self.has_older:
+            self.cursors.append(self.older_cursor)
+        await self.load_page()
+        await interaction.response.edit_message(embed=self.create_embed(), view=self)
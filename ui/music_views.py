@@ -4,7 +4,18 @@ from discord import ButtonStyle
 from discord.errors import HTTPException
 import asyncio
 import time
-from utils.music_sources import YTDLSource, SpotifyMusicSource
+from utils.music_sources import YTDLSource
+from utils.playback_progress import progress_bar
+from utils.search_orchestrator import hedged_search
+from utils import play_history
+from config.settings import PLAY_HISTORY_RECENT_LIMIT
+from utils.track_matcher import resolve_audio_url, forget_spotify_match, is_gone_video_error, spotify_track_id
+from utils.logging_setup import get_logger
+from utils.metrics import registry
+
+log = get_logger('ui')
+
+_send_failures = registry.counter('bot_send_failures_total', "Messages given up on after retries")
 
 # Rate limiting cooldown tracking
 _last_error_message = {}
@@ -20,7 +31,7 @@ async def safe_send_message(interaction, message, ephemeral=True, max_retries=3)
     
     if message.startswith("❌") and user_id in _last_error_message:
         if current_time - _last_error_message[user_id] < _error_cooldown:
-            print(f"Rate limiting error message for user {user_id}")
+            log.debug("Rate limiting error message for user %s", user_id)
             return False
     
     # Update cooldown for error messages
@@ -35,107 +46,121 @@ async def safe_send_message(interaction, message, ephemeral=True, max_retries=3)
         except HTTPException as e:
             if e.status == 429:  # Rate limited
                 retry_after = e.retry_after if hasattr(e, 'retry_after') else 1.0
-                print(f"Rate limited, waiting {retry_after}s (attempt {attempt + 1}/{max_retries})")
+                log.warning("Rate limited, waiting %ss (attempt %s/%s)", retry_after, attempt + 1, max_retries)
                 await asyncio.sleep(retry_after)
             else:
-                print(f"HTTP error {e.status}: {e}")
+                log.warning("HTTP error %s: %s", e.status, e)
                 break
         except Exception as e:
-            print(f"Error sending message: {e}")
+            log.warning("Error sending message: %s", e)
             break
     
-    print(f"Failed to send message after {max_retries} attempts")
+    _send_failures.inc()
+    log.warning("Failed to send message after %s attempts", max_retries)
     return False
 
+def create_card_embed(music_player, guild_id):
+    """Build the Spotify-like music card embed from the guild's current player state"""
+    song_info = music_player.current_songs.get(guild_id)
+    
+    if song_info:
+        # Playing state
+        embed = discord.Embed(color=0x1DB954)  # Spotify green
+        
+        # Main song info - compact like Spotify
+        title = song_info.get('title', 'Unknown Title')
+        if len(title) > 50:
+            title = title[:47] + "..."
+        
+        uploader = song_info.get('uploader', 'Unknown Artist')
+        if len(uploader) > 30:
+            uploader = uploader[:27] + "..."
+        
+        embed.description = f"**{title}**\n{uploader}"
+        
+        # Status bar
+        volume = int(music_player.volumes[guild_id] * 100)
+        is_paused = False
+        if guild_id in music_player.voice_clients:
+            voice_client = music_player.voice_clients[guild_id]
+            is_paused = voice_client.is_paused()
+        
+        status_icon = "⏸️" if is_paused else "▶️"
+        loop_icon = " 🔁" if music_player.loop_modes[guild_id] else ""
+        queue_count = len(music_player.queues[guild_id])
+        
+        status_line = f"{status_icon} **{song_info.get('duration', 'Live')}** • 🔊 {volume}%{loop_icon}"
+        if queue_count > 0:
+            status_line += f" • 📋 {queue_count} in queue"
+        
+        embed.add_field(name="", value=status_line, inline=False)
+        
+        # Live position, refreshed by the shared progress ticker
+        position = music_player.progress.position(guild_id)
+        if position is not None:
+            embed.add_field(name="", value=progress_bar(position, song_info.get('duration_seconds')), inline=False)
+        
+        # Thumbnail
+        if song_info.get('thumbnail'):
+            embed.set_thumbnail(url=song_info['thumbnail'])
+        
+    else:
+        # Idle state
+        embed = discord.Embed(
+            title="🎵 Music Player",
+            description="**Ready to play music**\nClick 🎵 to search for songs",
+            color=0x36393F  # Discord dark theme color
+        )
+        embed.add_field(name="", value="🎧 Join a voice channel and start listening", inline=False)
+    
+    return embed
+
 class SpotifyMusicCard(View):
-    def __init__(self, music_player, guild_id):
+    """Controls for every music card ever posted.
+
+    One instance is registered with the client at startup (add_view), so
+    cards keep working across restarts. Buttons are routed by custom_id and
+    resolve the guild from the interaction; the view itself holds no
+    per-guild state or message references.
+    """
+
+    def __init__(self, music_player):
         super().__init__(timeout=None)
         self.music_player = music_player
-        self.guild_id = guild_id
-        self.message = None  # Will store the message to edit
 
-    async def create_spotify_card(self, song_info=None):
-        """Create a Spotify-like music card"""
-        if song_info is None and self.guild_id in self.music_player.current_songs:
-            song_info = self.music_player.current_songs[self.guild_id]
-        
-        if song_info:
-            # Playing state
-            embed = discord.Embed(color=0x1DB954)  # Spotify green
-            
-            # Main song info - compact like Spotify
-            title = song_info.get('title', 'Unknown Title')
-            if len(title) > 50:
-                title = title[:47] + "..."
-            
-            uploader = song_info.get('uploader', 'Unknown Artist')
-            if len(uploader) > 30:
-                uploader = uploader[:27] + "..."
-            
-            embed.description = f"**{title}**\n{uploader}"
-            
-            # Status bar
-            volume = int(self.music_player.volumes[self.guild_id] * 100)
-            is_paused = False
-            if self.guild_id in self.music_player.voice_clients:
-                voice_client = self.music_player.voice_clients[self.guild_id]
-                is_paused = voice_client.is_paused()
-            
-            status_icon = "⏸️" if is_paused else "▶️"
-            loop_icon = " 🔁" if self.music_player.loop_modes[self.guild_id] else ""
-            queue_count = len(self.music_player.queues[self.guild_id])
-            
-            status_line = f"{status_icon} **{song_info.get('duration', 'Live')}** • 🔊 {volume}%{loop_icon}"
-            if queue_count > 0:
-                status_line += f" • 📋 {queue_count} in queue"
-            
-            embed.add_field(name="", value=status_line, inline=False)
-            
-            # Thumbnail
-            if song_info.get('thumbnail'):
-                embed.set_thumbnail(url=song_info['thumbnail'])
-            
-        else:
-            # Idle state
-            embed = discord.Embed(
-                title="🎵 Music Player",
-                description="**Ready to play music**\nClick 🎵 to search for songs",
-                color=0x36393F  # Discord dark theme color
-            )
-            embed.add_field(name="", value="🎧 Join a voice channel and start listening", inline=False)
-        
-        return embed
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.guild is None:
+            return False
+        # The card someone used last is the one kept up to date
+        self.music_player.music_cards[interaction.guild.id] = (interaction.channel_id, interaction.message.id)
+        return True
 
-    async def update_card(self):
-        """Update the music card with current info"""
-        if self.message:
-            try:
-                embed = await self.create_spotify_card()
-                await self.message.edit(embed=embed, view=self)
-            except:
-                pass  # Ignore errors if message was deleted
+    async def refresh(self, interaction):
+        """Redraw the card the interaction came from as the response to it"""
+        await interaction.response.edit_message(embed=create_card_embed(self.music_player, interaction.guild.id))
 
     @discord.ui.button(label='⏯️', style=ButtonStyle.secondary, custom_id='pause_resume')
     async def pause_resume_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
+        guild_id = interaction.guild.id
+        if guild_id in self.music_player.voice_clients:
+            voice_client = self.music_player.voice_clients[guild_id]
             if voice_client.is_playing():
-                voice_client.pause()
+                self.music_player.pause(guild_id)
             elif voice_client.is_paused():
-                voice_client.resume()
+                self.music_player.resume(guild_id)
             else:
                 await interaction.response.send_message("❌ Nothing is currently playing.", ephemeral=True)
                 return
             
-            await interaction.response.defer()
-            await self.update_card()
+            await self.refresh(interaction)
         else:
             await interaction.response.send_message("❌ Bot is not connected to a voice channel.", ephemeral=True)
 
     @discord.ui.button(label='⏭️', style=ButtonStyle.secondary, custom_id='skip')
     async def skip_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
+        guild_id = interaction.guild.id
+        if guild_id in self.music_player.voice_clients:
+            voice_client = self.music_player.voice_clients[guild_id]
             if voice_client.is_playing():
                 voice_client.stop()  # This will trigger play_next
                 await interaction.response.defer()
@@ -147,31 +172,31 @@ class SpotifyMusicCard(View):
 
     @discord.ui.button(label='⏹️', style=ButtonStyle.danger, custom_id='stop')
     async def stop_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
+        guild_id = interaction.guild.id
+        if guild_id in self.music_player.voice_clients:
+            voice_client = self.music_player.voice_clients[guild_id]
+            self.music_player.queues[guild_id].clear()
             voice_client.stop()
-            self.music_player.queues[self.guild_id].clear()
-            if self.guild_id in self.music_player.current_songs:
-                del self.music_player.current_songs[self.guild_id]
+            self.music_player.current_songs.pop(guild_id, None)
             
-            await interaction.response.defer()
-            await self.update_card()
+            await self.refresh(interaction)
         else:
             await interaction.response.send_message("❌ Bot is not connected to a voice channel.", ephemeral=True)
 
     @discord.ui.button(label='🔁', style=ButtonStyle.secondary, custom_id='loop')
     async def loop_button(self, interaction: discord.Interaction, button: Button):
-        self.music_player.loop_modes[self.guild_id] = not self.music_player.loop_modes[self.guild_id]
-        await interaction.response.defer()
-        await self.update_card()
+        guild_id = interaction.guild.id
+        self.music_player.loop_modes[guild_id] = not self.music_player.loop_modes[guild_id]
+        await self.refresh(interaction)
 
     @discord.ui.button(label='📋', style=ButtonStyle.primary, custom_id='queue')
     async def queue_button(self, interaction: discord.Interaction, button: Button):
+        guild_id = interaction.guild.id
         # Create a clean queue display
         embed = discord.Embed(title="📋 Queue", color=0x1DB954)
         
-        queue = self.music_player.queues[self.guild_id]
-        current = self.music_player.current_songs.get(self.guild_id)
+        queue = self.music_player.queues.get(guild_id, [])
+        current = self.music_player.current_songs.get(guild_id)
         
         if current:
             title = current['title'][:40] + "..." if len(current['title']) > 40 else current['title']
@@ -190,13 +215,14 @@ class SpotifyMusicCard(View):
         else:
             embed.add_field(name="⏭️ Up Next", value="*Queue is empty*", inline=False)
         
-        view = QueueManagementView(self.music_player, self.guild_id)
+        view = QueueManagementView(self.music_player, guild_id)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
     @discord.ui.button(label='🔊', style=ButtonStyle.secondary, custom_id='volume')
     async def volume_button(self, interaction: discord.Interaction, button: Button):
-        current_vol = int(self.music_player.volumes[self.guild_id] * 100)
-        view = VolumeControlView(self.music_player, self.guild_id, current_vol, self)
+        guild_id = interaction.guild.id
+        current_vol = int(self.music_player.volumes[guild_id] * 100)
+        view = VolumeControlView(self.music_player, guild_id, current_vol)
         embed = discord.Embed(title="🔊 Volume", description=f"Current: **{current_vol}%**", color=0x1DB954)
         await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
 
@@ -211,30 +237,40 @@ class SpotifyMusicCard(View):
                 self.channel = interaction.channel
         
         ctx = MockContext(interaction)
-        modal = FastMusicSearchModal(self.music_player, ctx, self)
+        modal = FastMusicSearchModal(self.music_player, ctx)
         await interaction.response.send_modal(modal)
 
+    @discord.ui.button(label='🕘', style=ButtonStyle.secondary, custom_id='recent')
+    async def recent_button(self, interaction: discord.Interaction, button: Button):
+        guild_id = interaction.guild.id
+        tracks = await play_history.recent(guild_id, PLAY_HISTORY_RECENT_LIMIT)
+        if not tracks:
+            await interaction.response.send_message("📭 Nothing has been played in this server yet.", ephemeral=True)
+            return
+        view = RecentTracksView(self.music_player, guild_id, tracks)
+        await interaction.response.send_message("🕘 **Recently played** - pick one to queue it again", view=view, ephemeral=True)
+
     @discord.ui.button(label='👋', style=ButtonStyle.danger, custom_id='disconnect')
     async def disconnect_button(self, interaction: discord.Interaction, button: Button):
-        # Clear everything and disconnect
-        self.music_player.queues[self.guild_id].clear()
-        if self.guild_id in self.music_player.current_songs:
-            del self.music_player.current_songs[self.guild_id]
-        
-        # Disconnect from voice channel
-        if self.guild_id in self.music_player.voice_clients:
-            await self.music_player.voice_clients[self.guild_id].disconnect()
-            del self.music_player.voice_clients[self.guild_id]
-        
+        # Clear everything, disconnect and free the guild's music state (redraws the card)
         await interaction.response.defer()
-        await self.update_card()
+        await self.music_player.disconnect(interaction.guild.id)
+
+def card_buttons(music_player):
+    """Buttons to send with a new card.
+
+    The copy is stopped so discord.py doesn't keep it around per message;
+    clicks are dispatched by custom_id to the instance registered at startup.
+    """
+    view = SpotifyMusicCard(music_player)
+    view.stop()
+    return view
 
 class FastMusicSearchModal(Modal, title='🎵 Add Music'):
-    def __init__(self, music_player, ctx, music_card):
+    def __init__(self, music_player, ctx):
         super().__init__()
         self.music_player = music_player
         self.ctx = ctx
-        self.music_card = music_card
 
     search_query = TextInput(
         label='Song or Artist',
@@ -261,11 +297,7 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
         if query.startswith(('http://', 'https://')) and ('youtube.com' in query or 'youtu.be' in query):
             # Handle direct YouTube URL
             try:
-                import yt_dlp
-                ytdl = yt_dlp.YoutubeDL({'quiet': True, 'no_warnings': True})
-                data = await asyncio.get_event_loop().run_in_executor(None, lambda: ytdl.extract_info(query, download=False))
-                if 'entries' in data:
-                    data = data['entries'][0]
+                data = await YTDLSource.fetch_info(query, guild_id=interaction.guild.id)
                 
                 title = data.get('title', 'Unknown Title')
                 duration = data.get('duration', 0)
@@ -279,6 +311,7 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
                     'url': query,
                     'title': title,
                     'duration': duration_str,
+                    'duration_seconds': duration,
                     'thumbnail': thumbnail,
                     'requester': interaction.user.display_name,
                     'uploader': uploader
@@ -289,17 +322,15 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
                     # Start playing immediately
                     self.music_player.current_songs[interaction.guild.id] = song_info
                     try:
-                        player = await YTDLSource.from_url(query, stream=True)
-                        player.volume = self.music_player.volumes[interaction.guild.id]
-                        voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(self.music_player.play_next(interaction.guild.id), self.music_player.bot.loop))
+                        player = await YTDLSource.from_url(query, stream=True, guild_id=interaction.guild.id,
+                                                           volume=self.music_player.volumes[interaction.guild.id])
+                        self.music_player.start_playback(interaction.guild.id, voice_client, player, song_info)
                         
-                        await self.music_card.update_card()
+                        await self.music_player.update_card(interaction.guild.id)
                         await interaction.followup.send(f"▶️ **Now playing:** {title} by {uploader}", ephemeral=True)
                     except Exception as e:
                         error_msg = f"❌ Error playing song: {type(e).__name__}: {str(e)}"
-                        print(f"Music search playback error: {error_msg}")
-                        import traceback
-                        traceback.print_exc()
+                        log.exception("Music search playback error: %s", error_msg, extra={'guild_id': interaction.guild.id})
                         await interaction.followup.send(error_msg, ephemeral=True)
                 else:
                     # Add to queue
@@ -307,18 +338,24 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
                     position = len(self.music_player.queues[interaction.guild.id])
                     
                     await interaction.followup.send(f"📋 **Added to queue #{position}:** {title} by {uploader}", ephemeral=True)
-                    await self.music_card.update_card()
+                    await self.music_player.update_card(interaction.guild.id)
                     
             except Exception as e:
                 await safe_send_message(interaction, f"❌ Error loading YouTube URL: {str(e)}", ephemeral=True)
             return
 
-        # Fast Spotify search - always use first result
-        url, title, duration, thumbnail, artist, popularity = await SpotifyMusicSource.search_spotify(query)
-        if not url:
-            await safe_send_message(interaction, "❌ No results found on Spotify.", ephemeral=True)
+        # Search Spotify and YouTube at once - Spotify's metadata is preferred,
+        # but a fast YouTube hit wins if Spotify is slow or down
+        result = await hedged_search(query, prefer='spotify', guild_id=interaction.guild.id)
+        if not result:
+            await safe_send_message(interaction, "❌ No results found.", ephemeral=True)
             return
 
+        url = result['url']
+        title = result['title']
+        duration = result['duration']
+        artist = result['artist']
+
         # Format duration
         duration_str = f"{duration//60}:{duration%60:02d}" if duration else "Live"
 
@@ -326,35 +363,42 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
             'url': url,
             'title': title,
             'duration': duration_str,
-            'thumbnail': thumbnail,
+            'duration_seconds': duration,
+            'thumbnail': result['thumbnail'],
             'requester': interaction.user.display_name,
-            'uploader': artist,
-            'spotify_url': url,
-            'popularity': popularity
+            'uploader': artist
         }
+        if result['provider'] == 'spotify':
+            song_info.update({
+                'spotify_url': url,
+                'spotify_id': spotify_track_id(url),
+                'popularity': result['popularity']
+            })
 
         # Play audio using YouTube with Spotify metadata
         if not voice_client.is_playing():
             # Start playing immediately
             self.music_player.current_songs[interaction.guild.id] = song_info
             try:
-                # Search YouTube for audio using Spotify metadata
-                search_query = f"{title} {artist}"
-                youtube_url = await YTDLSource.search_youtube_for_audio(search_query)
+                # Match the Spotify track to a YouTube video (stored after the first match)
+                youtube_url = await resolve_audio_url(song_info, guild_id=interaction.guild.id)
                 if youtube_url:
-                    player = await YTDLSource.from_url(youtube_url, stream=True)
-                    player.volume = self.music_player.volumes[interaction.guild.id]
-                    voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(self.music_player.play_next(interaction.guild.id), self.music_player.bot.loop))
+                    try:
+                        player = await YTDLSource.from_url(youtube_url, stream=True, guild_id=interaction.guild.id,
+                                                           volume=self.music_player.volumes[interaction.guild.id])
+                    except Exception as e:
+                        if song_info.get('spotify_id') and is_gone_video_error(e):
+                            await forget_spotify_match(song_info['spotify_id'])
+                        raise
+                    self.music_player.start_playback(interaction.guild.id, voice_client, player, song_info)
                     
-                    await self.music_card.update_card()
+                    await self.music_player.update_card(interaction.guild.id)
                     await safe_send_message(interaction, f"▶️ **Now playing:** {title} by {artist}", ephemeral=True)
                 else:
                     await safe_send_message(interaction, f"❌ Couldn't find audio for: {title}", ephemeral=True)
             except Exception as e:
                 error_msg = f"❌ Error playing song: {type(e).__name__}: {str(e)}"
-                print(f"Music modal playback error: {error_msg}")
-                import traceback
-                traceback.print_exc()
+                log.exception("Music modal playback error: %s", error_msg, extra={'guild_id': interaction.guild.id})
                 await safe_send_message(interaction, error_msg, ephemeral=True)
         else:
             # Add to queue
@@ -365,15 +409,14 @@ class FastMusicSearchModal(Modal, title='🎵 Add Music'):
             await safe_send_message(interaction, f"📋 **Added to queue #{position}:** {title} by {artist}", ephemeral=True)
             
             # Update the music card to show new queue count
-            await self.music_card.update_card()
+            await self.music_player.update_card(interaction.guild.id)
 
 class VolumeControlView(View):
-    def __init__(self, music_player, guild_id, current_volume, music_card):
+    def __init__(self, music_player, guild_id, current_volume):
         super().__init__(timeout=60)
         self.music_player = music_player
         self.guild_id = guild_id
         self.current_volume = current_volume
-        self.music_card = music_card
 
     @discord.ui.button(label='🔇', style=ButtonStyle.secondary, custom_id='mute')
     async def mute_button(self, interaction: discord.Interaction, button: Button):
@@ -385,7 +428,7 @@ class VolumeControlView(View):
         
         embed = discord.Embed(title="🔇 Muted", description="Volume: **0%**", color=0x95a5a6)
         await interaction.response.edit_message(embed=embed)
-        await self.music_card.update_card()
+        await self.music_player.update_card(self.guild_id)
 
     @discord.ui.button(label='25%', style=ButtonStyle.secondary, custom_id='low')
     async def low_volume_button(self, interaction: discord.Interaction, button: Button):
@@ -412,7 +455,7 @@ class VolumeControlView(View):
         
         embed = discord.Embed(title="🔊 Volume", description=f"Volume: **{display}**", color=0x1DB954)
         await interaction.response.edit_message(embed=embed)
-        await self.music_card.update_card()
+        await self.music_player.update_card(self.guild_id)
 
 class QueueManagementView(View):
     def __init__(self, music_player, guild_id):
@@ -436,109 +479,49 @@ class QueueManagementView(View):
         else:
             await interaction.response.send_message("❌ Need at least 2 songs in queue to shuffle.", ephemeral=True)
 
-class MusicPlayerView(View):
-    def __init__(self, music_player, guild_id):
-        super().__init__(timeout=None)
+class RecentTracksView(View):
+    """Pick a recently played track to queue again, without searching"""
+
+    def __init__(self, music_player, guild_id, tracks):
+        super().__init__(timeout=60)
         self.music_player = music_player
         self.guild_id = guild_id
-
-    async def create_now_playing_embed(self, song_info=None):
-        """Create now playing embed"""
-        if song_info is None and self.guild_id in self.music_player.current_songs:
-            song_info = self.music_player.current_songs[self.guild_id]
-        
-        if song_info:
-            embed = discord.Embed(title="🎵 Now Playing", color=0x00ff00)
-            embed.add_field(name="Title", value=song_info['title'], inline=False)
-            embed.add_field(name="Duration", value=song_info['duration'], inline=True)
-            embed.add_field(name="Requested by", value=song_info['requester'], inline=True)
-            
-            # Add loop status
-            loop_status = "🔁 Loop: ON" if self.music_player.loop_modes[self.guild_id] else "➡️ Loop: OFF"
-            embed.add_field(name="Status", value=loop_status, inline=True)
-            
-            if song_info.get('thumbnail'):
-                embed.set_thumbnail(url=song_info['thumbnail'])
-            
-            return embed
-        else:
-            embed = discord.Embed(
-                title="🎵 Music Player",
-                description="**Ready to play music**\nClick 🎵 to search for songs",
-                color=0x36393F
+        self.tracks = tracks
+        options = [
+            discord.SelectOption(
+                label=(track['title'] or 'Unknown Title')[:100],
+                description=f"{track['artist'] or 'Unknown'} · played {track['play_count']}×"[:100],
+                value=str(index)
             )
-            return embed
+            for index, track in enumerate(tracks[:25])
+        ]
+        select = discord.ui.Select(placeholder='🕘 Recently played...', options=options)
+        select.callback = self.track_selected
+        self.add_item(select)
 
-    @discord.ui.button(label='⏯️', style=ButtonStyle.secondary, custom_id='pause_resume')
-    async def pause_resume_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
-            if voice_client.is_playing():
-                voice_client.pause()
-                await interaction.response.send_message("⏸️ Music paused.", ephemeral=True)
-            elif voice_client.is_paused():
-                voice_client.resume()
-                await interaction.response.send_message("▶️ Music resumed.", ephemeral=True)
-            else:
-                await interaction.response.send_message("❌ Nothing is currently playing.", ephemeral=True)
-        else:
-            await interaction.response.send_message("❌ Bot is not connected to a voice channel.", ephemeral=True)
+    async def track_selected(self, interaction: discord.Interaction):
+        track = self.tracks[int(interaction.data['values'][0])]
 
-    @discord.ui.button(label='⏭️', style=ButtonStyle.secondary, custom_id='skip')
-    async def skip_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
-            if voice_client.is_playing():
-                voice_client.stop()  # This will trigger play_next
-                await interaction.response.send_message("⏭️ Skipped current song.", ephemeral=True)
-            else:
-                await interaction.response.send_message("❌ Nothing is currently playing.", ephemeral=True)
-        else:
-            await interaction.response.send_message("❌ Bot is not connected to a voice channel.", ephemeral=True)
-
-    @discord.ui.button(label='⏹️', style=ButtonStyle.danger, custom_id='stop')
-    async def stop_button(self, interaction: discord.Interaction, button: Button):
-        if self.guild_id in self.music_player.voice_clients:
-            voice_client = self.music_player.voice_clients[self.guild_id]
-            voice_client.stop()
-            self.music_player.queues[self.guild_id].clear()
-            if self.guild_id in self.music_player.current_songs:
-                del self.music_player.current_songs[self.guild_id]
-            
-            await interaction.response.send_message("⏹️ Music stopped and queue cleared.", ephemeral=True)
-        else:
-            await interaction.response.send_message("❌ Bot is not connected to a voice channel.", ephemeral=True)
+        class MockContext:
+            def __init__(self, interaction):
+                self.interaction = interaction
+                self.author = interaction.user
+                self.guild = interaction.guild
+                self.channel = interaction.channel
 
-    @discord.ui.button(label='🔁', style=ButtonStyle.secondary, custom_id='loop')
-    async def loop_button(self, interaction: discord.Interaction, button: Button):
-        self.music_player.loop_modes[self.guild_id] = not self.music_player.loop_modes[self.guild_id]
-        status = "enabled" if self.music_player.loop_modes[self.guild_id] else "disabled"
-        emoji = "🔁" if self.music_player.loop_modes[self.guild_id] else "➡️"
-        await interaction.response.send_message(f"{emoji} Loop {status}.", ephemeral=True)
+        await interaction.response.defer(ephemeral=True)
+        voice_client = await self.music_player.join_voice_channel(MockContext(interaction))
+        if not voice_client:
+            await safe_send_message(interaction, "❌ You need to join a voice channel first!", ephemeral=True)
+            return
 
-    @discord.ui.button(label='📋', style=ButtonStyle.primary, custom_id='queue')
-    async def queue_button(self, interaction: discord.Interaction, button: Button):
-        # Create a clean queue display
-        embed = discord.Embed(title="📋 Queue", color=0x1DB954)
-        
-        queue = self.music_player.queues[self.guild_id]
-        current = self.music_player.current_songs.get(self.guild_id)
-        
-        if current:
-            title = current['title'][:40] + "..." if len(current['title']) > 40 else current['title']
-            embed.add_field(name="▶️ Now Playing", value=f"**{title}**", inline=False)
-        
-        if queue:
-            queue_text = ""
-            for i, song in enumerate(queue[:8], 1):  # Show max 8 songs
-                title = song['title'][:35] + "..." if len(song['title']) > 35 else song['title']
-                queue_text += f"`{i}.` {title}\n"
-            
-            embed.add_field(name="⏭️ Up Next", value=queue_text, inline=False)
-            
-            if len(queue) > 8:
-                embed.add_field(name="", value=f"*...and {len(queue) - 8} more songs*", inline=False)
+        song_info = play_history.song_info(track, interaction.user.display_name)
+        self.music_player.queues[self.guild_id].append(song_info)
+        if voice_client.is_playing() or voice_client.is_paused():
+            position = len(self.music_player.queues[self.guild_id])
+            await interaction.followup.send(f"📋 **Added to queue #{position}:** {song_info['title']}", ephemeral=True)
+            await self.music_player.update_card(self.guild_id)
         else:
-            embed.add_field(name="⏭️ Up Next", value="*Queue is empty*", inline=False)
-        
-        await interaction.response.send_message(embed=embed, ephemeral=True)
+            # play_next takes it straight off the queue (and refreshes the card)
+            await self.music_player.play_next(self.guild_id)
+            await interaction.followup.send(f"▶️ **Now playing:** {song_info['title']}", ephemeral=True)
@@ -0,0 +1,270 @@
+"""
+Local audio cache for frequently played tracks.
+
+Every play of a YouTube video is counted. Once a track reaches
+AUDIO_CACHE_MIN_PLAYS it is downloaded in the background and later plays
+read the local file instead of streaming. Downloads land in tmp/ and are only
+moved into place once complete and checksummed, and the cache is kept under
+AUDIO_CACHE_MAX_BYTES by evicting the files with the lowest decayed play count
+(recent plays count fully, old ones fade with AUDIO_CACHE_HALF_LIFE_HOURS).
+"""
+import os
+import time
+import asyncio
+import hashlib
+from config.settings import (AUDIO_CACHE_ENABLED, AUDIO_CACHE_DIR, AUDIO_CACHE_MAX_BYTES, AUDIO_CACHE_MIN_PLAYS,
+                             AUDIO_CACHE_MAX_TRACK_SECONDS, AUDIO_CACHE_HALF_LIFE_HOURS,
+                             AUDIO_CACHE_PLAYS_RETENTION_DAYS, LOUDNESS_NORMALIZATION, FFMPEG_OPTIONS)
+from utils.database import (get_db_path, record_track_play, get_cached_audio, save_cached_audio,
+                            clear_cached_audio, get_cached_audio_entries, prune_track_plays, get_track_loudness)
+from utils.extraction_pool import extraction_pool, BACKGROUND
+from utils.track_store import encode_opus, OPUS_EXTENSION, STORE_GAIN
+from utils.loudness import analyze_track, db_to_factor
+from utils.logging_setup import get_logger
+
+log = get_logger('cache')
+
+# Local files don't need the HTTP reconnect flags
+LOCAL_FFMPEG_OPTIONS = {key: value for key, value in FFMPEG_OPTIONS.items() if key != 'before_options'}
+
+DOWNLOAD_RETRY_SECONDS = 3600  # A failed download isn't retried for this long
+
+_verified = set()  # Video IDs whose checksum matched since startup
+_failed = {}  # video_id -> time of the last failed download
+_finalizing = set()  # Downloads being moved into place and recorded
+
+def get_cache_dir():
+    """Resolve the cache directory (defaults to a folder next to the database)"""
+    if AUDIO_CACHE_DIR:
+        return AUDIO_CACHE_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(get_db_path())), 'audio_cache')
+
+def _tmp_dir():
+    return os.path.join(get_cache_dir(), 'tmp')
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _store_gain(video_id, path):
+    """Gain to bake into a stored track: the default volume times its loudness normalization"""
+    if not LOUDNESS_NORMALIZATION:
+        return STORE_GAIN
+    gain_db = get_track_loudness(video_id)
+    if gain_db is None:
+        try:
+            gain_db = analyze_track(video_id, path)  # A local file measures quickly
+        except Exception as e:
+            log.warning("Loudness analysis failed for %s: %s", video_id, e)
+            gain_db = 0.0
+    return STORE_GAIN * db_to_factor(gain_db)
+
+def _to_store_format(path, target_dir):
+    """Transcode a track into the Ogg/Opus store; returns the new path, or path if that isn't possible"""
+    video_id = os.path.basename(path).split('.')[0]
+    opus_path = os.path.join(target_dir, video_id + OPUS_EXTENSION)
+    if path == opus_path or not encode_opus(path, opus_path, _store_gain(video_id, path)):
+        return path
+    os.remove(path)
+    return opus_path
+
+def _download_track(video_id, tmp_dir):
+    """Download one video's audio into tmp_dir; returns (path, size, sha256)"""
+    from utils.music_sources import _build_ytdl
+    os.makedirs(tmp_dir, exist_ok=True)
+    ydl = _build_ytdl({
+        'outtmpl': os.path.join(tmp_dir, f"{video_id}.src.%(ext)s"),
+        'noplaylist': True,
+    })
+    info = ydl.extract_info(f"https://www.youtube.com/watch?v={video_id}", download=True)
+    path = ydl.prepare_filename(info)
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"yt-dlp reported {path} but it wasn't written")
+    path = _to_store_format(path, tmp_dir)
+    return path, os.path.getsize(path), file_sha256(path)
+
+def _transcode_cached(path):
+    """Move an older cache entry into the Opus store; returns (path, size, sha256) or None"""
+    new_path = _to_store_format(path, os.path.dirname(path))
+    if new_path == path:
+        return None
+    return new_path, os.path.getsize(new_path), file_sha256(new_path)
+
+def _verify(video_id, path, sha256):
+    """Check a cached file once per run; drop the entry if it's missing or corrupt"""
+    if video_id in _verified:
+        return True
+    if os.path.isfile(path) and file_sha256(path) == sha256:
+        _verified.add(video_id)
+        return True
+    log.warning("🗑️ Cached audio for %s is missing or corrupt, dropping it", video_id)
+    _remove_file(path)
+    clear_cached_audio(video_id)
+    return False
+
+def _remove_file(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        log.warning("Error removing cached audio %s: %s", path, e)
+
+async def lookup(video_id):
+    """Local file for a video as (path, title, duration), or None to stream it"""
+    if not AUDIO_CACHE_ENABLED:
+        return None
+    loop = asyncio.get_running_loop()
+    row = await loop.run_in_executor(None, get_cached_audio, video_id)
+    if not row:
+        return None
+    path, sha256, title, duration = row
+    if not await loop.run_in_executor(None, _verify, video_id, path, sha256):
+        return None
+    return path, title, duration
+
+async def note_play(video_id, title, duration):
+    """Count a play and start a background download once the track is popular"""
+    if not AUDIO_CACHE_ENABLED:
+        return
+    row = await asyncio.get_running_loop().run_in_executor(None, record_track_play, video_id, title, duration)
+    if not row:
+        return
+    play_count, path, _ = row
+    if path or play_count < AUDIO_CACHE_MIN_PLAYS:
+        return
+    if not duration or duration > AUDIO_CACHE_MAX_TRACK_SECONDS:
+        return
+    if time.time() - _failed.get(video_id, 0) < DOWNLOAD_RETRY_SECONDS:
+        return
+    await download(video_id)
+
+async def download(video_id):
+    """Download a track into the cache at background priority"""
+    loop = asyncio.get_running_loop()
+    try:
+        tmp_path, size, sha256 = await extraction_pool.run(
+            _download_track, video_id, _tmp_dir(), priority=BACKGROUND, key=('download', video_id)
+        )
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _failed[video_id] = time.time()
+        log.warning("Audio cache download failed for %s: %s", video_id, e)
+        return
+
+    final_path = os.path.join(get_cache_dir(), os.path.basename(tmp_path))
+    if not os.path.exists(tmp_path):
+        return  # Another caller of the same download already moved it
+    _finalizing.add(video_id)
+    try:
+        os.replace(tmp_path, final_path)  # Atomic, so a crash never leaves a half file in place
+        await loop.run_in_executor(None, save_cached_audio, video_id, final_path, size, sha256)
+    finally:
+        _finalizing.discard(video_id)
+    _verified.add(video_id)
+    log.info("💾 Cached audio for %s (%.1f MiB)", video_id, size / 1024 / 1024)
+    await loop.run_in_executor(None, enforce_budget)
+
+def _retention_score(play_count, last_played, now):
+    age_hours = max(0.0, now - (last_played or 0)) / 3600
+    return play_count * 0.5 ** (age_hours / AUDIO_CACHE_HALF_LIFE_HOURS)
+
+def enforce_budget():
+    """Evict the least valuable files until the cache fits its byte budget"""
+    entries = get_cached_audio_entries()
+    total = sum(size for _, _, size, _, _ in entries)
+    if total <= AUDIO_CACHE_MAX_BYTES:
+        return 0
+
+    now = time.time()
+    entries.sort(key=lambda entry: _retention_score(entry[3], entry[4], now))
+    evicted = 0
+    for video_id, path, size, _, _ in entries:
+        if total <= AUDIO_CACHE_MAX_BYTES:
+            break
+        _remove_file(path)
+        clear_cached_audio(video_id)
+        _verified.discard(video_id)
+        total -= size
+        evicted += 1
+    log.info("🗑️ Audio cache evicted %s file(s) to stay under %s MiB", evicted, AUDIO_CACHE_MAX_BYTES // 1024 // 1024)
+    return evicted
+
+def cleanup(active_downloads=()):
+    """Remove partial downloads and orphaned files, then re-apply the budget.
+
+    Files of downloads still in progress (active_downloads video IDs) are
+    left alone. Returns a dict of what was removed. Blocking - see sweep().
+    """
+    cache_dir = get_cache_dir()
+    removed = {'partial': 0, 'orphaned': 0, 'missing': 0, 'evicted': 0, 'pruned_plays': 0}
+    if not os.path.isdir(cache_dir):
+        return removed
+
+    # Anything still in tmp/ belongs to a download that never finished
+    tmp_dir = _tmp_dir()
+    if os.path.isdir(tmp_dir):
+        for name in os.listdir(tmp_dir):
+            if name.split('.')[0] in active_downloads:
+                continue
+            _remove_file(os.path.join(tmp_dir, name))
+            removed['partial'] += 1
+
+    known = set()
+    for video_id, path, _, _, _ in get_cached_audio_entries():
+        if os.path.isfile(path):
+            known.add(os.path.abspath(path))
+        else:
+            clear_cached_audio(video_id)
+            removed['missing'] += 1
+
+    for name in os.listdir(cache_dir):
+        path = os.path.abspath(os.path.join(cache_dir, name))
+        if os.path.isfile(path) and path not in known and name.split('.')[0] not in active_downloads:
+            _remove_file(path)
+            removed['orphaned'] += 1
+
+    removed['pruned_plays'] = prune_track_plays(AUDIO_CACHE_PLAYS_RETENTION_DAYS)
+    removed['evicted'] = enforce_budget()
+    return removed
+
+async def transcode_legacy():
+    """Convert cached files that predate the Opus store, at background priority"""
+    loop = asyncio.get_running_loop()
+    converted = 0
+    for video_id, path, _, _, _ in await loop.run_in_executor(None, get_cached_audio_entries):
+        if path.endswith(OPUS_EXTENSION) or video_id in _failed:
+            continue
+        try:
+            result = await extraction_pool.run(_transcode_cached, path, priority=BACKGROUND,
+                                               key=('transcode', video_id))
+        except Exception as e:
+            log.warning("Audio cache transcode failed for %s: %s", video_id, e)
+            result = None
+        if result is None:
+            _failed[video_id] = time.time()  # Keep the original, don't retry this run
+            continue
+        new_path, size, sha256 = result
+        await loop.run_in_executor(None, save_cached_audio, video_id, new_path, size, sha256)
+        _verified.add(video_id)
+        converted += 1
+    return converted
+
+async def sweep():
+    """Run cleanup() in the executor, sparing downloads currently in flight"""
+    active = {key[1] for key in extraction_pool.inflight if key[0] in ('download', 'transcode')} | _finalizing
+    removed = await asyncio.get_running_loop().run_in_executor(None, cleanup, active)
+    removed['transcoded'] = await transcode_legacy()
+    return removed
+
+def cache_stats():
+    entries = get_cached_audio_entries()
+    return {
+        'files': len(entries),
+        'bytes': sum(size for _, _, size, _, _ in entries),
+        'budget': AUDIO_CACHE_MAX_BYTES,
+    }
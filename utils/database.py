@@ -1,14 +1,49 @@
+import os
+import time
 import sqlite3
 import json
+from functools import wraps
 from datetime import datetime, timedelta
+from utils.logging_setup import get_logger
+from utils.metrics import registry
+
+log = get_logger('db')
+
+_query_seconds = registry.histogram('bot_db_query_seconds', "Time spent in each database function (connect to close)",
+                                    ('op',))
+
+def get_db_path():
+    """Resolve the database file path (Railway overrides it via DATABASE_PATH)"""
+    return os.getenv('DATABASE_PATH', 'bot_data.db')
+
+def get_connection():
+    """Open a connection to the bot database"""
+    return sqlite3.connect(get_db_path())
+
+def _timed(func):
+    """Record the function's duration in bot_db_query_seconds"""
+    histogram = _query_seconds.labels(func.__name__)
+
+    @wraps(func)
+    def timed(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start)
+    return timed
 
 def init_database():
     """Initialize the database with all required tables"""
-    import os
-    db_path = os.getenv('DATABASE_PATH', 'bot_data.db')
-    conn = sqlite3.connect(db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
+    # Incremental auto-vacuum lets log retention return freed pages to the OS.
+    # Switching an existing database over needs one full VACUUM.
+    if cursor.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+        cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+        cursor.execute('VACUUM')
+    
     # Warnings table
     cursor.execute('''CREATE TABLE IF NOT EXISTS warnings (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -19,6 +54,35 @@ def init_database():
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     )''')
     
+    # Warnings that decay are kept for history but flagged inactive
+    warning_columns = [row[1] for row in cursor.execute('PRAGMA table_info(warnings)')]
+    if 'active' not in warning_columns:
+        cursor.execute('ALTER TABLE warnings ADD COLUMN active BOOLEAN DEFAULT 1')
+    
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_warnings_guild_user_ts
+        ON warnings (guild_id, user_id, timestamp)''')
+    # Only live warnings are candidates for the expiry sweep
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_warnings_active_ts
+        ON warnings (timestamp) WHERE active = 1''')
+    
+    # Per-user warning counters, maintained in the same transaction as
+    # every warning insert/expiry so lookups never have to COUNT(*)
+    counts_exist = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'warning_counts'"
+    ).fetchone()
+    cursor.execute('''CREATE TABLE IF NOT EXISTS warning_counts (
+        guild_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        active_count INTEGER NOT NULL DEFAULT 0,
+        total_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, user_id)
+    )''')
+    if not counts_exist:
+        # Backfill counters from warnings issued before the table existed
+        cursor.execute('''INSERT INTO warning_counts (guild_id, user_id, active_count, total_count)
+                         SELECT guild_id, user_id, SUM(active), COUNT(*)
+                         FROM warnings GROUP BY guild_id, user_id''')
+    
     # Server logs table
     cursor.execute('''CREATE TABLE IF NOT EXISTS server_logs (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -30,6 +94,108 @@ def init_database():
         timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
     )''')
     
+    # Server log indexes - every log query is scoped to a guild and walks
+    # (timestamp, id) newest first, so each filter gets its own composite index
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_server_logs_guild_ts
+        ON server_logs (guild_id, timestamp, id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_server_logs_guild_event_ts
+        ON server_logs (guild_id, event_type, timestamp, id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_server_logs_guild_user_ts
+        ON server_logs (guild_id, user_id, timestamp, id)''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_server_logs_guild_channel_ts
+        ON server_logs (guild_id, channel_id, timestamp, id)''')
+    
+    # Per-guild log retention overrides (days; 0 keeps logs forever)
+    cursor.execute('''CREATE TABLE IF NOT EXISTS log_retention (
+        guild_id INTEGER PRIMARY KEY,
+        retention_days INTEGER NOT NULL
+    )''')
+    
+    # Compressed archive segments holding logs rolled out of server_logs
+    cursor.execute('''CREATE TABLE IF NOT EXISTS log_archive_segments (
+        guild_id INTEGER NOT NULL,
+        bucket TEXT NOT NULL,
+        path TEXT NOT NULL,
+        row_count INTEGER NOT NULL DEFAULT 0,
+        min_timestamp DATETIME,
+        max_timestamp DATETIME,
+        PRIMARY KEY (guild_id, bucket)
+    )''')
+    
+    # Spotify track -> YouTube video matches, so a track is only searched once
+    cursor.execute('''CREATE TABLE IF NOT EXISTS track_matches (
+        spotify_id TEXT PRIMARY KEY,
+        youtube_id TEXT NOT NULL,
+        score REAL,
+        youtube_title TEXT,
+        youtube_duration INTEGER,
+        matched_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''')
+    
+    # Play counts per YouTube video, plus the local file once a popular one is cached
+    cursor.execute('''CREATE TABLE IF NOT EXISTS audio_cache (
+        video_id TEXT PRIMARY KEY,
+        title TEXT,
+        duration INTEGER,
+        play_count INTEGER DEFAULT 0,
+        last_played REAL,
+        path TEXT,
+        size_bytes INTEGER DEFAULT 0,
+        sha256 TEXT,
+        cached_at REAL
+    )''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_audio_cache_cached
+                     ON audio_cache(last_played) WHERE path IS NOT NULL''')
+    
+    # Measured loudness per YouTube video and the gain that normalizes it
+    cursor.execute('''CREATE TABLE IF NOT EXISTS track_loudness (
+        video_id TEXT PRIMARY KEY,
+        integrated_lufs REAL,
+        true_peak REAL,
+        loudness_range REAL,
+        gain_db REAL NOT NULL,
+        analyzed_at DATETIME DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # Tracks each guild has played, searched locally before going to the network
+    cursor.execute('''CREATE TABLE IF NOT EXISTS play_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        guild_id INTEGER NOT NULL,
+        track_key TEXT NOT NULL,
+        url TEXT NOT NULL,
+        title TEXT,
+        artist TEXT,
+        duration INTEGER,
+        thumbnail TEXT,
+        play_count INTEGER DEFAULT 0,
+        last_played REAL,
+        UNIQUE (guild_id, track_key)
+    )''')
+    cursor.execute('''CREATE INDEX IF NOT EXISTS idx_play_history_guild_recent
+                     ON play_history(guild_id, last_played DESC)''')
+    try:
+        # Full-text index over titles and artists, kept in sync by triggers
+        cursor.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS play_history_fts USING fts5(
+            title, artist, content='play_history', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2'
+        )''')
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS play_history_fts_insert AFTER INSERT ON play_history BEGIN
+            INSERT INTO play_history_fts(rowid, title, artist) VALUES (new.id, new.title, new.artist);
+        END''')
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS play_history_fts_delete AFTER DELETE ON play_history BEGIN
+            INSERT INTO play_history_fts(play_history_fts, rowid, title, artist)
+            VALUES ('delete', old.id, old.title, old.artist);
+        END''')
+        # Play counts change on every flush; only re-index when the text does
+        cursor.execute('''CREATE TRIGGER IF NOT EXISTS play_history_fts_update AFTER UPDATE OF title, artist ON play_history
+            WHEN old.title IS NOT new.title OR old.artist IS NOT new.artist BEGIN
+            INSERT INTO play_history_fts(play_history_fts, rowid, title, artist)
+            VALUES ('delete', old.id, old.title, old.artist);
+            INSERT INTO play_history_fts(rowid, title, artist) VALUES (new.id, new.title, new.artist);
+        END''')
+    except sqlite3.OperationalError as e:
+        log.warning("FTS5 unavailable, play history search falls back to LIKE: %s", e)
+
     # Polls table
     cursor.execute('''CREATE TABLE IF NOT EXISTS polls (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -57,71 +223,450 @@ def init_database():
     conn.commit()
     conn.close()
 
+@_timed
 def log_server_event(guild_id, event_type, user_id=None, channel_id=None, description=None):
     """Log server events to database"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''INSERT INTO server_logs (guild_id, event_type, user_id, channel_id, description)
                          VALUES (?, ?, ?, ?, ?)''', (guild_id, event_type, user_id, channel_id, description))
         conn.commit()
         conn.close()
     except Exception as e:
-        print(f"Error logging event: {e}")
+        log.error("Error logging event: %s", e)
 
+@_timed
 def add_warning(user_id, guild_id, moderator_id, reason):
-    """Add a warning to the database"""
+    """Add a warning to the database and return the user's active warning count"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''INSERT INTO warnings (user_id, guild_id, moderator_id, reason)
                          VALUES (?, ?, ?, ?)''', (user_id, guild_id, moderator_id, reason))
-        conn.commit()
-        
-        # Get warning count
-        cursor.execute('SELECT COUNT(*) FROM warnings WHERE user_id = ? AND guild_id = ?', (user_id, guild_id))
+        cursor.execute('''INSERT INTO warning_counts (guild_id, user_id, active_count, total_count)
+                         VALUES (?, ?, 1, 1)
+                         ON CONFLICT (guild_id, user_id) DO UPDATE SET
+                             active_count = active_count + 1,
+                             total_count = total_count + 1''', (guild_id, user_id))
+        cursor.execute('''SELECT active_count FROM warning_counts
+                         WHERE guild_id = ? AND user_id = ?''', (guild_id, user_id))
         warning_count = cursor.fetchone()[0]
+        conn.commit()
         conn.close()
         return warning_count
     except Exception as e:
-        print(f"Error adding warning: {e}")
-        return 0
+        log.error("Error adding warning: %s", e)
+        return None
+
+@_timed
+def get_warning_count(user_id, guild_id):
+    """Get (active, total) warning counts for a user from the counter table"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''SELECT active_count, total_count FROM warning_counts
+                         WHERE guild_id = ? AND user_id = ?''', (guild_id, user_id))
+        row = cursor.fetchone()
+        conn.close()
+        return row if row else (0, 0)
+    except Exception as e:
+        log.error("Error getting warning count: %s", e)
+        return (0, 0)
 
+@_timed
 def get_warnings(user_id, guild_id, limit=10):
-    """Get warnings for a user"""
+    """Get active warnings for a user"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''SELECT reason, timestamp FROM warnings 
-                         WHERE user_id = ? AND guild_id = ? 
-                         ORDER BY timestamp DESC LIMIT ?''', (user_id, guild_id, limit))
+                         WHERE guild_id = ? AND user_id = ? AND active = 1
+                         ORDER BY timestamp DESC LIMIT ?''', (guild_id, user_id, limit))
         warnings = cursor.fetchall()
         conn.close()
         return warnings
     except Exception as e:
-        print(f"Error getting warnings: {e}")
+        log.error("Error getting warnings: %s", e)
         return []
 
+@_timed
+def expire_warnings(max_age_days):
+    """Deactivate warnings older than max_age_days and decrement their counters.
+
+    Returns the number of warnings expired. Counters and warning rows are
+    updated in one transaction so they can never drift apart.
+    """
+    if max_age_days <= 0:
+        return 0
+    cutoff = (datetime.utcnow() - timedelta(days=max_age_days)).strftime("%Y-%m-%d %H:%M:%S")
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''SELECT guild_id, user_id, COUNT(*) FROM warnings
+                         WHERE active = 1 AND timestamp < ?
+                         GROUP BY guild_id, user_id''', (cutoff,))
+        expired = cursor.fetchall()
+        if not expired:
+            conn.close()
+            return 0
+        cursor.executemany('''UPDATE warning_counts SET active_count = MAX(active_count - ?, 0)
+                             WHERE guild_id = ? AND user_id = ?''',
+                           [(count, guild_id, user_id) for guild_id, user_id, count in expired])
+        cursor.execute('UPDATE warnings SET active = 0 WHERE active = 1 AND timestamp < ?', (cutoff,))
+        conn.commit()
+        conn.close()
+        return sum(count for _, _, count in expired)
+    except Exception as e:
+        log.error("Error expiring warnings: %s", e)
+        return 0
+
+@_timed
 def get_server_logs(guild_id, limit=20):
     """Get server logs"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''SELECT event_type, user_id, description, timestamp 
                          FROM server_logs 
                          WHERE guild_id = ? 
-                         ORDER BY timestamp DESC LIMIT ?''', (guild_id, limit))
+                         ORDER BY timestamp DESC, id DESC LIMIT ?''', (guild_id, limit))
         logs = cursor.fetchall()
         conn.close()
         return logs
     except Exception as e:
-        print(f"Error retrieving logs: {e}")
+        log.error("Error retrieving logs: %s", e)
+        return []
+
+@_timed
+def get_server_logs_page(guild_id, event_type=None, user_id=None, channel_id=None,
+                         since=None, until=None, before=None, limit=10):
+    """Get one page of server logs, newest first, using keyset pagination.
+
+    ``before`` is the ``(timestamp, id)`` cursor of the last row of the previous
+    page; only rows strictly older than it are returned, so every page is a
+    single index range scan no matter how deep the user has paged. Only the
+    live table is read; older rows are paged from the archive with
+    log_archive.get_archived_logs_page.
+    ``since``/``until`` are ``YYYY-MM-DD HH:MM:SS`` UTC strings (the format
+    ``CURRENT_TIMESTAMP`` stores); ``since`` is inclusive and ``until``
+    exclusive. Rows are
+    ``(id, event_type, user_id, channel_id, description, timestamp)``.
+    """
+    query = '''SELECT id, event_type, user_id, channel_id, description, timestamp
+                 FROM server_logs WHERE guild_id = ?'''
+    params = [guild_id]
+    
+    # Each equality filter has a matching (guild_id, <filter>, timestamp, id)
+    # index, so the ordered range below never touches rows of other guilds
+    if event_type is not None:
+        query += ' AND event_type = ?'
+        params.append(event_type)
+    if user_id is not None:
+        query += ' AND user_id = ?'
+        params.append(user_id)
+    if channel_id is not None:
+        query += ' AND channel_id = ?'
+        params.append(channel_id)
+    if since is not None:
+        query += ' AND timestamp >= ?'
+        params.append(since)
+    if until is not None:
+        query += ' AND timestamp < ?'
+        params.append(until)
+    if before is not None:
+        query += ' AND (timestamp, id) < (?, ?)'
+        params.extend(before)
+    
+    query += ' ORDER BY timestamp DESC, id DESC LIMIT ?'
+    params.append(limit)
+    
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        logs = cursor.fetchall()
+        conn.close()
+    except Exception as e:
+        log.error("Error retrieving logs page: %s", e)
+        return []
+    
+    return logs
+
+@_timed
+def get_track_match(spotify_id):
+    """Get the stored YouTube video ID for a Spotify track"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT youtube_id FROM track_matches WHERE spotify_id = ?', (spotify_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    except Exception as e:
+        log.error("Error getting track match: %s", e)
+        return None
+
+@_timed
+def save_track_match(spotify_id, youtube_id, score, youtube_title, youtube_duration):
+    """Store the best YouTube match for a Spotify track"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''INSERT OR REPLACE INTO track_matches
+                         (spotify_id, youtube_id, score, youtube_title, youtube_duration)
+                         VALUES (?, ?, ?, ?, ?)''', (spotify_id, youtube_id, score, youtube_title, youtube_duration))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error saving track match: %s", e)
+        return False
+
+@_timed
+def delete_track_match(spotify_id):
+    """Forget a stored match (e.g. the video became unavailable)"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM track_matches WHERE spotify_id = ?', (spotify_id,))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error deleting track match: %s", e)
+        return False
+
+@_timed
+def record_track_play(video_id, title, duration):
+    """Count a play of a YouTube video; returns (play_count, path, sha256) or None on error"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''INSERT INTO audio_cache (video_id, title, duration, play_count, last_played)
+                         VALUES (?, ?, ?, 1, ?)
+                         ON CONFLICT(video_id) DO UPDATE SET
+                             play_count = play_count + 1,
+                             last_played = excluded.last_played,
+                             title = COALESCE(excluded.title, title),
+                             duration = COALESCE(excluded.duration, duration)''',
+                       (video_id, title, duration, time.time()))
+        cursor.execute('SELECT play_count, path, sha256 FROM audio_cache WHERE video_id = ?', (video_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        conn.close()
+        return row
+    except Exception as e:
+        log.error("Error recording track play: %s", e)
+        return None
+
+@_timed
+def get_cached_audio(video_id):
+    """Local file info for a cached video as (path, sha256, title, duration), or None"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''SELECT path, sha256, title, duration FROM audio_cache
+                         WHERE video_id = ? AND path IS NOT NULL''', (video_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row
+    except Exception as e:
+        log.error("Error getting cached audio: %s", e)
+        return None
+
+@_timed
+def save_cached_audio(video_id, path, size_bytes, sha256):
+    """Record a finished download in the audio cache"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''UPDATE audio_cache SET path = ?, size_bytes = ?, sha256 = ?, cached_at = ?
+                         WHERE video_id = ?''', (path, size_bytes, sha256, time.time(), video_id))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error saving cached audio: %s", e)
+        return False
+
+@_timed
+def clear_cached_audio(video_id):
+    """Forget a video's local file (evicted or failed its checksum); play counts are kept"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''UPDATE audio_cache SET path = NULL, size_bytes = 0, sha256 = NULL, cached_at = NULL
+                         WHERE video_id = ?''', (video_id,))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error clearing cached audio: %s", e)
+        return False
+
+@_timed
+def get_cached_audio_entries():
+    """All cached files as (video_id, path, size_bytes, play_count, last_played) rows"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''SELECT video_id, path, size_bytes, play_count, last_played
+                         FROM audio_cache WHERE path IS NOT NULL''')
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    except Exception as e:
+        log.error("Error listing cached audio: %s", e)
         return []
 
+@_timed
+def prune_track_plays(max_age_days):
+    """Drop play counts of uncached videos nobody has played for a while"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''DELETE FROM audio_cache WHERE path IS NULL AND last_played < ?''',
+                       (time.time() - max_age_days * 86400,))
+        pruned = cursor.rowcount
+        conn.commit()
+        conn.close()
+        return pruned
+    except Exception as e:
+        log.error("Error pruning track plays: %s", e)
+        return 0
+
+@_timed
+def get_track_loudness(video_id):
+    """Stored normalization gain for a video in dB, or None if not measured"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT gain_db FROM track_loudness WHERE video_id = ?', (video_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+    except Exception as e:
+        log.error("Error getting track loudness: %s", e)
+        return None
+
+@_timed
+def save_track_loudness(video_id, integrated_lufs, true_peak, loudness_range, gain_db):
+    """Store a loudness measurement and its normalization gain"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('''INSERT OR REPLACE INTO track_loudness
+                         (video_id, integrated_lufs, true_peak, loudness_range, gain_db)
+                         VALUES (?, ?, ?, ?, ?)''', (video_id, integrated_lufs, true_peak, loudness_range, gain_db))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error saving track loudness: %s", e)
+        return False
+
+@_timed
+def record_plays_batch(plays):
+    """Upsert buffered plays in one transaction.
+
+    plays holds dicts with guild_id, track_key, url, title, artist, duration,
+    thumbnail, plays (count since the last flush) and last_played.
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.executemany('''INSERT INTO play_history
+                             (guild_id, track_key, url, title, artist, duration, thumbnail, play_count, last_played)
+                             VALUES (:guild_id, :track_key, :url, :title, :artist, :duration, :thumbnail, :plays, :last_played)
+                             ON CONFLICT(guild_id, track_key) DO UPDATE SET
+                                 play_count = play_count + excluded.play_count,
+                                 last_played = MAX(last_played, excluded.last_played),
+                                 url = excluded.url,
+                                 title = COALESCE(excluded.title, title),
+                                 artist = COALESCE(excluded.artist, artist),
+                                 duration = COALESCE(excluded.duration, duration),
+                                 thumbnail = COALESCE(excluded.thumbnail, thumbnail)''', plays)
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error recording play history: %s", e)
+        return False
+
+_PLAY_HISTORY_COLUMNS = 'h.track_key, h.url, h.title, h.artist, h.duration, h.thumbnail, h.play_count, h.last_played'
+
+def _fts_query(terms):
+    # Every term must match, each as a quoted prefix so partial words still hit
+    return ' '.join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+
+@_timed
+def search_play_history(guild_id, terms, limit=5):
+    """Guild's played tracks whose title/artist contain every term, best matches first.
+
+    Returns (track_key, url, title, artist, duration, thumbnail, play_count,
+    last_played) rows. Uses the FTS5 index when SQLite has it.
+    """
+    if not terms:
+        return []
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        try:
+            # bm25 is negative (lower is better); scaling it by play count favours the guild's regulars
+            cursor.execute(f'''SELECT {_PLAY_HISTORY_COLUMNS} FROM play_history_fts
+                              JOIN play_history h ON h.id = play_history_fts.rowid
+                              WHERE play_history_fts MATCH ? AND h.guild_id = ?
+                              ORDER BY bm25(play_history_fts) * (1.0 + 0.5 * MIN(h.play_count, 20)) LIMIT ?''',
+                           (_fts_query(terms), guild_id, limit))
+        except sqlite3.OperationalError:
+            conditions = ' AND '.join("(h.title LIKE ? OR h.artist LIKE ?)" for _ in terms)
+            params = [value for term in terms for value in (f"%{term}%", f"%{term}%")]
+            cursor.execute(f'''SELECT {_PLAY_HISTORY_COLUMNS} FROM play_history h
+                              WHERE h.guild_id = ? AND {conditions}
+                              ORDER BY h.play_count DESC, h.last_played DESC LIMIT ?''',
+                           [guild_id] + params + [limit])
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    except Exception as e:
+        log.error("Error searching play history: %s", e)
+        return []
+
+@_timed
+def get_recent_plays(guild_id, limit=10):
+    """Guild's most recently played tracks, same row shape as search_play_history"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(f'''SELECT {_PLAY_HISTORY_COLUMNS} FROM play_history h
+                          WHERE h.guild_id = ? ORDER BY h.last_played DESC LIMIT ?''', (guild_id, limit))
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    except Exception as e:
+        log.error("Error getting recent plays: %s", e)
+        return []
+
+@_timed
+def clear_play_history(guild_id):
+    """Forget a guild's play history (the bot left the guild)"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('DELETE FROM play_history WHERE guild_id = ?', (guild_id,))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.error("Error clearing play history: %s", e)
+        return False
+
+@_timed
 def create_poll_db(message_id, channel_id, guild_id, creator_id, question, options, end_time):
     """Create a poll in the database"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('''INSERT INTO polls (message_id, channel_id, guild_id, creator_id, question, options, end_time)
                          VALUES (?, ?, ?, ?, ?, ?, ?)''', 
@@ -130,18 +675,19 @@ def create_poll_db(message_id, channel_id, guild_id, creator_id, question, optio
         conn.close()
         return True
     except Exception as e:
-        print(f"Error creating poll: {e}")
+        log.error("Error creating poll: %s", e)
         return False
 
+@_timed
 def end_poll_db(message_id):
     """End a poll in the database"""
     try:
-        conn = sqlite3.connect('bot_data.db')
+        conn = get_connection()
         cursor = conn.cursor()
         cursor.execute('UPDATE polls SET active = 0 WHERE message_id = ?', (message_id,))
         conn.commit()
         conn.close()
         return True
     except Exception as e:
-        print(f"Error ending poll: {e}")
+        log.error("Error ending poll: %s", e)
         return False
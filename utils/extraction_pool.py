@@ -0,0 +1,241 @@
+"""
+Dedicated yt-dlp worker pool.
+
+Extraction jobs get their own executor instead of sharing the default one,
+and are dispatched by priority class (now playing > prefetch > interactive
+search > background) with round-robin between guilds inside each class, so
+one guild queuing a large batch can't starve everyone else's playback.
+
+Jobs submitted with a key are single-flight: while one is queued or running,
+identical submissions (same video or normalized query) wait on it instead of
+running yt-dlp again, and all of them get its result or its exception.
+"""
+import time
+import asyncio
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from config.settings import EXTRACTION_WORKERS, EXTRACTION_POOL_MODE, EXTRACTION_BACKGROUND_WORKERS
+from utils.metrics import registry
+
+# Priority classes, most urgent first
+NOW_PLAYING = 0
+PREFETCH = 1
+INTERACTIVE = 2
+BACKGROUND = 3
+
+PRIORITY_NAMES = {
+    NOW_PLAYING: 'now_playing',
+    PREFETCH: 'prefetch',
+    INTERACTIVE: 'interactive',
+    BACKGROUND: 'background',
+}
+
+class _Job:
+    __slots__ = ('func', 'args', 'priority', 'guild_id', 'key', 'waiters', 'queued_at')
+
+    def __init__(self, func, args, priority, guild_id, key):
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.guild_id = guild_id  # Guild whose queue the job sits in
+        self.key = key
+        self.waiters = []  # (future, guild_id) per caller sharing this job
+        self.queued_at = time.monotonic()
+
+    def live(self):
+        return [(future, guild_id) for future, guild_id in self.waiters if not future.done()]
+
+class ExtractionPool:
+    """Priority + per-guild fair scheduler in front of a dedicated executor.
+
+    One worker is held back for now-playing and prefetch jobs, so searches
+    and background work can never occupy every worker, and background jobs
+    are limited to EXTRACTION_BACKGROUND_WORKERS at a time so long downloads
+    or analyses can't fill the slots searches use. In process mode the
+    submitted functions must be module-level (picklable).
+    """
+
+    def __init__(self, workers=EXTRACTION_WORKERS, mode=EXTRACTION_POOL_MODE):
+        self.workers = max(1, workers)
+        self.mode = mode
+        self.executor = None
+        # priority -> guild_id -> deque of jobs; OrderedDict order is the round-robin order
+        self.queues = {priority: OrderedDict() for priority in PRIORITY_NAMES}
+        self.running = set()
+        self.inflight = {}  # key -> job, for single-flight coalescing
+        self.coalesced = 0
+        self.completed = {priority: 0 for priority in PRIORITY_NAMES}
+        self.cancelled = 0
+        self.wait_time = {priority: 0.0 for priority in PRIORITY_NAMES}  # Smoothed seconds queued
+
+    def _get_executor(self):
+        if self.executor is None:
+            if self.mode == 'process':
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='ytdl')
+        return self.executor
+
+    def submit(self, func, *args, priority=INTERACTIVE, guild_id=None, key=None):
+        """Queue func(*args) and return an asyncio future for its result.
+
+        If a job with the same key is already queued or running, the caller
+        joins it instead (promoting it if this caller is more urgent).
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        job = self.inflight.get(key) if key is not None else None
+        if job is not None:
+            self.coalesced += 1
+            job.waiters.append((future, guild_id))
+            if priority < job.priority and job not in self.running:
+                self._unqueue(job)
+                job.priority = priority
+                self._enqueue(job)
+                self._dispatch()
+            return future
+
+        job = _Job(func, args, priority, guild_id, key)
+        job.waiters.append((future, guild_id))
+        if key is not None:
+            self.inflight[key] = job
+        self._enqueue(job)
+        self._dispatch()
+        return future
+
+    async def run(self, func, *args, priority=INTERACTIVE, guild_id=None, key=None):
+        return await self.submit(func, *args, priority=priority, guild_id=guild_id, key=key)
+
+    def _enqueue(self, job):
+        self.queues[job.priority].setdefault(job.guild_id, deque()).append(job)
+
+    def _unqueue(self, job):
+        guilds = self.queues[job.priority]
+        jobs = guilds.get(job.guild_id)
+        if jobs is not None and job in jobs:
+            jobs.remove(job)
+            if not jobs:
+                del guilds[job.guild_id]
+
+    def _forget(self, job):
+        if job.key is not None and self.inflight.get(job.key) is job:
+            del self.inflight[job.key]
+
+    def _capacity(self, priority):
+        if priority <= PREFETCH or self.workers == 1:
+            return self.workers
+        return self.workers - 1
+
+    def _has_room(self, priority):
+        if len(self.running) >= self._capacity(priority):
+            return False
+        if priority == BACKGROUND:
+            return sum(job.priority == BACKGROUND for job in self.running) < EXTRACTION_BACKGROUND_WORKERS
+        return True
+
+    def _next_job(self):
+        for priority, guilds in self.queues.items():
+            if not self._has_room(priority):
+                continue
+            while guilds:
+                guild_id, jobs = next(iter(guilds.items()))
+                job = jobs.popleft()
+                if jobs:
+                    guilds.move_to_end(guild_id)  # Next job for this guild waits its turn
+                else:
+                    del guilds[guild_id]
+                if job.live():
+                    return job
+                self._forget(job)  # Every caller gave up before it started
+        return None
+
+    def _dispatch(self):
+        while len(self.running) < self.workers:
+            job = self._next_job()
+            if job is None:
+                return
+            waited = time.monotonic() - job.queued_at
+            self.wait_time[job.priority] = 0.8 * self.wait_time[job.priority] + 0.2 * waited
+            self.running.add(job)
+            loop = job.waiters[0][0].get_loop()
+            inner = loop.run_in_executor(self._get_executor(), job.func, *job.args)
+            inner.add_done_callback(lambda inner, job=job: self._finish(job, inner))
+
+    def _finish(self, job, inner):
+        self.running.discard(job)
+        self._forget(job)
+        self.completed[job.priority] += 1
+        if inner.cancelled():
+            for future, _ in job.live():
+                future.cancel()
+        elif inner.exception() is not None:
+            # Every waiter sees the same failure
+            for future, _ in job.live():
+                future.set_exception(inner.exception())
+        else:
+            for future, _ in job.live():
+                future.set_result(inner.result())
+        self._dispatch()
+
+    def cancel_guild(self, guild_id):
+        """Cancel a guild's pending extractions.
+
+        Queued jobs nobody else is waiting for are dropped; running ones
+        finish but the guild's results are discarded. A job shared with other
+        guilds keeps going for them.
+        """
+        dropped = 0
+        jobs = [job for guilds in self.queues.values() for job in guilds.get(guild_id, ())]
+        for job in jobs + list(self.running):
+            for future, owner in job.waiters:
+                if owner == guild_id and future.cancel():
+                    dropped += 1
+        for job in jobs:
+            self._unqueue(job)
+            survivors = job.live()
+            if survivors:
+                job.guild_id = survivors[0][1]  # Hand the job to a guild still waiting
+                self._enqueue(job)
+            else:
+                self._forget(job)
+        self.cancelled += dropped
+        return dropped
+
+    def stats(self):
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'running': len(self.running),
+            'cancelled': self.cancelled,
+            'coalesced': self.coalesced,
+            'inflight_keys': len(self.inflight),
+            'classes': {
+                PRIORITY_NAMES[priority]: {
+                    'queued': sum(len(jobs) for jobs in guilds.values()),
+                    'guilds': len(guilds),
+                    'completed': self.completed[priority],
+                    'avg_wait': round(self.wait_time[priority], 3),
+                }
+                for priority, guilds in self.queues.items()
+            },
+        }
+
+extraction_pool = ExtractionPool()
+
+@registry.collector
+def _collect():
+    stats = extraction_pool.stats()
+    classes = stats['classes'].items()
+    return [
+        ('bot_extraction_queue_depth', "yt-dlp jobs waiting, by priority class", 'gauge',
+         [({'priority': name}, entry['queued']) for name, entry in classes]),
+        ('bot_extraction_completed_total', "yt-dlp jobs finished, by priority class", 'counter',
+         [({'priority': name}, entry['completed']) for name, entry in classes]),
+        ('bot_extraction_wait_seconds', "Average queue wait of recent yt-dlp jobs, by priority class", 'gauge',
+         [({'priority': name}, entry['avg_wait']) for name, entry in classes]),
+        ('bot_extraction_workers_busy', "yt-dlp workers running a job", 'gauge', [({}, stats['running'])]),
+        ('bot_extraction_coalesced_total', "Extractions answered by an identical job already in flight", 'counter',
+         [({}, stats['coalesced'])]),
+        ('bot_extraction_cancelled_total', "Queued extractions cancelled (guild left or caller gave up)", 'counter',
+         [({}, stats['cancelled'])]),
+    ]
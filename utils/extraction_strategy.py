@@ -0,0 +1,207 @@
+"""
+Adaptive yt-dlp extraction strategy.
+
+Instead of walking the fallback profiles strictly one after another, a
+second attempt is hedged in once the first is slow, failures immediately
+launch the next profile, and the order adapts to which profile has been
+working for each extractor and error class.
+"""
+import re
+import time
+import asyncio
+from urllib.parse import urlparse
+from config.settings import EXTRACTION_HEDGE_DELAY, EXTRACTION_MAX_PARALLEL
+from utils.extraction_pool import extraction_pool, NOW_PLAYING
+from utils.logging_setup import get_logger
+
+log = get_logger('extraction')
+
+# Fallback profiles, in their default order (None = shared client as-is)
+PROFILES = {
+    'default': None,
+    'fresh': {},
+    'webm': {'format': 'bestaudio[ext=webm]/bestaudio/best'},
+    'any_format': {'format': 'bestaudio/best'},
+}
+
+# Errors no other profile can fix - fail immediately instead of retrying
+FATAL_ERROR_CLASSES = {'unavailable', 'private', 'copyright', 'age_restricted'}
+
+def classify_error(error):
+    """Bucket a yt-dlp error into a coarse class"""
+    text = str(error).lower()
+    if 'private video' in text:
+        return 'private'
+    if 'copyright' in text:
+        return 'copyright'
+    if 'age' in text and ('restrict' in text or 'confirm your age' in text):
+        return 'age_restricted'
+    # Before 'unavailable': "Requested format is not available" is about the format, not the video
+    if 'requested format' in text or 'format is not available' in text:
+        return 'format'
+    if 'video unavailable' in text or 'not available' in text or 'has been removed' in text:
+        return 'unavailable'
+    if 'sign in' in text or 'not a bot' in text:
+        return 'auth'
+    if '403' in text or 'forbidden' in text:
+        return 'forbidden'
+    if '429' in text or 'too many requests' in text:
+        return 'rate_limited'
+    if 'timed out' in text or 'timeout' in text:
+        return 'timeout'
+    return type(error).__name__
+
+_YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/shorts/|music\.youtube\.com/watch\?v=)([\w-]{11})')
+
+def youtube_video_id(url):
+    """Extract the video ID from a YouTube URL"""
+    match = _YOUTUBE_ID_RE.search(url or '')
+    return match.group(1) if match else None
+
+def media_key(target):
+    """Normalized single-flight key for a URL or search query.
+
+    YouTube URLs collapse to their video ID (so youtu.be, shorts and
+    watch?v=...&t=30 links all match); queries are casefolded with
+    whitespace collapsed.
+    """
+    if target.startswith(('http://', 'https://')):
+        video_id = youtube_video_id(target)
+        return f"yt:{video_id}" if video_id else target
+    return ' '.join(target.casefold().split())
+
+def extractor_key(url):
+    """Coarse extractor name for a URL or search query (youtube, soundcloud, search, ...)"""
+    if not url.startswith(('http://', 'https://')):
+        return 'search'
+    host = urlparse(url).netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if host in ('youtu.be', 'music.youtube.com', 'm.youtube.com'):
+        return 'youtube'
+    return host.split('.')[-2] if host.count('.') >= 1 else host
+
+class ExtractionStrategy:
+    """Remembers which profiles work per extractor and per error class"""
+
+    def __init__(self):
+        self.outcomes = {}  # (extractor, profile) -> [successes, attempts]
+        self.recoveries = {}  # (extractor, error_class) -> {profile: wins}
+        self.latency = {}  # (extractor, profile) -> smoothed seconds
+
+    def order(self, extractor):
+        """Profiles ranked by smoothed success rate, default order breaking ties"""
+        defaults = list(PROFILES)
+
+        def rank(profile):
+            successes, attempts = self.outcomes.get((extractor, profile), (0, 0))
+            return (-(successes + 1) / (attempts + 2), defaults.index(profile))
+
+        return sorted(defaults, key=rank)
+
+    def next_profile(self, extractor, error_class, tried):
+        """Best untried profile, preferring whatever recovered from this error class before"""
+        remaining = [profile for profile in self.order(extractor) if profile not in tried]
+        if not remaining:
+            return None
+        wins = self.recoveries.get((extractor, error_class)) or {}
+        remaining.sort(key=lambda profile: -wins.get(profile, 0))
+        return remaining[0]
+
+    def record(self, extractor, profile, ok, elapsed=None):
+        entry = self.outcomes.setdefault((extractor, profile), [0, 0])
+        entry[1] += 1
+        if ok:
+            entry[0] += 1
+            if elapsed is not None:
+                previous = self.latency.get((extractor, profile))
+                self.latency[(extractor, profile)] = elapsed if previous is None else 0.8 * previous + 0.2 * elapsed
+
+    def record_recovery(self, extractor, error_class, profile):
+        wins = self.recoveries.setdefault((extractor, error_class), {})
+        wins[profile] = wins.get(profile, 0) + 1
+
+    def stats(self):
+        return {
+            f"{extractor}/{profile}": {
+                'successes': successes,
+                'attempts': attempts,
+                'latency': round(self.latency.get((extractor, profile), 0.0), 2),
+            }
+            for (extractor, profile), (successes, attempts) in self.outcomes.items()
+        }
+
+strategy = ExtractionStrategy()
+
+async def extract_with_strategy(url, extract, *args, priority=NOW_PLAYING, guild_id=None):
+    """Resolve url by running extract(url, profile_opts, *args) attempts on the extraction pool.
+
+    The first attempt uses the best-ranked profile. If it hasn't finished
+    after EXTRACTION_HEDGE_DELAY seconds a second profile is started in
+    parallel; a failure starts the next profile straight away. The first
+    success wins; fatal errors (removed, private...) fail immediately.
+    """
+    extractor = extractor_key(url)
+    tried = []
+    running = {}  # future -> (profile, started_at)
+    first_error_class = None
+    last_error = None
+
+    def launch(profile):
+        tried.append(profile)
+        future = extraction_pool.submit(extract, url, PROFILES[profile], *args,
+                                        priority=priority, guild_id=guild_id,
+                                        key=('extract', media_key(url), profile) + args)
+        # Abandoned hedges may still fail later; retrieve their errors quietly
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        running[future] = (profile, time.monotonic())
+
+    launch(strategy.order(extractor)[0])
+
+    try:
+        while running:
+            can_hedge = len(running) < EXTRACTION_MAX_PARALLEL and len(tried) < len(PROFILES)
+            done, _ = await asyncio.wait(
+                running,
+                timeout=EXTRACTION_HEDGE_DELAY if can_hedge else None,
+                return_when=asyncio.FIRST_COMPLETED
+            )
+
+            if not done:
+                # Slow attempt - hedge with the next profile while it keeps running
+                profile = strategy.next_profile(extractor, first_error_class, tried)
+                log.info("⏱️ Extraction slow after %ss, hedging with profile '%s'", EXTRACTION_HEDGE_DELAY, profile)
+                launch(profile)
+                continue
+
+            for future in done:
+                profile, started = running.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    error_class = classify_error(e)
+                    strategy.record(extractor, profile, False)
+                    last_error = e
+                    first_error_class = first_error_class or error_class
+                    if error_class in FATAL_ERROR_CLASSES:
+                        log.warning("❌ yt-dlp profile '%s' failed with %s, not retrying: %s", profile, error_class, e)
+                        raise
+                    log.warning("yt-dlp profile '%s' failed (%s): %s", profile, error_class, e)
+                    next_profile = strategy.next_profile(extractor, error_class, tried)
+                    if next_profile and len(running) < EXTRACTION_MAX_PARALLEL:
+                        launch(next_profile)
+                    continue
+
+                strategy.record(extractor, profile, True, time.monotonic() - started)
+                if first_error_class:
+                    strategy.record_recovery(extractor, first_error_class, profile)
+                return data
+
+            if not running and len(tried) < len(PROFILES):
+                launch(strategy.next_profile(extractor, first_error_class, tried))
+
+        raise last_error
+    finally:
+        # A hedge still queued or running is no longer needed
+        for future in running:
+            future.cancel()
@@ -0,0 +1,146 @@
+"""
+Incrementally maintained per-guild statistics for !stats.
+
+Counters are seeded with one full recount, kept current from gateway events
+and periodically reconciled against a fresh recount to correct any drift
+from missed events.
+"""
+import time
+import asyncio
+import discord
+
+class RateCounter:
+    """Event counts in fixed one-minute buckets over a sliding window"""
+
+    def __init__(self, window_minutes=60):
+        self.window = window_minutes
+        self.buckets = [0] * window_minutes
+        self.stamps = [0] * window_minutes  # Minute each bucket currently holds
+
+    def add(self, amount=1, now=None):
+        minute = int((now or time.time()) // 60)
+        slot = minute % self.window
+        if self.stamps[slot] != minute:
+            self.stamps[slot] = minute
+            self.buckets[slot] = 0
+        self.buckets[slot] += amount
+
+    def total(self, minutes=None, now=None):
+        """Events within the last `minutes` minutes (including the current one)"""
+        minutes = min(minutes or self.window, self.window)
+        current = int((now or time.time()) // 60)
+        return sum(count for count, stamp in zip(self.buckets, self.stamps)
+                   if current - minutes < stamp <= current)
+
+class GuildStats:
+    """Counters for a single guild"""
+
+    def __init__(self):
+        self.online = 0
+        self.bots = 0
+        self.text_channels = 0
+        self.voice_channels = 0
+        self.last_recount = 0.0
+        self.messages = RateCounter(60)
+        self.joins = RateCounter(60)
+        self.leaves = RateCounter(60)
+
+    def recount(self, guild):
+        """Full O(members) recount used to seed and reconcile the counters"""
+        online = bots = 0
+        for member in guild.members:
+            if member.status != discord.Status.offline:
+                online += 1
+            if member.bot:
+                bots += 1
+        self.online = online
+        self.bots = bots
+        self.text_channels = sum(1 for channel in guild.channels if isinstance(channel, discord.TextChannel))
+        self.voice_channels = sum(1 for channel in guild.channels if isinstance(channel, discord.VoiceChannel))
+        self.last_recount = time.time()
+
+class GuildStatsAggregator:
+    """Per-guild statistics served in O(1)"""
+
+    def __init__(self):
+        self.guilds = {}
+
+    def _entry(self, guild_id):
+        stats = self.guilds.get(guild_id)
+        if stats is None:
+            stats = self.guilds[guild_id] = GuildStats()
+        return stats
+
+    def get(self, guild):
+        stats = self._entry(guild.id)
+        if not stats.last_recount:
+            stats.recount(guild)
+        return stats
+
+    def _tracked(self, guild):
+        # Member/channel counters only move once they've been seeded
+        stats = self.guilds.get(guild.id)
+        return stats if stats and stats.last_recount else None
+
+    def on_message(self, message):
+        if message.guild:
+            self._entry(message.guild.id).messages.add()
+
+    def on_member_join(self, member):
+        self._entry(member.guild.id).joins.add()
+        stats = self._tracked(member.guild)
+        if stats:
+            if member.bot:
+                stats.bots += 1
+            if member.status != discord.Status.offline:
+                stats.online += 1
+
+    def on_member_remove(self, member):
+        self._entry(member.guild.id).leaves.add()
+        stats = self._tracked(member.guild)
+        if stats:
+            if member.bot:
+                stats.bots = max(stats.bots - 1, 0)
+            if member.status != discord.Status.offline:
+                stats.online = max(stats.online - 1, 0)
+
+    def on_presence_update(self, before, after):
+        stats = self._tracked(after.guild)
+        if stats:
+            was_online = before.status != discord.Status.offline
+            is_online = after.status != discord.Status.offline
+            if was_online != is_online:
+                stats.online = max(stats.online + (1 if is_online else -1), 0)
+
+    def _channel_delta(self, channel, delta):
+        stats = self._tracked(channel.guild)
+        if stats:
+            if isinstance(channel, discord.TextChannel):
+                stats.text_channels = max(stats.text_channels + delta, 0)
+            elif isinstance(channel, discord.VoiceChannel):
+                stats.voice_channels = max(stats.voice_channels + delta, 0)
+
+    def on_guild_channel_create(self, channel):
+        self._channel_delta(channel, 1)
+
+    def on_guild_channel_delete(self, channel):
+        self._channel_delta(channel, -1)
+
+    def on_guild_remove(self, guild):
+        self.guilds.pop(guild.id, None)
+
+    async def reconcile(self, client, max_age):
+        """Recount guilds whose counters are older than max_age seconds,
+        yielding to the event loop between guilds"""
+        now = time.time()
+        for guild_id, stats in list(self.guilds.items()):
+            if not stats.last_recount or now - stats.last_recount < max_age:
+                continue
+            guild = client.get_guild(guild_id)
+            if guild is None:
+                self.guilds.pop(guild_id, None)
+                continue
+            stats.recount(guild)
+            await asyncio.sleep(0)
+
+guild_stats = GuildStatsAggregator()
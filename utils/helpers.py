@@ -1,15 +1,33 @@
 import requests
 import json
-import google.generativeai as genai
+import threading
 from datetime import datetime
 from config.settings import GEMINI_API_KEY
+from utils.logging_setup import get_logger
 
-# Configure Gemini API
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-    gemini_model = genai.GenerativeModel('gemini-2.5-flash-lite')
-else:
-    gemini_model = None
+log = get_logger('helpers')
+
+# Gemini is configured on first use (google.generativeai is slow to import)
+_gemini_model = None
+_gemini_loaded = False
+_gemini_lock = threading.Lock()
+
+def get_gemini_model():
+    """Get the Gemini model, importing and configuring the SDK on first call"""
+    global _gemini_model, _gemini_loaded
+    if _gemini_loaded:
+        return _gemini_model
+    with _gemini_lock:
+        if not _gemini_loaded:
+            if GEMINI_API_KEY:
+                try:
+                    import google.generativeai as genai
+                    genai.configure(api_key=GEMINI_API_KEY)
+                    _gemini_model = genai.GenerativeModel('gemini-2.5-flash-lite')
+                except Exception as e:
+                    log.warning("Gemini API setup failed: %s", e)
+            _gemini_loaded = True
+    return _gemini_model
 
 def get_meme():
     """Get a random meme from API"""
@@ -18,7 +36,7 @@ def get_meme():
         json_data = json.loads(response.text)
         return json_data['url']
     except Exception as e:
-        print(f"Error getting meme: {e}")
+        log.warning("Error getting meme: %s", e)
         return "Sorry, couldn't fetch a meme right now!"
 
 def search_topic(topic):
@@ -30,6 +48,7 @@ def search_topic(topic):
             return None
         
         # Try Gemini API first (best quality responses)
+        gemini_model = get_gemini_model()
         if gemini_model:
             try:
                 prompt = f"""Provide a concise, informative summary about "{topic}". 
@@ -65,7 +84,7 @@ def search_topic(topic):
                             'url': f"https://www.google.com/search?q={topic.replace(' ', '+')}"
                         }
             except Exception as e:
-                print(f"Gemini API error: {e}")
+                log.warning("Gemini API error: %s", e)
         
         # Fallback to Wikipedia API if Gemini fails
         try:
@@ -94,7 +113,7 @@ def search_topic(topic):
         }
                 
     except Exception as e:
-        print(f"Error searching for topic: {e}")
+        log.warning("Error searching for topic: %s", e)
         return None
 
 def get_current_date_info():
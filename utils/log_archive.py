@@ -0,0 +1,256 @@
+"""
+Server log retention - rolls old server_logs rows into compressed,
+day-bucketed JSONL archive segments and streams them back for queries.
+"""
+import os
+import gzip
+import json
+from datetime import datetime, timedelta
+from utils.database import get_connection, get_db_path
+from config.settings import (LOG_RETENTION_DAYS, LOG_ARCHIVE_DIR, LOG_ARCHIVE_CHUNK_SIZE,
+                             LOG_ARCHIVE_SEGMENTS_PER_PAGE)
+from utils.logging_setup import get_logger
+
+log = get_logger('logs')
+
+LOG_COLUMNS = ('id', 'event_type', 'user_id', 'channel_id', 'description', 'timestamp')
+
+def get_archive_dir():
+    """Resolve the archive directory (defaults to a folder next to the database)"""
+    if LOG_ARCHIVE_DIR:
+        return LOG_ARCHIVE_DIR
+    return os.path.join(os.path.dirname(os.path.abspath(get_db_path())), 'log_archives')
+
+def get_segment_path(guild_id, bucket):
+    """Path of the archive segment holding one guild's logs for one day"""
+    return os.path.join(get_archive_dir(), str(guild_id), f"server_logs-{bucket}.jsonl.gz")
+
+def set_log_retention(guild_id, days):
+    """Set a guild's log retention in days (None restores the default, 0 keeps logs forever)"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        if days is None:
+            cursor.execute('DELETE FROM log_retention WHERE guild_id = ?', (guild_id,))
+        else:
+            cursor.execute('''INSERT INTO log_retention (guild_id, retention_days) VALUES (?, ?)
+                             ON CONFLICT (guild_id) DO UPDATE SET retention_days = excluded.retention_days''',
+                           (guild_id, days))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        log.warning("Error setting log retention: %s", e)
+        return False
+
+def get_log_retention(guild_id):
+    """Get a guild's effective log retention in days"""
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute('SELECT retention_days FROM log_retention WHERE guild_id = ?', (guild_id,))
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else LOG_RETENTION_DAYS
+    except Exception as e:
+        log.warning("Error getting log retention: %s", e)
+        return LOG_RETENTION_DAYS
+
+def _append_segment(guild_id, bucket, rows):
+    """Append rows to a day segment as a new gzip member and fsync it"""
+    path = get_segment_path(guild_id, bucket)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    payload = ''.join(json.dumps(dict(zip(LOG_COLUMNS, row))) + '\n' for row in rows)
+    with open(path, 'ab') as f:
+        f.write(gzip.compress(payload.encode('utf-8')))
+        f.flush()
+        os.fsync(f.fileno())
+    return path
+
+def archive_guild_logs(conn, guild_id, retention_days, chunk_size=LOG_ARCHIVE_CHUNK_SIZE):
+    """Move one guild's logs older than its retention window into archive segments.
+
+    Rows are exported and deleted one chunk at a time, oldest first; each
+    chunk is written and fsynced before its rows are deleted, so a crash can
+    at worst duplicate a chunk in the archive but never lose it.
+    """
+    cutoff = (datetime.utcnow() - timedelta(days=retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    cursor = conn.cursor()
+    archived = 0
+
+    while True:
+        cursor.execute('''SELECT id, event_type, user_id, channel_id, description, timestamp
+                         FROM server_logs
+                         WHERE guild_id = ? AND timestamp < ?
+                         ORDER BY timestamp, id LIMIT ?''', (guild_id, cutoff, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            break
+
+        # Group the chunk by day bucket
+        buckets = {}
+        for row in rows:
+            buckets.setdefault(row[5][:10], []).append(row)
+
+        for bucket, bucket_rows in buckets.items():
+            path = _append_segment(guild_id, bucket, bucket_rows)
+            cursor.execute('''INSERT INTO log_archive_segments
+                                 (guild_id, bucket, path, row_count, min_timestamp, max_timestamp)
+                             VALUES (?, ?, ?, ?, ?, ?)
+                             ON CONFLICT (guild_id, bucket) DO UPDATE SET
+                                 row_count = row_count + excluded.row_count,
+                                 min_timestamp = MIN(min_timestamp, excluded.min_timestamp),
+                                 max_timestamp = MAX(max_timestamp, excluded.max_timestamp)''',
+                           (guild_id, bucket, path, len(bucket_rows),
+                            bucket_rows[0][5], bucket_rows[-1][5]))
+
+        cursor.executemany('DELETE FROM server_logs WHERE id = ?', [(row[0],) for row in rows])
+        conn.commit()
+        archived += len(rows)
+
+        if len(rows) < chunk_size:
+            break
+
+    return archived
+
+def release_free_pages(conn, step=1000):
+    """Return the database's free pages to the OS (auto_vacuum=INCREMENTAL).
+
+    The pragma frees one page per result row, but its rows have no columns
+    and Python's sqlite3 stops such a statement after the first step - one
+    page. executescript() steps it to completion, in bounded batches until
+    the freelist is empty.
+    """
+    cursor = conn.cursor()
+    cursor.execute('PRAGMA freelist_count')
+    free = cursor.fetchone()[0]
+    while free:
+        conn.executescript(f'PRAGMA incremental_vacuum({int(step)});')
+        cursor.execute('PRAGMA freelist_count')
+        remaining = cursor.fetchone()[0]
+        if remaining >= free:
+            break  # Nothing was freed (auto_vacuum isn't INCREMENTAL)
+        free = remaining
+
+def run_log_retention():
+    """Archive expired logs for every guild, then hand freed pages back to the OS.
+
+    Returns the total number of rows archived.
+    """
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        archived = 0
+        guild_id = -1
+        while True:
+            # Hop between guilds on the (guild_id, ...) index instead of a
+            # DISTINCT scan over every log row
+            cursor.execute('SELECT MIN(guild_id) FROM server_logs WHERE guild_id > ?', (guild_id,))
+            guild_id = cursor.fetchone()[0]
+            if guild_id is None:
+                break
+            retention_days = get_log_retention(guild_id)
+            if retention_days and retention_days > 0:
+                archived += archive_guild_logs(conn, guild_id, retention_days)
+
+        if archived:
+            release_free_pages(conn)
+        conn.close()
+        return archived
+    except Exception as e:
+        log.warning("Error running log retention: %s", e)
+        return 0
+
+def _matches(entry, event_type, user_id, channel_id, since, until, before):
+    """Check an archived entry against the same filters get_server_logs_page applies"""
+    if event_type is not None and entry['event_type'] != event_type:
+        return False
+    if user_id is not None and entry['user_id'] != user_id:
+        return False
+    if channel_id is not None and entry['channel_id'] != channel_id:
+        return False
+    if since is not None and entry['timestamp'] < since:
+        return False
+    if until is not None and entry['timestamp'] >= until:
+        return False
+    if before is not None and (entry['timestamp'], entry['id']) >= tuple(before):
+        return False
+    return True
+
+def _segment_query(guild_id, since, until, before):
+    query = 'SELECT bucket, path FROM log_archive_segments WHERE guild_id = ?'
+    params = [guild_id]
+    if since is not None:
+        query += ' AND bucket >= ?'
+        params.append(since[:10])
+    if until is not None:
+        query += ' AND bucket <= ?'
+        params.append(until[:10])
+    if before is not None:
+        query += ' AND bucket <= ?'
+        params.append(before[0][:10])
+    return query, params
+
+def has_archived_logs(guild_id, since=None, until=None, before=None):
+    """Whether any archive segment overlaps the range (metadata only, no segment is opened)"""
+    query, params = _segment_query(guild_id, since, until, before)
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(query + ' LIMIT 1', params)
+        found = cursor.fetchone() is not None
+        conn.close()
+        return found
+    except Exception as e:
+        log.warning("Error reading archive segments: %s", e)
+        return False
+
+def get_archived_logs_page(guild_id, event_type=None, user_id=None, channel_id=None,
+                           since=None, until=None, before=None, limit=10,
+                           max_segments=LOG_ARCHIVE_SEGMENTS_PER_PAGE):
+    """Read up to limit archived log rows older than the before cursor, newest first.
+
+    At most max_segments day segments are opened, so a filter that matches
+    little costs the same per page however large the archive grows. Returns
+    ``(rows, resume)``: when the segment budget ran out first, resume is a
+    cursor just before the oldest day read, to continue from on the next
+    page; otherwise it is None. Blocking - call it from an executor.
+    """
+    query, params = _segment_query(guild_id, since, until, before)
+    query += ' ORDER BY bucket DESC LIMIT ?'
+    params.append(max_segments + 2)  # One day may already be behind the cursor, one more tells if there is a rest
+
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        segments = cursor.fetchall()
+        conn.close()
+    except Exception as e:
+        log.warning("Error reading archive segments: %s", e)
+        return [], None
+
+    if before is not None:
+        # A resume cursor sits at midnight of a day that was already read
+        segments = [(bucket, path) for bucket, path in segments if (f"{bucket} 00:00:00", 0) < tuple(before)]
+
+    rows = []
+    for bucket, path in segments[:max_segments]:
+        last_bucket = bucket
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entries = [json.loads(line) for line in f if line.strip()]
+        except (OSError, ValueError) as e:
+            log.warning("Error reading archive segment %s: %s", path, e)
+            continue
+
+        entries.sort(key=lambda entry: (entry['timestamp'], entry['id']), reverse=True)
+        for entry in entries:
+            if _matches(entry, event_type, user_id, channel_id, since, until, before):
+                rows.append(tuple(entry[column] for column in LOG_COLUMNS))
+                if len(rows) >= limit:
+                    return rows, None
+
+    if len(segments) > max_segments:
+        return rows, (f"{last_bucket} 00:00:00", 0)
+    return rows, None
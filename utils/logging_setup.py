@@ -0,0 +1,171 @@
+"""
+Structured, non-blocking logging.
+
+Every module logs through get_logger('<subsystem>'). Records are handed to
+a bounded in-memory queue and written to stdout by a background listener
+thread, so a slow log collector can never stall the event loop - when the
+queue is full, records are dropped and counted instead of blocking.
+Tracebacks are formatted on the listener thread too.
+
+Levels are set per subsystem (LOG_LEVEL plus LOG_LEVELS overrides such as
+"music=DEBUG,db=WARNING,discord=WARNING"), and repeated messages are
+rate limited: after LOG_REPEAT_BURST identical ones in a window only every
+LOG_REPEAT_SAMPLE_EVERY-th is written, carrying how many were suppressed.
+Output is one JSON object per line (LOG_FORMAT=json) or plain text.
+"""
+import sys
+import json
+import time
+import queue
+import atexit
+import logging
+import threading
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from config.settings import (LOG_LEVEL, LOG_LEVELS, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_REPEAT_BURST,
+                             LOG_REPEAT_WINDOW_SECONDS, LOG_REPEAT_SAMPLE_EVERY)
+
+# Attributes every LogRecord has; anything else was passed via extra= and is output as a field
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName', 'suppressed'}
+
+_listener = None
+_handler = None
+
+def get_logger(subsystem):
+    """Logger for one subsystem of the bot (music, db, automod, ...)"""
+    return logging.getLogger(_logger_name(subsystem))
+
+def _logger_name(subsystem):
+    # Third-party loggers (discord, ...) keep their own names
+    if subsystem == 'discord' or subsystem.startswith('discord.'):
+        return subsystem
+    return f"bot.{subsystem}"
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'subsystem': record.name[4:] if record.name.startswith('bot.') else record.name,
+            'msg': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            entry['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s')
+
+    def format(self, record):
+        text = super().format(record)
+        if getattr(record, 'suppressed', 0):
+            text += f" (+{record.suppressed} similar suppressed)"
+        return text
+
+class RepeatFilter(logging.Filter):
+    """Rate limits records that share a logger, level and message template.
+
+    The first `burst` in each window pass, then one in every `sample_every`.
+    The next record that passes carries the number dropped since the last one.
+    """
+
+    def __init__(self, burst=LOG_REPEAT_BURST, window=LOG_REPEAT_WINDOW_SECONDS, sample_every=LOG_REPEAT_SAMPLE_EVERY):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.sample_every = max(1, sample_every)
+        self.lock = threading.Lock()
+        self.seen = {}  # key -> [window start, count in window, suppressed since last pass]
+        self.suppressed_total = 0
+
+    def filter(self, record):
+        key = (record.name, record.levelno, record.msg if isinstance(record.msg, str) else type(record.msg))
+        now = time.monotonic()
+        with self.lock:
+            state = self.seen.get(key)
+            if state is None or now - state[0] >= self.window:
+                if len(self.seen) >= 10000:
+                    self._prune(now)
+                suppressed = state[2] if state is not None else 0
+                state = self.seen[key] = [now, 0, suppressed]
+            state[1] += 1
+            count = state[1]
+            if count > self.burst and (count - self.burst) % self.sample_every:
+                state[2] += 1
+                self.suppressed_total += 1
+                return False
+            record.suppressed = state[2]
+            state[2] = 0
+        return True
+
+    def _prune(self, now):
+        for key in [key for key, state in self.seen.items() if now - state[0] >= self.window]:
+            del self.seen[key]
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops instead of blocking and leaves formatting to the listener"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only the message is rendered here (args may change after the call);
+        # tracebacks stay as exc_info and are formatted on the listener thread
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def _parse_levels(spec):
+    levels = {}
+    for part in (spec or '').split(','):
+        if '=' in part:
+            name, level = part.split('=', 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def setup_logging():
+    """Route all logging (ours and discord.py's) through the background queue. Safe to call twice."""
+    global _listener, _handler
+    if _listener is not None:
+        return
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == 'json' else TextFormatter())
+
+    _handler = NonBlockingQueueHandler(log_queue)
+    _handler.addFilter(RepeatFilter())
+    root = logging.getLogger()
+    root.handlers[:] = [_handler]
+    root.setLevel(LOG_LEVEL.upper())
+    for subsystem, level in _parse_levels(LOG_LEVELS).items():
+        logging.getLogger(_logger_name(subsystem)).setLevel(level)
+
+    _listener = QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)  # Drain what's queued on shutdown
+
+def logging_stats():
+    if _handler is None:
+        return {}
+    repeat_filter = next(f for f in _handler.filters if isinstance(f, RepeatFilter))
+    return {
+        'queued': _handler.queue.qsize(),
+        'dropped': _handler.dropped,
+        'suppressed': repeat_filter.suppressed_total,
+    }
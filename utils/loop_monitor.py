@@ -0,0 +1,148 @@
+"""
+Event-loop health: lag sampling, slow-callback stacks and handler latencies.
+
+A sampler task sleeps LOOP_LAG_SAMPLE_SECONDS at a time and records how late
+it wakes up - that overshoot is how long other code held the loop. A watchdog
+thread watches the sampler's heartbeat; once the loop has been stuck for
+LOOP_SLOW_CALLBACK_SECONDS it grabs the loop thread's current stack, which
+is the blocking code itself (a sqlite call, requests, an ffmpeg probe...).
+Gateway events and command handlers are timed into latency histograms.
+Nothing here needs asyncio debug mode.
+"""
+import sys
+import time
+import asyncio
+import threading
+import traceback
+from collections import deque
+from functools import wraps
+from config.settings import (LOOP_LAG_SAMPLE_SECONDS, LOOP_SLOW_CALLBACK_SECONDS, LOOP_SLOW_CALLBACK_HISTORY,
+                             LOOP_MONITOR_MAX_HANDLERS)
+from utils.logging_setup import get_logger
+from utils.metrics import Histogram, registry
+
+log = get_logger('loop')
+
+STACK_DEPTH = 12  # Innermost frames kept per slow callback
+
+class LoopMonitor:
+    def __init__(self):
+        self.lag = Histogram()
+        self.handlers = {}  # (kind, name) -> Histogram; kind is 'event' or 'command'
+        self.slow_callbacks = deque(maxlen=LOOP_SLOW_CALLBACK_HISTORY)  # Newest last
+        self.stalls = 0
+        self.heartbeat = time.monotonic()  # When the sampler last got the loop
+        self.loop_thread = None
+        self.lock = threading.Lock()
+        self._stall = None  # (monotonic time caught, stack) of the stall in progress
+        self._sampler = None
+        self._watchdog = None
+
+    def start(self, loop):
+        """Start sampling the given loop (call from the loop thread; safe to call again)"""
+        if self._sampler is not None and not self._sampler.done():
+            return
+        self.loop_thread = threading.get_ident()
+        self.heartbeat = time.monotonic()
+        self._sampler = loop.create_task(self._sample())
+        if self._watchdog is None:
+            self._watchdog = threading.Thread(target=self._watch, name='loop-watchdog', daemon=True)
+            self._watchdog.start()
+
+    async def _sample(self):
+        while True:
+            before = time.monotonic()
+            self.heartbeat = before
+            await asyncio.sleep(LOOP_LAG_SAMPLE_SECONDS)
+            lag = max(0.0, time.monotonic() - before - LOOP_LAG_SAMPLE_SECONDS)
+            self.heartbeat = time.monotonic()
+            self.lag.observe(lag)
+            if lag >= LOOP_SLOW_CALLBACK_SECONDS:
+                self._record_stall(lag)
+
+    def _watch(self):
+        poll = max(0.02, LOOP_SLOW_CALLBACK_SECONDS / 2)
+        limit = LOOP_LAG_SAMPLE_SECONDS + LOOP_SLOW_CALLBACK_SECONDS
+        idle = threading.Event()
+        while not idle.wait(poll):
+            heartbeat = self.heartbeat
+            if time.monotonic() - heartbeat < limit or self._stall is not None:
+                continue
+            frame = sys._current_frames().get(self.loop_thread)
+            if frame is None or self.heartbeat != heartbeat:
+                continue
+            stack = ''.join(traceback.format_list(traceback.extract_stack(frame)[-STACK_DEPTH:]))
+            with self.lock:
+                self._stall = (heartbeat, stack)
+
+    def _record_stall(self, lag):
+        with self.lock:
+            stall, self._stall = self._stall, None
+        self.stalls += 1
+        stack = stall[1] if stall is not None else None
+        self.slow_callbacks.append({'at': time.time(), 'seconds': lag, 'stack': stack})
+        log.warning("🐢 Event loop blocked for %.0f ms", lag * 1000, extra={'stack': stack})
+
+    def observe(self, kind, name, seconds):
+        histogram = self.handlers.get((kind, name))
+        if histogram is None:
+            if len(self.handlers) >= LOOP_MONITOR_MAX_HANDLERS:
+                name = 'other'  # Keep user-typed command names from growing this without bound
+            histogram = self.handlers.setdefault((kind, name), Histogram())
+        histogram.observe(seconds)
+
+    def event(self, handler):
+        """Decorator timing a client event handler (on_message, ...)"""
+        name = handler.__name__
+
+        @wraps(handler)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                self.observe('event', name, time.perf_counter() - start)
+        return timed
+
+    def commands(self, group, label=None):
+        """Decorator timing a process_*_commands dispatcher; only messages it handled are recorded.
+
+        Each command is timed under its first word (`music:!play`) unless a fixed
+        label is given, e.g. for free-text triggers like `--topic` searches.
+        """
+        def decorate(dispatcher):
+            @wraps(dispatcher)
+            async def timed(message, *args, **kwargs):
+                start = time.perf_counter()
+                handled = await dispatcher(message, *args, **kwargs)
+                if handled:
+                    word = label or (message.content.split(maxsplit=1) or [''])[0].lower()
+                    self.observe('command', f"{group}:{word}", time.perf_counter() - start)
+                return handled
+            return timed
+        return decorate
+
+    def report(self, top=10):
+        """Lag summary, recent slow callbacks and the slowest handlers by p99"""
+        handlers = sorted(((kind, name, histogram.summary()) for (kind, name), histogram in self.handlers.items()),
+                          key=lambda entry: entry[2]['p99'], reverse=True)
+        return {
+            'lag': self.lag.summary(),
+            'stalls': self.stalls,
+            'slow_callbacks': list(self.slow_callbacks),
+            'handlers': handlers[:top],
+        }
+
+loop_monitor = LoopMonitor()
+
+@registry.collector
+def _collect():
+    handlers = loop_monitor.handlers
+    return [
+        ('bot_event_loop_lag_seconds', "How late the event loop ran a timer (time it was blocked)", 'histogram',
+         [({}, loop_monitor.lag)]),
+        ('bot_event_loop_stalls_total', "Times the event loop was blocked past the slow-callback threshold", 'counter',
+         [({}, loop_monitor.stalls)]),
+        ('bot_handler_seconds', "Latency of gateway event handlers and commands", 'histogram',
+         [({'kind': kind, 'name': name}, histogram) for (kind, name), histogram in list(handlers.items())]),
+    ]
@@ -0,0 +1,98 @@
+"""
+Per-track loudness normalization.
+
+Each YouTube video is measured once from its local audio cache file (EBU
+R128 integrated loudness via ffmpeg's loudnorm filter) and the gain needed
+to reach LOUDNESS_TARGET_LUFS is stored in SQLite. Live streams are never
+analyzed - that would download the audio a second time. Playback applies
+the gain in the ffmpeg filter chain when the stream starts, so tracks come
+out at a similar level without any per-frame work in Python.
+"""
+import json
+import asyncio
+import subprocess
+from config.settings import (LOUDNESS_NORMALIZATION, LOUDNESS_TARGET_LUFS, LOUDNESS_TRUE_PEAK,
+                             LOUDNESS_MAX_GAIN_DB, LOUDNESS_ANALYSIS_MAX_SECONDS, FFMPEG_OPTIONS)
+from utils.database import get_track_loudness, save_track_loudness
+from utils.extraction_pool import extraction_pool, BACKGROUND
+from utils.logging_setup import get_logger
+
+log = get_logger('loudness')
+
+_gains = {}  # video_id -> gain_db, so repeat plays skip the database
+_unavailable = set()  # Videos whose analysis failed this run
+
+def db_to_factor(gain_db):
+    return 10 ** ((gain_db or 0.0) / 20)
+
+def compute_gain(integrated, true_peak):
+    """Gain in dB that brings a track to the target without pushing peaks past the ceiling"""
+    if integrated is None or integrated < -70:  # Silence - nothing sensible to normalize
+        return 0.0
+    gain = LOUDNESS_TARGET_LUFS - integrated
+    if true_peak is not None:
+        gain = min(gain, LOUDNESS_TRUE_PEAK - true_peak)
+    return max(-LOUDNESS_MAX_GAIN_DB, min(LOUDNESS_MAX_GAIN_DB, gain))
+
+def measure_loudness(source, before_options=''):
+    """Run a loudnorm analysis pass over a file or URL (blocking).
+
+    Returns (integrated LUFS, true peak dBTP, loudness range LU).
+    """
+    command = [FFMPEG_OPTIONS.get('executable', 'ffmpeg'), '-nostdin', '-hide_banner', '-nostats']
+    command += before_options.split()
+    command += ['-i', source, '-t', str(LOUDNESS_ANALYSIS_MAX_SECONDS), '-vn',
+                '-af', f"loudnorm=I={LOUDNESS_TARGET_LUFS}:TP={LOUDNESS_TRUE_PEAK}:print_format=json",
+                '-f', 'null', '-']
+    result = subprocess.run(command, check=True, capture_output=True)
+    # loudnorm prints its JSON summary as the last {...} block on stderr
+    stderr = result.stderr.decode(errors='ignore')
+    summary = json.loads(stderr[stderr.rindex('{'):stderr.rindex('}') + 1])
+
+    def number(key):
+        try:
+            return float(summary[key])
+        except (KeyError, ValueError):
+            return None  # "-inf" for silent input
+
+    return number('input_i'), number('input_tp'), number('input_lra')
+
+def analyze_track(video_id, source, before_options=''):
+    """Measure a track and store its gain; returns the gain in dB. Runs on the extraction pool."""
+    integrated, true_peak, loudness_range = measure_loudness(source, before_options)
+    gain = compute_gain(integrated, true_peak)
+    save_track_loudness(video_id, integrated, true_peak, loudness_range, gain)
+    return gain
+
+async def get_gain(video_id):
+    """Stored gain for a video in dB, or None if it hasn't been measured yet"""
+    if not LOUDNESS_NORMALIZATION or not video_id:
+        return None
+    if video_id not in _gains:
+        gain = await asyncio.get_running_loop().run_in_executor(None, get_track_loudness, video_id)
+        if gain is None:
+            return None
+        _gains[video_id] = gain
+    return _gains[video_id]
+
+async def schedule_analysis(video_id, path):
+    """Measure a locally cached track in the background so its next play is normalized"""
+    if not LOUDNESS_NORMALIZATION or video_id in _gains or video_id in _unavailable:
+        return
+    try:
+        gain = await extraction_pool.run(analyze_track, video_id, path,
+                                         priority=BACKGROUND, key=('loudness', video_id))
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        _unavailable.add(video_id)
+        log.warning("Loudness analysis failed for %s: %s", video_id, e)
+        return
+    _gains[video_id] = gain
+    log.info("🔊 Measured %s: %+.1f dB to reach %s LUFS", video_id, gain, LOUDNESS_TARGET_LUFS)
+
+def ffmpeg_options(base_options, factor):
+    """FFmpeg source options with a volume filter applying factor at stream start"""
+    options = dict(base_options)
+    options['options'] = f"{base_options.get('options', '')} -af volume={factor:.4f}".strip()
+    return options
@@ -0,0 +1,168 @@
+"""
+Member caching policy - decides which members discord.py keeps in memory,
+chunks guilds lazily on first demand and keeps a compact ID-only record of
+departed members, so moderation lookups in guilds that aren't chunked only
+go to the REST API for IDs that may still be members.
+"""
+import os
+import asyncio
+import bisect
+from array import array
+import discord
+from config.settings import MEMBER_CACHE_POLICY, MEMBERS_INTENT
+
+_members_intent = False  # Set by configure_intents()
+
+def configure_intents(intents):
+    """Apply the member intent setting to the bot's intents"""
+    global _members_intent
+    intents.members = MEMBERS_INTENT or MEMBER_CACHE_POLICY == 'full'
+    _members_intent = intents.members
+    return intents
+
+def client_cache_options(intents):
+    """Client kwargs for the configured policy.
+
+    full    - cache every member and chunk every guild at startup
+    lazy    - cache voice/joined members, chunk a guild the first time a
+              command needs its full member list
+    minimal - cache only members in voice channels, never chunk
+    """
+    if MEMBER_CACHE_POLICY == 'full':
+        return {
+            'member_cache_flags': discord.MemberCacheFlags.from_intents(intents),
+            'chunk_guilds_at_startup': True,
+        }
+
+    flags = discord.MemberCacheFlags.none()
+    flags.voice = intents.voice_states
+    if MEMBER_CACHE_POLICY == 'lazy':
+        flags.joined = intents.members
+    return {
+        'member_cache_flags': flags,
+        'chunk_guilds_at_startup': False,
+    }
+
+class MemberIdSet:
+    """Sorted array of member IDs - 8 bytes per member instead of a Member object"""
+
+    def __init__(self):
+        self.ids = array('Q')
+
+    def add(self, user_id):
+        pos = bisect.bisect_left(self.ids, user_id)
+        if pos == len(self.ids) or self.ids[pos] != user_id:
+            self.ids.insert(pos, user_id)
+
+    def discard(self, user_id):
+        pos = bisect.bisect_left(self.ids, user_id)
+        if pos < len(self.ids) and self.ids[pos] == user_id:
+            del self.ids[pos]
+
+    def __contains__(self, user_id):
+        pos = bisect.bisect_left(self.ids, user_id)
+        return pos < len(self.ids) and self.ids[pos] == user_id
+
+    def __len__(self):
+        return len(self.ids)
+
+_departed_members = {}  # guild ID -> MemberIdSet of members seen leaving or not found
+_chunk_locks = {}  # guild ID -> lock held while that guild is being chunked
+
+def note_member(guild_id, user_id):
+    """Record that a user is (again) a member of a guild"""
+    departed = _departed_members.get(guild_id)
+    if departed is not None:
+        departed.discard(user_id)
+
+def forget_member(guild_id, user_id):
+    """Record that a user is no longer a member of a guild"""
+    departed = _departed_members.get(guild_id)
+    if departed is None:
+        departed = _departed_members[guild_id] = MemberIdSet()
+    departed.add(user_id)
+
+def is_departed(guild_id, user_id):
+    departed = _departed_members.get(guild_id)
+    return departed is not None and user_id in departed
+
+def forget_guild(guild_id):
+    _departed_members.pop(guild_id, None)
+    _chunk_locks.pop(guild_id, None)
+
+async def ensure_chunked(guild):
+    """Chunk a guild's member list once, on first demand (lazy policy only).
+
+    Returns True if the guild's full member list is cached afterwards.
+    """
+    if guild.chunked:
+        return True
+    if MEMBER_CACHE_POLICY != 'lazy' or not _members_intent:
+        return False
+
+    lock = _chunk_locks.setdefault(guild.id, asyncio.Lock())
+    async with lock:
+        if not guild.chunked:
+            await guild.chunk(cache=True)
+            # Name index was built from the partial cache
+            from utils.member_index import member_index
+            member_index.on_guild_remove(guild)
+    return guild.chunked
+
+async def resolve_member(guild, user_id):
+    """Get a member by ID from the cache, falling back to the REST API"""
+    member = guild.get_member(user_id)
+    if member is not None:
+        return member
+    # A chunked guild's cache is authoritative; unknown IDs in an unchunked
+    # guild that we've never seen leave are worth one REST lookup
+    if guild.chunked or is_departed(guild.id, user_id):
+        return None
+    try:
+        member = await guild.fetch_member(user_id)
+    except discord.NotFound:
+        forget_member(guild.id, user_id)
+        return None
+    except discord.HTTPException:
+        return None  # Transient (5xx, 429) - the next lookup tries again
+    note_member(guild.id, user_id)
+    return member
+
+def _process_rss_kb():
+    """Resident set size of this process in KiB (Linux), or None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def memory_report(client, limit=10):
+    """Per-guild member cache report, largest caches first"""
+    from utils.member_index import member_index
+    guilds = []
+    for guild in client.guilds:
+        departed = _departed_members.get(guild.id)
+        index = member_index.guilds.get(guild.id)
+        guilds.append({
+            'id': guild.id,
+            'name': guild.name,
+            'member_count': guild.member_count or 0,
+            'cached_members': len(guild.members),
+            'chunked': guild.chunked,
+            'departed_ids': len(departed) if departed else 0,
+            'departed_ids_bytes': departed.ids.itemsize * len(departed) if departed else 0,
+            'name_index_keys': len(index.sorted_keys) if index else 0,
+        })
+    guilds.sort(key=lambda entry: entry['cached_members'], reverse=True)
+    return {
+        'policy': MEMBER_CACHE_POLICY,
+        'members_intent': _members_intent,
+        'rss_kb': _process_rss_kb(),
+        'pid': os.getpid(),
+        'total_cached_members': sum(entry['cached_members'] for entry in guilds),
+        'total_members': sum(entry['member_count'] for entry in guilds),
+        'guilds': guilds[:limit],
+    }
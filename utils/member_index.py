@@ -0,0 +1,179 @@
+"""
+Per-guild member name index - maps case-folded usernames, display names and
+tags to member IDs so name lookups don't scan guild.members.
+"""
+import bisect
+import difflib
+from collections import OrderedDict
+from config.settings import MEMBER_INDEX_MAX_GUILDS
+
+def member_keys(member):
+    """All case-folded names a member can be looked up by"""
+    keys = {member.name.casefold(), member.display_name.casefold(), str(member).casefold()}
+    global_name = getattr(member, 'global_name', None)
+    if global_name:
+        keys.add(global_name.casefold())
+    return frozenset(keys)
+
+class GuildNameIndex:
+    """Name index for a single guild, kept sorted for prefix lookups"""
+
+    def __init__(self):
+        self.names = {}  # key -> set of member IDs
+        self.keys_by_member = {}  # member ID -> keys it is indexed under
+        self.sorted_keys = []
+
+    @classmethod
+    def build(cls, members):
+        """Build an index from a full member list, sorting the keys once"""
+        index = cls()
+        for member in members:
+            keys = member_keys(member)
+            index.keys_by_member[member.id] = keys
+            for key in keys:
+                index.names.setdefault(key, set()).add(member.id)
+        index.sorted_keys = sorted(index.names)
+        return index
+
+    def add(self, member):
+        self.remove(member.id)
+        keys = member_keys(member)
+        self.keys_by_member[member.id] = keys
+        for key in keys:
+            ids = self.names.get(key)
+            if ids is None:
+                self.names[key] = ids = set()
+                bisect.insort(self.sorted_keys, key)
+            ids.add(member.id)
+
+    def remove(self, member_id):
+        for key in self.keys_by_member.pop(member_id, ()):
+            ids = self.names.get(key)
+            if ids is None:
+                continue
+            ids.discard(member_id)
+            if not ids:
+                del self.names[key]
+                pos = bisect.bisect_left(self.sorted_keys, key)
+                if pos < len(self.sorted_keys) and self.sorted_keys[pos] == key:
+                    del self.sorted_keys[pos]
+
+    def exact(self, query):
+        return self.names.get(query.casefold(), set())
+
+    def prefix(self, query, limit):
+        """Member IDs whose names start with query, in name order"""
+        query = query.casefold()
+        found = []
+        pos = bisect.bisect_left(self.sorted_keys, query)
+        while pos < len(self.sorted_keys) and len(found) < limit:
+            key = self.sorted_keys[pos]
+            if not key.startswith(query):
+                break
+            for member_id in self.names[key]:
+                if member_id not in found:
+                    found.append(member_id)
+            pos += 1
+        return found[:limit]
+
+    def fuzzy(self, query, limit):
+        """Member IDs with names close to query (typos), compared only against
+        names sharing its first character to keep the candidate set small"""
+        query = query.casefold()
+        if not query:
+            return []
+        start = bisect.bisect_left(self.sorted_keys, query[0])
+        end = bisect.bisect_left(self.sorted_keys, query[0] + '\uffff')
+        matches = difflib.get_close_matches(query, self.sorted_keys[start:end], n=limit, cutoff=0.7)
+        found = []
+        for key in matches:
+            for member_id in self.names[key]:
+                if member_id not in found:
+                    found.append(member_id)
+        return found[:limit]
+
+class MemberNameIndex:
+    """Lazily built name indexes for the most recently used guilds.
+
+    At most MEMBER_INDEX_MAX_GUILDS guild indexes are kept; the least
+    recently used one is dropped and rebuilt on its next lookup.
+    """
+
+    def __init__(self, max_guilds=MEMBER_INDEX_MAX_GUILDS):
+        self.max_guilds = max_guilds
+        self.guilds = OrderedDict()
+
+    def _get(self, guild):
+        index = self.guilds.get(guild.id)
+        if index is None:
+            index = GuildNameIndex.build(guild.members)
+            self.guilds[guild.id] = index
+            while len(self.guilds) > self.max_guilds:
+                self.guilds.popitem(last=False)
+        else:
+            self.guilds.move_to_end(guild.id)
+        return index
+
+    def lookup(self, guild, query):
+        """Resolve a name, display name or tag to a member (exact, case-insensitive)"""
+        index = self._get(guild)
+        candidates = [guild.get_member(member_id) for member_id in index.exact(query)]
+        candidates = [member for member in candidates if member is not None]
+        if not candidates:
+            return None
+        # Prefer a username match over a display name match, then the lowest ID
+        folded = query.casefold()
+        candidates.sort(key=lambda member: (member.name.casefold() != folded, member.id))
+        return candidates[0]
+
+    def suggest(self, guild, query, limit=5):
+        """Members whose names start with or closely resemble query"""
+        index = self._get(guild)
+        member_ids = index.prefix(query, limit)
+        if len(member_ids) < limit:
+            for member_id in index.fuzzy(query, limit):
+                if member_id not in member_ids:
+                    member_ids.append(member_id)
+        members = [guild.get_member(member_id) for member_id in member_ids[:limit]]
+        return [member for member in members if member is not None]
+
+    # Incremental maintenance - only guilds that already have an index are touched
+
+    def on_member_join(self, member):
+        index = self.guilds.get(member.guild.id)
+        if index is not None:
+            index.add(member)
+
+    def on_member_update(self, before, after):
+        index = self.guilds.get(after.guild.id)
+        if index is not None and member_keys(before) != member_keys(after):
+            index.add(after)
+
+    def on_member_remove(self, member):
+        index = self.guilds.get(member.guild.id)
+        if index is not None:
+            index.remove(member.id)
+
+    def on_user_update(self, before, after, get_guild):
+        # Username/global name changes apply to the user in every guild
+        if member_keys(before) == member_keys(after):
+            return
+        for guild_id, index in self.guilds.items():
+            if after.id in index.keys_by_member:
+                guild = get_guild(guild_id)
+                member = guild.get_member(after.id) if guild else None
+                if member is not None:
+                    index.add(member)
+
+    def on_guild_remove(self, guild):
+        self.guilds.pop(guild.id, None)
+
+    def stats(self):
+        """Indexed guild count and total indexed keys (for memory reports)"""
+        return {
+            'guilds': len(self.guilds),
+            'members': sum(len(index.keys_by_member) for index in self.guilds.values()),
+            'keys': sum(len(index.sorted_keys) for index in self.guilds.values()),
+        }
+
+member_index = MemberNameIndex()
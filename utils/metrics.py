@@ -0,0 +1,262 @@
+"""
+In-process metrics with a Prometheus text endpoint.
+
+Counters, gauges and histograms live in one registry. Recording is a dict
+lookup plus an addition, and hot paths bind their labelled child once and
+keep it. Values that already exist elsewhere (queue depths, voice sessions,
+the extraction pool's counters) aren't duplicated - collectors read them
+when /metrics is scraped. The endpoint is a small asyncio server on the
+bot's own event loop, so it needs no extra thread or dependency.
+"""
+import time
+import bisect
+import asyncio
+import aiohttp
+from config.settings import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+from utils.logging_setup import get_logger, logging_stats
+
+log = get_logger('metrics')
+
+# Histogram bucket upper bounds in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+class Counter:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+class Gauge:
+    __slots__ = ('value',)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+class Histogram:
+    """Fixed-bucket latency histogram (cumulative export, quantiles estimated from buckets)"""
+    __slots__ = ('bounds', 'counts', 'count', 'total', 'max')
+
+    def __init__(self, bounds=LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def time(self):
+        """Context manager observing the seconds its block took"""
+        return _Timer(self)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th observation (max for the +Inf bucket)"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'avg': self.total / self.count if self.count else 0.0,
+            'p50': self.quantile(0.5),
+            'p99': self.quantile(0.99),
+            'max': self.max,
+        }
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+_TYPES = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+class MetricFamily:
+    """One metric name; a child per combination of label values"""
+
+    def __init__(self, name, help_text, kind, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.children = {}  # label values tuple -> Counter/Gauge/Histogram
+
+    def labels(self, *values):
+        child = self.children.get(values)
+        if child is None:
+            child = self.children[values] = _TYPES[self.kind]()
+        return child
+
+    def samples(self):
+        for values, child in self.children.items():
+            yield dict(zip(self.labelnames, values)), child
+
+class Registry:
+    def __init__(self):
+        self.families = {}
+        self.collectors = []
+
+    def _family(self, name, help_text, kind, labelnames):
+        family = self.families.get(name)
+        if family is None:
+            family = self.families[name] = MetricFamily(name, help_text, kind, labelnames)
+        return family if labelnames else family.labels()
+
+    def counter(self, name, help_text, labelnames=()):
+        """A Counter, or its family when labelnames are given (then use .labels(...))"""
+        return self._family(name, help_text, 'counter', labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, 'gauge', labelnames)
+
+    def histogram(self, name, help_text, labelnames=()):
+        return self._family(name, help_text, 'histogram', labelnames)
+
+    def collector(self, func):
+        """Register func() -> iterable of (name, help, kind, [(labels, value or Histogram)]), read at scrape time"""
+        self.collectors.append(func)
+        return func
+
+    def render(self):
+        """Prometheus text exposition format (0.0.4)"""
+        lines = []
+        for family in list(self.families.values()):
+            _render_family(lines, family.name, family.help, family.kind, family.samples())
+        for func in self.collectors:
+            try:
+                for name, help_text, kind, samples in func():
+                    _render_family(lines, name, help_text, kind, samples)
+            except Exception as e:
+                log.warning("Metrics collector %s failed: %s", getattr(func, '__name__', func), e)
+        lines.append('')
+        return '\n'.join(lines)
+
+def _labels(labels, extra=None):
+    pairs = list(labels.items()) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+def _render_family(lines, name, help_text, kind, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for labels, value in samples:
+        if isinstance(value, Histogram):
+            cumulative = 0
+            for bound, count in zip(value.bounds + (float('inf'),), value.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels, ('le', _number(float(bound))))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {_number(value.total)}")
+            lines.append(f"{name}_count{_labels(labels)} {value.count}")
+        else:
+            lines.append(f"{name}{_labels(labels)} {_number(getattr(value, 'value', value))}")
+
+registry = Registry()
+
+# Shared metrics recorded from several modules
+rest_requests = registry.counter('bot_rest_requests_total', "Discord REST requests by method and status",
+                                 ('method', 'status'))
+rest_ratelimited = registry.counter('bot_rest_ratelimited_total', "Discord REST responses with status 429")
+rest_request_seconds = registry.histogram('bot_rest_request_seconds', "Discord REST request latency")
+
+@registry.collector
+def _collect_logging():
+    stats = logging_stats()
+    if not stats:
+        return []
+    return [
+        ('bot_log_queue_depth', "Log records waiting for the writer thread", 'gauge', [({}, stats['queued'])]),
+        ('bot_log_records_dropped_total', "Log records dropped because the queue was full", 'counter',
+         [({}, stats['dropped'])]),
+        ('bot_log_records_suppressed_total', "Repeated log records left out by rate limiting", 'counter',
+         [({}, stats['suppressed'])]),
+    ]
+
+def http_trace():
+    """aiohttp trace config counting every REST request discord.py makes (pass as Client(http_trace=...))"""
+    async def on_request_start(session, context, params):
+        context.start = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        status = params.response.status
+        rest_requests.labels(params.method, str(status)).inc()
+        rest_request_seconds.observe(time.perf_counter() - context.start)
+        if status == 429:
+            rest_ratelimited.inc()
+
+    trace = aiohttp.TraceConfig()
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    return trace
+
+async def _serve(reader, writer):
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5)
+        while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b'\r\n', b'\n', b''):
+            pass  # Headers aren't needed
+        parts = request.decode('latin-1').split()
+        path = parts[1].split('?', 1)[0] if len(parts) >= 2 else ''
+        if path == '/metrics':
+            status, content_type, body = '200 OK', 'text/plain; version=0.0.4; charset=utf-8', registry.render()
+        elif path == '/health':
+            status, content_type, body = '200 OK', 'text/plain; charset=utf-8', 'ok\n'
+        else:
+            status, content_type, body = '404 Not Found', 'text/plain; charset=utf-8', 'not found\n'
+        payload = body.encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                     f"Content-Length: {len(payload)}\r\nConnection: close\r\n\r\n".encode() + payload)
+        await writer.drain()
+    except (asyncio.TimeoutError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+_server = None
+
+async def start_server():
+    """Serve /metrics and /health on METRICS_HOST:METRICS_PORT (once; a busy port only logs a warning)"""
+    global _server
+    if not METRICS_ENABLED or _server is not None:
+        return
+    try:
+        _server = await asyncio.start_server(_serve, METRICS_HOST, METRICS_PORT)
+        log.info("📈 Metrics served on http://%s:%s/metrics", METRICS_HOST, METRICS_PORT)
+    except OSError as e:
+        log.warning("Metrics endpoint not started on %s:%s: %s", METRICS_HOST, METRICS_PORT, e)
@@ -1,25 +1,79 @@
 import discord
 import asyncio
-import yt_dlp
 import os
 import base64
-import spotipy
-from spotipy.oauth2 import SpotifyClientCredentials
+import threading
+import audioop
+from typing import TYPE_CHECKING
 from config.settings import YTDL_FORMAT_OPTIONS, FFMPEG_OPTIONS, SPOTIFY_CLIENT_ID, SPOTIFY_CLIENT_SECRET
 from collections import defaultdict
+from utils.extraction_strategy import extract_with_strategy, media_key, youtube_video_id
+from utils import audio_cache
+from utils.track_store import OpusTrackSource, OPUS_EXTENSION, STORE_GAIN
+from utils import loudness
+from utils import play_history
+from utils.voice_sessions import VoiceSessionManager
+from utils.playback_progress import PlaybackProgress
+from utils.extraction_pool import extraction_pool, NOW_PLAYING, INTERACTIVE
+from utils.logging_setup import get_logger
+from utils.metrics import registry
 
-# Configure Spotify API
-spotify = None
-if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
-    try:
-        client_credentials_manager = SpotifyClientCredentials(
-            client_id=SPOTIFY_CLIENT_ID,
-            client_secret=SPOTIFY_CLIENT_SECRET
-        )
-        spotify = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
-    except Exception as e:
-        print(f"Spotify API setup failed: {e}")
-        spotify = None
+if TYPE_CHECKING:
+    import yt_dlp  # Only for annotations; imported lazily at runtime
+
+log = get_logger('music')
+
+_tracks_started = registry.counter('bot_tracks_started_total', "Songs started, by how the audio is played",
+                                   ('source',))
+_cache_lookups = registry.counter('bot_audio_cache_lookups_total', "Audio cache lookups for YouTube tracks",
+                                  ('result',))
+_cache_hits = _cache_lookups.labels('hit')
+_cache_misses = _cache_lookups.labels('miss')
+_extraction_seconds = registry.histogram('bot_extraction_seconds', "yt-dlp extraction time of a song about to play")
+_playback_failures = registry.counter('bot_playback_failures_total', "Songs that failed to start (extraction or ffmpeg)")
+
+_background_tasks = set()  # Fire-and-forget work; asyncio only keeps weak references to tasks
+
+def _spawn(coro, what):
+    """Run coro in the background, holding a reference until it ends and logging its failure"""
+    task = asyncio.ensure_future(coro)
+    _background_tasks.add(task)
+
+    def done(task):
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.warning("Background %s failed: %s", what, task.exception(), exc_info=task.exception())
+    task.add_done_callback(done)
+    return task
+
+# yt-dlp and spotipy are imported on first use (or by the post-ready warm-up)
+# so they don't slow down connecting to the gateway
+_spotify = None
+_spotify_loaded = False
+_ytdl = None
+_lazy_lock = threading.Lock()
+
+def get_spotify():
+    """Get the Spotify client, creating it on first call (None if not configured)"""
+    global _spotify, _spotify_loaded
+    if _spotify_loaded:
+        return _spotify
+    with _lazy_lock:
+        if not _spotify_loaded:
+            if SPOTIFY_CLIENT_ID and SPOTIFY_CLIENT_SECRET:
+                try:
+                    import spotipy
+                    from spotipy.oauth2 import SpotifyClientCredentials
+                    client_credentials_manager = SpotifyClientCredentials(
+                        client_id=SPOTIFY_CLIENT_ID,
+                        client_secret=SPOTIFY_CLIENT_SECRET
+                    )
+                    _spotify = spotipy.Spotify(client_credentials_manager=client_credentials_manager)
+                except Exception as e:
+                    log.warning("Spotify API setup failed: %s", e)
+                    _spotify = None
+            _spotify_loaded = True
+    return _spotify
 
 def _prepare_cookiefile() -> str | None:
     """Resolve a cookies file for yt-dlp.
@@ -52,19 +106,20 @@ def _prepare_cookiefile() -> str | None:
             try:
                 cookies_raw = base64.b64decode(cookies_b64).decode('utf-8', errors='ignore')
             except Exception as e:
-                print(f"Failed to decode YT_DLP_COOKIES_B64: {e}")
+                log.warning("Failed to decode YT_DLP_COOKIES_B64: %s", e)
         if cookies_raw:
             cookiefile = '/tmp/youtube_cookies.txt'
             with open(cookiefile, 'w', encoding='utf-8') as f:
                 f.write(cookies_raw)
             return cookiefile
     except Exception as e:
-        print(f"Error preparing cookies file: {e}")
+        log.warning("Error preparing cookies file: %s", e)
     return None
 
 
-def _build_ytdl(opts: dict | None = None) -> yt_dlp.YoutubeDL:
+def _build_ytdl(opts: dict | None = None) -> 'yt_dlp.YoutubeDL':
     """Build a YoutubeDL instance with hardened options (android client, cookies)."""
+    import yt_dlp
     final_opts = dict(YTDL_FORMAT_OPTIONS)
     final_opts.update({
         'format': 'bestaudio[ext=m4a]/bestaudio/best',  # Prefer M4A, then any best audio
@@ -83,53 +138,127 @@ def _build_ytdl(opts: dict | None = None) -> yt_dlp.YoutubeDL:
     return yt_dlp.YoutubeDL(final_opts)
 
 
-ytdl = _build_ytdl()
+def get_ytdl():
+    """Get the shared YoutubeDL instance, building it on first call"""
+    global _ytdl
+    if _ytdl is None:
+        with _lazy_lock:
+            if _ytdl is None:
+                _ytdl = _build_ytdl()
+    return _ytdl
+
+# Module-level so the extraction pool can run them in worker processes too
+
+def _extract_info(url, profile_opts=None, download=False):
+    """Extract one URL - profile_opts None uses the shared client, otherwise a fresh one with overrides"""
+    client = get_ytdl() if profile_opts is None else _build_ytdl(profile_opts)
+    return client.extract_info(url, download=download)
+
+def _search_first(search_query):
+    """Full extraction of the top YouTube search result, or None"""
+    try:
+        search_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'default_search': 'ytsearch1:',
+            'extract_flat': False,
+            'skip_download': True,
+        }
+        ydl = _build_ytdl(search_opts)
+        search_results = ydl.extract_info(f"ytsearch1:{search_query}", download=False)
+        if search_results and 'entries' in search_results and search_results['entries']:
+            return search_results['entries'][0]
+        return None
+    except Exception as e:
+        log.warning("YouTube search error: %s", e)
+        return None
+
+def _search_candidates(search_query, count):
+    try:
+        ydl = _build_ytdl({
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+        })
+        results = ydl.extract_info(f"ytsearch{count}:{search_query}", download=False)
+        candidates = []
+        for entry in (results or {}).get('entries') or []:
+            if not entry or not entry.get('id'):
+                continue
+            candidates.append({
+                'id': entry['id'],
+                'title': entry.get('title') or '',
+                'duration': entry.get('duration'),
+                'channel': entry.get('channel') or entry.get('uploader') or '',
+                'url': f"https://www.youtube.com/watch?v={entry['id']}",
+            })
+        return candidates
+    except Exception as e:
+        log.warning("YouTube candidate search error: %s", e)
+        return []
 
 class YTDLSource(discord.PCMVolumeTransformer):
-    def __init__(self, source, *, data, volume=0.5):
+    """Volume-controllable ffmpeg source.
+
+    The starting volume (and the track's loudness gain) is applied by
+    ffmpeg's filter chain; Python only scales frames once the volume is
+    changed away from that baked-in value.
+    """
+
+    def __init__(self, source, *, data, volume=0.5, baked_volume=1.0):
         super().__init__(source, volume)
+        self.baked_volume = baked_volume
         self.data = data
         self.title = data.get('title')
         self.url = data.get('url')
         self.duration = data.get('duration')
         self.thumbnail = data.get('thumbnail')
 
+    def read(self):
+        ret = self.original.read()
+        if abs(self._volume - self.baked_volume) < 1e-3:
+            return ret
+        return audioop.mul(ret, 2, min(self._volume, 2.0) / self.baked_volume)
+
     @classmethod
-    async def from_url(cls, url, *, loop=None, stream=False):
-        loop = loop or asyncio.get_event_loop()
+    def _ffmpeg_source(cls, filename, base_options, *, data, volume, gain_db):
+        baked_volume = volume if volume > 0 else STORE_GAIN
+        options = loudness.ffmpeg_options(base_options, baked_volume * loudness.db_to_factor(gain_db))
+        return cls(discord.FFmpegPCMAudio(filename, **options), data=data, volume=volume, baked_volume=baked_volume)
+
+    @classmethod
+    async def from_url(cls, url, *, loop=None, stream=False, guild_id=None, priority=NOW_PLAYING, volume=0.5):
+        video_id = youtube_video_id(url) if stream else None
+        if video_id:
+            # Popular tracks are played from the local cache when available
+            cached = await audio_cache.lookup(video_id)
+            if cached:
+                _cache_hits.inc()
+                path, title, duration = cached
+                log.debug("💾 Playing %s from the audio cache", video_id, extra={'guild_id': guild_id})
+                _spawn(audio_cache.note_play(video_id, title, duration), 'play count')
+                data = {'id': video_id, 'title': title, 'duration': duration, 'url': path, 'webpage_url': url}
+                if path.endswith(OPUS_EXTENSION):
+                    # Pre-encoded Opus (loudness gain included): packets go straight to Discord, no ffmpeg
+                    return OpusTrackSource(path, data=data, volume=volume)
+                gain_db = await loudness.get_gain(video_id)
+                if gain_db is None:
+                    # A local file measures quickly and without downloading anything again
+                    _spawn(loudness.schedule_analysis(video_id, path), 'loudness analysis')
+                return cls._ffmpeg_source(path, audio_cache.LOCAL_FFMPEG_OPTIONS, data=data, volume=volume,
+                                          gain_db=gain_db)
+            _cache_misses.inc()
+        
         try:
-            def _extract():
-                try:
-                    return ytdl.extract_info(url, download=not stream)
-                except Exception as e1:
-                    err = str(e1)
-                    print(f"yt-dlp extract failed, retrying (fresh client): {err}")
-                    # Retry 1: fresh client with same options
-                    try:
-                        fresh = _build_ytdl()
-                        return fresh.extract_info(url, download=not stream)
-                    except Exception as e2:
-                        err2 = str(e2)
-                        # Retry 2: adjust format to a more permissive selector
-                        try:
-                            print(f"yt-dlp second attempt failed, retry with permissive format: {err2}")
-                            permissive = _build_ytdl({
-                                'format': 'bestaudio[ext=webm]/bestaudio/best'
-                            })
-                            return permissive.extract_info(url, download=not stream)
-                        except Exception as e3:
-                            # Final attempt: remove format constraint entirely
-                            print(f"yt-dlp third attempt failed, retry without format: {e3}")
-                            nofmt = _build_ytdl({})
-                            # remove any inherited format by rebuilding without override
-                            return nofmt.extract_info(url, download=not stream)
-
-            data = await loop.run_in_executor(None, _extract)
+            # Profiles are tried adaptively, with a hedged parallel attempt
+            # when the first one is slow
+            with _extraction_seconds.time():
+                data = await extract_with_strategy(url, _extract_info, not stream,
+                                                   priority=priority, guild_id=guild_id)
             
             if 'entries' in data:
                 data = data['entries'][0]
 
-            filename = data['url'] if stream else ytdl.prepare_filename(data)
+            filename = data['url'] if stream else get_ytdl().prepare_filename(data)
             
             # Test FFmpeg availability before creating audio source
             try:
@@ -138,89 +267,75 @@ class YTDLSource(discord.PCMVolumeTransformer):
             except (subprocess.CalledProcessError, FileNotFoundError) as e:
                 raise Exception(f"FFmpeg not available: {e}")
             
-            print(f"🎵 Creating FFmpeg audio source for: {filename}")
-            print(f"🎵 FFMPEG_OPTIONS: {FFMPEG_OPTIONS}")
-            audio_source = discord.FFmpegPCMAudio(filename, **FFMPEG_OPTIONS)
-            print(f"✅ FFmpeg audio source created successfully")
-            return cls(audio_source, data=data)
+            gain_db = await loudness.get_gain(video_id)
+            log.debug("🎵 Creating FFmpeg audio source for %s with %s", filename, FFMPEG_OPTIONS)
+            player = cls._ffmpeg_source(filename, FFMPEG_OPTIONS, data=data, volume=volume, gain_db=gain_db)
+            if video_id:
+                # Streams aren't analyzed (that would download them twice); the
+                # track is measured once it is in the audio cache
+                _spawn(audio_cache.note_play(video_id, data.get('title'), data.get('duration')), 'play count')
+            return player
         except Exception as e:
-            print(f"❌ Error in YTDLSource.from_url: {type(e).__name__}: {e}")
-            import traceback
-            traceback.print_exc()
+            _playback_failures.inc()
+            log.exception("❌ Error in YTDLSource.from_url: %s: %s", type(e).__name__, e, extra={'guild_id': guild_id})
             raise
 
     @classmethod
-    async def search_youtube(cls, search_query, *, loop=None):
+    async def fetch_info(cls, url, *, guild_id=None, priority=INTERACTIVE):
+        """Metadata for a URL (first entry for playlists), without picking a stream"""
+        # Same key as from_url's first profile, so a lookup and a play of one video share the extraction
+        data = await extraction_pool.run(_extract_info, url, priority=priority, guild_id=guild_id,
+                                         key=('extract', media_key(url), 'default', False))
+        if 'entries' in data:
+            data = data['entries'][0]
+        return data
+
+    @classmethod
+    async def search_youtube(cls, search_query, *, loop=None, guild_id=None, priority=INTERACTIVE):
         """Search YouTube and return video info"""
-        loop = loop or asyncio.get_event_loop()
-        
-        def search():
-            try:
-                search_opts = {
-                    'quiet': True,
-                    'no_warnings': True,
-                    'default_search': 'ytsearch1:',
-                    'extract_flat': False,
-                    'skip_download': True,
-                }
-                ydl = _build_ytdl(search_opts)
-                search_results = ydl.extract_info(f"ytsearch1:{search_query}", download=False)
-                    
-                if search_results and 'entries' in search_results and search_results['entries']:
-                    video = search_results['entries'][0]
-                    return (
-                        video.get('webpage_url', f"https://www.youtube.com/watch?v={video.get('id')}"),
-                        video.get('title', 'Unknown Title'),
-                        video.get('duration', 0),
-                        video.get('thumbnail', ''),
-                        video.get('uploader', 'Unknown'),
-                        video.get('view_count', 0)
-                    )
-                    
-                return None, None, None, None, None, None
-            except Exception as e:
-                print(f"YouTube search error: {e}")
-                return None, None, None, None, None, None
-        
-        return await loop.run_in_executor(None, search)
+        video = await extraction_pool.run(_search_first, search_query, priority=priority, guild_id=guild_id,
+                                          key=('search', media_key(search_query)))
+        if not video:
+            return None, None, None, None, None, None
+        return (
+            video.get('webpage_url', f"https://www.youtube.com/watch?v={video.get('id')}"),
+            video.get('title', 'Unknown Title'),
+            video.get('duration', 0),
+            video.get('thumbnail', ''),
+            video.get('uploader', 'Unknown'),
+            video.get('view_count', 0)
+        )
 
     @classmethod
-    async def search_youtube_for_audio(cls, search_query, *, loop=None):
+    async def search_youtube_for_audio(cls, search_query, *, loop=None, guild_id=None, priority=NOW_PLAYING):
         """Search YouTube specifically for audio playback"""
-        loop = loop or asyncio.get_event_loop()
-        
-        def search():
-            try:
-                search_opts = {
-                    'quiet': True,
-                    'no_warnings': True,
-                    'default_search': 'ytsearch1:',
-                    'extract_flat': False,
-                    'skip_download': True,
-                }
-                ydl = _build_ytdl(search_opts)
-                search_results = ydl.extract_info(f"ytsearch1:{search_query}", download=False)
-                    
-                if search_results and 'entries' in search_results and search_results['entries']:
-                    video = search_results['entries'][0]
-                    return video.get('webpage_url', f"https://www.youtube.com/watch?v={video.get('id')}")
-                    
-                return None
-            except Exception as e:
-                print(f"YouTube search error: {e}")
-                return None
-        
-        return await loop.run_in_executor(None, search)
+        video = await extraction_pool.run(_search_first, search_query, priority=priority, guild_id=guild_id,
+                                          key=('search', media_key(search_query)))
+        if not video:
+            return None
+        return video.get('webpage_url', f"https://www.youtube.com/watch?v={video.get('id')}")
+
+    @classmethod
+    async def search_youtube_candidates(cls, search_query, *, count=5, loop=None, guild_id=None, priority=NOW_PLAYING):
+        """Flat YouTube search returning several lightweight candidates.
+
+        Flat extraction only reads the search results page, so this costs one
+        request regardless of count. Each candidate is a dict with id, title,
+        duration, channel and url.
+        """
+        return await extraction_pool.run(_search_candidates, search_query, count,
+                                         priority=priority, guild_id=guild_id,
+                                         key=('candidates', media_key(search_query), count))
 
 class SpotifyMusicSource:
     @classmethod
     async def search_spotify(cls, search_query, *, loop=None):
         """Fast Spotify search - returns first result immediately"""
+        loop = loop or asyncio.get_event_loop()
+        spotify = await loop.run_in_executor(None, get_spotify)
         if not spotify:
             return None, None, None, None, None, None
         
-        loop = loop or asyncio.get_event_loop()
-        
         def search():
             try:
                 # Search Spotify for tracks
@@ -256,7 +371,7 @@ class SpotifyMusicSource:
                     
                 return None
             except Exception as e:
-                print(f"Spotify search error: {e}")
+                log.warning("Spotify search error: %s", e)
                 return None
         
         result = await loop.run_in_executor(None, search)
@@ -279,7 +394,108 @@ class MusicPlayer:
         self.current_songs = {}
         self.volumes = defaultdict(lambda: 0.5)
         self.loop_modes = defaultdict(lambda: False)  # False: no loop, True: loop current song
-        self.music_cards = {}  # Store music card references
+        self.music_cards = {}  # guild_id -> (channel_id, message_id) of the card kept up to date
+        self.sessions = VoiceSessionManager(self)
+        self.progress = PlaybackProgress(self)
+        registry.collector(self._collect_metrics)
+
+    def start_playback(self, guild_id, voice_client, player, song_info=None):
+        """Play a source for the guild; the next queued song follows when it ends.
+
+        song_info is counted in the guild's play history (left out for loop
+        replays) and the song's position clock starts.
+        """
+        voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(self.play_next(guild_id), self.bot.loop))
+        self.progress.start(guild_id)
+        _tracks_started.labels('opus' if player.is_opus() else 'ffmpeg').inc()
+        if song_info is not None:
+            play_history.record(guild_id, song_info)
+
+    def _collect_metrics(self):
+        report = self.sessions.report()
+        progress = self.progress.stats()
+        return [
+            ('bot_voice_sessions', "Connected voice sessions by state", 'gauge',
+             [({'state': 'connected'}, report['sessions']), ({'state': 'playing'}, report['playing']),
+              ({'state': 'paused'}, report['paused']), ({'state': 'alone'}, report['alone']),
+              ({'state': 'idle'}, report['idle'])]),
+            ('bot_ffmpeg_processes', "Running ffmpeg processes", 'gauge', [({}, report['ffmpeg_processes'])]),
+            ('bot_music_queue_depth', "Songs queued across all guilds", 'gauge', [({}, report['queued_songs'])]),
+            ('bot_voice_sessions_reaped_total', "Idle or empty voice sessions disconnected", 'counter',
+             [({}, report['reaped'])]),
+            ('bot_card_edits_total', "Music card progress edits", 'counter', [({}, progress['edits'])]),
+            ('bot_card_edits_deferred_total', "Card edits pushed to a later tick by rate caps", 'counter',
+             [({}, progress['deferred'])]),
+        ]
+
+    def pause(self, guild_id):
+        """Pause the guild's playback; returns False if nothing was playing"""
+        voice_client = self.voice_clients.get(guild_id)
+        if voice_client is None or not voice_client.is_playing():
+            return False
+        voice_client.pause()
+        self.progress.pause(guild_id)
+        return True
+
+    def resume(self, guild_id):
+        """Resume the guild's paused playback; returns False if it wasn't paused"""
+        voice_client = self.voice_clients.get(guild_id)
+        if voice_client is None or not voice_client.is_paused():
+            return False
+        voice_client.resume()
+        self.progress.resume(guild_id)
+        return True
+
+    def release_guild(self, guild_id):
+        """Free every piece of per-guild music state"""
+        self.voice_clients.pop(guild_id, None)
+        self.queues.pop(guild_id, None)
+        self.current_songs.pop(guild_id, None)
+        self.volumes.pop(guild_id, None)
+        self.loop_modes.pop(guild_id, None)
+        self.music_cards.pop(guild_id, None)
+        self.sessions.forget(guild_id)
+        self.progress.forget(guild_id)
+        extraction_pool.cancel_guild(guild_id)
+
+    async def update_card(self, guild_id, card=None):
+        """Redraw the guild's music card from the current player state.
+
+        Only the card's channel and message IDs are kept, so this edits a
+        partial message without fetching it. The buttons are left as they are.
+        """
+        from ui.music_views import create_card_embed
+        card = card or self.music_cards.get(guild_id)
+        if card is None:
+            return
+        channel_id, message_id = card
+        try:
+            message = self.bot.get_partial_messageable(channel_id).get_partial_message(message_id)
+            await message.edit(embed=create_card_embed(self, guild_id))
+        except discord.NotFound:
+            self.music_cards.pop(guild_id, None)  # Card was deleted
+        except Exception as e:
+            log.warning("Error updating music card: %s", e)
+
+    async def disconnect(self, guild_id, reason=None):
+        """Stop playback, leave the voice channel and free the guild's state"""
+        # Popped first so the bot's own voice-state update doesn't disconnect twice
+        voice_client = self.voice_clients.pop(guild_id, None)
+        music_card = self.music_cards.get(guild_id)
+        # Clear the queue first so stopping doesn't start the next song
+        self.queues.pop(guild_id, None)
+        self.current_songs.pop(guild_id, None)
+        if voice_client is not None:
+            try:
+                voice_client.stop()
+                await voice_client.disconnect(force=True)
+            except Exception as e:
+                log.warning("Error disconnecting voice client: %s", e)
+        self.release_guild(guild_id)
+        if reason:
+            log.info("👋 Left voice in guild %s: %s", guild_id, reason, extra={'guild_id': guild_id})
+        if music_card is not None:
+            await self.update_card(guild_id, music_card)
 
     async def join_voice_channel(self, ctx):
         if ctx.author.voice is None:
@@ -295,13 +511,16 @@ class MusicPlayer:
                 voice_client = await channel.connect()
                 self.voice_clients[ctx.guild.id] = voice_client
             except Exception as e:
-                print(f"Failed to connect to voice channel: {str(e)}")
+                log.warning("Failed to connect to voice channel: %s", e)
                 return None
         
         return self.voice_clients[ctx.guild.id]
 
     async def play_next(self, guild_id):
         """Play next song with audio"""
+        from utils.track_matcher import (resolve_audio_url, forget_spotify_match, is_gone_video_error,
+                                         spotify_track_id, prefetch_next)
+        
         if guild_id not in self.voice_clients:
             return
         
@@ -311,24 +530,21 @@ class MusicPlayer:
             # Replay current song if loop is enabled
             song_info = self.current_songs[guild_id]
             try:
-                # Search YouTube for audio using Spotify metadata
-                search_query = f"{song_info['title']} {song_info.get('uploader', '')}"
-                youtube_url = await YTDLSource.search_youtube_for_audio(search_query)
+                youtube_url = await resolve_audio_url(song_info, guild_id=guild_id)
                 if youtube_url:
-                    player = await YTDLSource.from_url(youtube_url, stream=True)
-                    player.volume = self.volumes[guild_id]
-                    voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(self.play_next(guild_id), self.bot.loop))
+                    player = await YTDLSource.from_url(youtube_url, stream=True, guild_id=guild_id,
+                                                       volume=self.volumes[guild_id])
+                    self.start_playback(guild_id, voice_client, player)
                     return
             except Exception as e:
-                print(f"Error replaying song: {e}")
+                log.warning("Error replaying song: %s", e, extra={'guild_id': guild_id})
         
         if not self.queues[guild_id]:
             # Queue is empty
             if guild_id in self.current_songs:
                 del self.current_songs[guild_id]
-            # Update any active music cards
-            if guild_id in self.music_cards:
-                await self.music_cards[guild_id].update_card()
+            self.progress.forget(guild_id)
+            await self.update_card(guild_id)
             return
         
         # Play next song in queue
@@ -336,21 +552,28 @@ class MusicPlayer:
         self.current_songs[guild_id] = song_info
         
         try:
-            # Search YouTube for audio using Spotify metadata
-            search_query = f"{song_info['title']} {song_info.get('uploader', '')}"
-            youtube_url = await YTDLSource.search_youtube_for_audio(search_query)
+            # Spotify tracks resolve through the stored match table
+            youtube_url = await resolve_audio_url(song_info, guild_id=guild_id)
             if youtube_url:
-                player = await YTDLSource.from_url(youtube_url, stream=True)
-                player.volume = self.volumes[guild_id]
-                voice_client.play(player, after=lambda e: asyncio.run_coroutine_threadsafe(self.play_next(guild_id), self.bot.loop))
+                try:
+                    player = await YTDLSource.from_url(youtube_url, stream=True, guild_id=guild_id,
+                                                       volume=self.volumes[guild_id])
+                except Exception as e:
+                    # A stored match whose video was removed or made private is re-matched next time
+                    spotify_id = song_info.get('spotify_id') or spotify_track_id(song_info.get('spotify_url'))
+                    if spotify_id and is_gone_video_error(e):
+                        await forget_spotify_match(spotify_id)
+                    raise
+                self.start_playback(guild_id, voice_client, player, song_info)
+                # Look up the next song while this one plays
+                if self.queues[guild_id]:
+                    _spawn(prefetch_next(self.queues[guild_id][0], guild_id), 'prefetch')
             else:
                 # If YouTube search fails, try next song
                 await self.play_next(guild_id)
         except Exception as e:
-            print(f"Error playing next song: {e}")
+            log.warning("Error playing next song: %s", e, extra={'guild_id': guild_id})
             # Try next song
             await self.play_next(guild_id)
         
-        # Update any active music cards
-        if guild_id in self.music_cards:
-            await self.music_cards[guild_id].update_card()
+        await self.update_card(guild_id)
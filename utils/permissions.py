@@ -1,4 +1,6 @@
 from config.settings import ADMIN_USER_ID
+from utils.member_index import member_index
+from utils.member_cache import ensure_chunked, resolve_member
 
 def has_mod_permissions(member):
     """Check if user has moderation permissions"""
@@ -52,10 +54,26 @@ def get_user_from_mention(message, mention):
         pass
     
     # Check if it's a username#discriminator or display name
-    for member in message.guild.members:
-        if (member.name.lower() == mention.lower() or 
-            member.display_name.lower() == mention.lower() or
-            str(member).lower() == mention.lower()):
-            return member
+    return member_index.lookup(message.guild, mention)
+
+async def resolve_user(message, mention):
+    """Get user from mention string, fetching uncached members by ID and
+    chunking the guild on demand for name lookups"""
+    user = get_user_from_mention(message, mention)
+    if user or not mention:
+        return user
+    
+    user_id = mention[2:-1].lstrip('!') if mention.startswith('<@') and mention.endswith('>') else mention
+    if user_id.isdigit():
+        return await resolve_member(message.guild, int(user_id))
     
+    # Name lookups need the full member list
+    if not message.guild.chunked and await ensure_chunked(message.guild):
+        return get_user_from_mention(message, mention)
     return None
+
+def suggest_members(message, query, limit=5):
+    """Get members whose names start with or resemble query (for "did you mean")"""
+    if not query or query.startswith('<@') or query.isdigit():
+        return []
+    return member_index.suggest(message.guild, query, limit)
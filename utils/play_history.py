@@ -0,0 +1,213 @@
+"""
+Per-guild play history.
+
+Every song that starts playing is counted against the guild in memory and
+flushed to SQLite in one batch every PLAY_HISTORY_FLUSH_SECONDS (or sooner
+once PLAY_HISTORY_MAX_PENDING tracks are waiting). Searches check the
+guild's history first through an FTS5 index over titles and artists, so a
+repeat request that names most of a track's title is answered locally
+instead of going to YouTube or Spotify.
+"""
+import re
+import time
+import unicodedata
+import asyncio
+from config.settings import PLAY_HISTORY_MAX_PENDING, PLAY_HISTORY_LOCAL_FIRST, PLAY_HISTORY_MIN_COVERAGE
+from utils.database import record_plays_batch, search_play_history, get_recent_plays
+from utils.extraction_strategy import media_key
+
+MIN_QUERY_CHARS = 3  # Shorter queries match too much of the history to trust
+
+_pending = {}  # (guild_id, track_key) -> play waiting for the next flush
+_flushing = None  # Task writing the current batch
+_early_flush = None  # Task of a flush started because the buffer filled up
+
+def track_key(song_info):
+    """Stable identity of a song: its Spotify track ID, else its YouTube video / URL"""
+    from utils.track_matcher import spotify_track_id
+    url = song_info.get('spotify_url') or song_info.get('url')
+    spotify_id = song_info.get('spotify_id') or spotify_track_id(url)
+    if spotify_id:
+        return f"sp:{spotify_id}"
+    return media_key(url) if url else None
+
+def record(guild_id, song_info):
+    """Count a play; it reaches the database with the next batch"""
+    key = track_key(song_info)
+    if guild_id is None or not key:
+        return
+    play = _pending.get((guild_id, key))
+    if play is None:
+        play = _pending[(guild_id, key)] = {
+            'guild_id': guild_id,
+            'track_key': key,
+            'url': song_info.get('spotify_url') or song_info['url'],
+            'title': song_info.get('title'),
+            'artist': song_info.get('uploader'),
+            'duration': song_info.get('duration_seconds') or None,
+            'thumbnail': song_info.get('thumbnail') or None,
+            'plays': 0,
+        }
+    play['plays'] += 1
+    play['last_played'] = time.time()
+    global _early_flush
+    if len(_pending) >= PLAY_HISTORY_MAX_PENDING and (_early_flush is None or _early_flush.done()):
+        _early_flush = asyncio.ensure_future(flush())
+
+async def _write(plays):
+    ok = await asyncio.get_running_loop().run_in_executor(None, record_plays_batch, plays)
+    if not ok:
+        # Put them back (merged with anything played since) for the next flush
+        for play in plays:
+            newer = _pending.get((play['guild_id'], play['track_key']))
+            if newer is not None:
+                newer['plays'] += play['plays']
+            else:
+                _pending[(play['guild_id'], play['track_key'])] = play
+        return 0
+    return len(plays)
+
+async def flush():
+    """Write buffered plays in a single transaction; returns how many tracks were written.
+
+    A call while a batch is being written waits for that batch and returns its count.
+    """
+    global _flushing
+    if _flushing is not None:
+        return await asyncio.shield(_flushing)
+    if not _pending:
+        return 0
+    plays = list(_pending.values())
+    _pending.clear()
+    _flushing = asyncio.ensure_future(_write(plays))
+    try:
+        return await asyncio.shield(_flushing)
+    finally:
+        _flushing = None
+
+def _terms(query):
+    # Matches the FTS tokenizer: case- and accent-insensitive words
+    text = unicodedata.normalize('NFKD', query.casefold())
+    return re.findall(r'\w+', ''.join(char for char in text if not unicodedata.combining(char)))
+
+def _to_result(row):
+    key, url, title, artist, duration, thumbnail, play_count, last_played = row
+    return {
+        'provider': 'spotify' if key.startswith('sp:') else 'youtube',
+        'source': 'history',
+        'url': url,
+        'title': title,
+        'duration': duration,
+        'thumbnail': thumbnail,
+        'artist': artist,
+        'popularity': None,
+        'view_count': None,
+        'play_count': play_count,
+        'last_played': last_played,
+    }
+
+def _pending_rows(guild_id, terms=None):
+    rows = []
+    for play in _pending.values():
+        if play['guild_id'] != guild_id:
+            continue
+        if terms is not None:
+            words = _terms(f"{play['title'] or ''} {play['artist'] or ''}")
+            if not all(any(word.startswith(term) for word in words) for term in terms):
+                continue
+        rows.append((play['track_key'], play['url'], play['title'], play['artist'], play['duration'],
+                     play['thumbnail'], play['plays'], play['last_played']))
+    return rows
+
+def _merge(rows, limit):
+    results, seen = [], set()
+    for row in rows:
+        if row[0] not in seen:
+            seen.add(row[0])
+            results.append(_to_result(row))
+    return results[:limit]
+
+async def search(guild_id, query, limit=5):
+    """Tracks from the guild's history matching every word of query, best first"""
+    terms = _terms(query)
+    if guild_id is None or len(''.join(terms)) < MIN_QUERY_CHARS or query.startswith(('http://', 'https://')):
+        return []
+    rows = await asyncio.get_running_loop().run_in_executor(None, search_play_history, guild_id, terms, limit)
+    return _merge(list(rows) + _pending_rows(guild_id, terms), limit)
+
+def title_coverage(track, terms):
+    """Share of a track's title words that the query terms name.
+
+    Words must match in full, except that the last term may be a prefix of
+    at least MIN_QUERY_CHARS characters (the user is still typing it).
+    Bracketed extras like "(Official Video)" don't count, and a title with
+    " - " parts ("Artist - Song", "Song - Remastered") scores its best part
+    other than the artist's name.
+    """
+    if not terms:
+        return 0.0
+    last = terms[-1]
+    title = re.sub(r'[\(\[].*?[\)\]]', ' ', track['title'] or '')
+    artist = set(_terms(track.get('artist') or ''))
+    best = 0.0
+    for part in [title] + title.split(' - '):
+        words = _terms(part)
+        if words and not set(words) <= artist:
+            covered = sum(1 for word in words
+                          if word in terms or (len(last) >= MIN_QUERY_CHARS and word.startswith(last)))
+            best = max(best, covered / len(words))
+    return best
+
+async def best_match(guild_id, query):
+    """The guild's most likely intended track for query, or None to search remotely.
+
+    Every word of the query matching isn't enough ("love" would match "Love
+    Story"); the query must also cover PLAY_HISTORY_MIN_COVERAGE of the title.
+    """
+    if not PLAY_HISTORY_LOCAL_FIRST:
+        return None
+    terms = _terms(query)
+    for track in await search(guild_id, query, limit=5):
+        if title_coverage(track, terms) >= PLAY_HISTORY_MIN_COVERAGE:
+            return track
+    return None
+
+async def recent(guild_id, limit=10):
+    """The guild's most recently played tracks, newest first"""
+    rows = await asyncio.get_running_loop().run_in_executor(None, get_recent_plays, guild_id, limit)
+    pending = sorted(_pending_rows(guild_id), key=lambda row: row[7], reverse=True)
+    return _merge(pending + list(rows), limit)
+
+async def forget_guild(guild_id):
+    """Drop a guild's buffered plays (the bot left the guild).
+
+    A batch already being written is waited for first, so it can neither
+    land after the guild's history is cleared nor put its plays back.
+    """
+    if _flushing is not None:
+        try:
+            await asyncio.shield(_flushing)
+        except Exception:
+            pass  # Its plays were put back into _pending and are dropped below
+    for key in [key for key in _pending if key[0] == guild_id]:
+        del _pending[key]
+
+def song_info(track, requester):
+    """Queue entry for a track from the history, shaped like the ones searches produce"""
+    from utils.track_matcher import spotify_track_id
+    duration = track['duration']
+    info = {
+        'url': track['url'],
+        'title': track['title'],
+        'duration': f"{duration//60}:{duration%60:02d}" if duration else "Live",
+        'duration_seconds': duration,
+        'thumbnail': track['thumbnail'],
+        'requester': requester,
+        'uploader': track['artist']
+    }
+    if track['provider'] == 'spotify':
+        info.update({
+            'spotify_url': track['url'],
+            'spotify_id': spotify_track_id(track['url']),
+        })
+    return info
@@ -0,0 +1,134 @@
+"""
+Playback position tracking and live progress on music cards.
+
+Each guild's current song gets a clock (when it started, how long it has
+been paused). A single ticker, driven from main_bot, refreshes the cards of
+guilds that are playing. Every card is due once per CARD_PROGRESS_INTERVAL_SECONDS,
+with a per-guild offset so refreshes are spread out rather than arriving
+together. Each tick edits at most CARD_PROGRESS_EDITS_PER_CHANNEL cards per
+channel and CARD_PROGRESS_MAX_EDITS_PER_TICK overall; cards left over stay
+due for the next tick.
+"""
+import time
+import asyncio
+from config.settings import (CARD_PROGRESS_INTERVAL_SECONDS, CARD_PROGRESS_EDITS_PER_CHANNEL,
+                             CARD_PROGRESS_MAX_EDITS_PER_TICK)
+
+BAR_LENGTH = 14
+
+class PlaybackClock:
+    __slots__ = ('started_at', 'paused_at', 'paused_total')
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.paused_at = None
+        self.paused_total = 0.0
+
+    def pause(self):
+        if self.paused_at is None:
+            self.paused_at = time.monotonic()
+
+    def resume(self):
+        if self.paused_at is not None:
+            self.paused_total += time.monotonic() - self.paused_at
+            self.paused_at = None
+
+    def position(self):
+        now = self.paused_at if self.paused_at is not None else time.monotonic()
+        return max(0.0, now - self.started_at - self.paused_total)
+
+def _format_time(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+def progress_bar(position, duration):
+    """Text progress bar like `1:23 ▬▬▬🔘▬▬▬▬▬ 3:45` (elapsed time only for streams)"""
+    if not duration:
+        return f"🔴 {_format_time(position)}"
+    position = min(position, duration)
+    filled = int(position / duration * BAR_LENGTH)
+    bar = '▬' * filled + '🔘' + '▬' * (BAR_LENGTH - filled)
+    return f"`{_format_time(position)}` {bar} `{_format_time(duration)}`"
+
+class PlaybackProgress:
+    """Per-guild playback clocks plus the shared card ticker"""
+
+    def __init__(self, player):
+        self.player = player
+        self.clocks = {}  # guild_id -> PlaybackClock of the current song
+        self.next_due = {}  # guild_id -> when its card should next be refreshed
+        self.edits = 0
+        self.deferred = 0  # Due cards pushed to a later tick by the per-channel/per-tick caps
+
+    def start(self, guild_id):
+        self.clocks[guild_id] = PlaybackClock()
+
+    def pause(self, guild_id):
+        clock = self.clocks.get(guild_id)
+        if clock is not None:
+            clock.pause()
+
+    def resume(self, guild_id):
+        clock = self.clocks.get(guild_id)
+        if clock is not None:
+            clock.resume()
+
+    def position(self, guild_id):
+        """Seconds into the current song, or None if nothing is tracked"""
+        clock = self.clocks.get(guild_id)
+        return clock.position() if clock is not None else None
+
+    def forget(self, guild_id):
+        self.clocks.pop(guild_id, None)
+        self.next_due.pop(guild_id, None)
+
+    def _offset(self, guild_id):
+        # Stable per-guild phase so cards don't all come due on the same tick
+        return (guild_id >> 22) % 1000 / 1000 * CARD_PROGRESS_INTERVAL_SECONDS
+
+    def _due(self, now):
+        player = self.player
+        due = []
+        for guild_id, (channel_id, _) in player.music_cards.items():
+            voice_client = player.voice_clients.get(guild_id)
+            if guild_id not in self.clocks or guild_id not in player.current_songs:
+                continue
+            if voice_client is None or not voice_client.is_playing():
+                continue  # A paused or idle card doesn't change
+            if guild_id not in self.next_due:
+                self.next_due[guild_id] = now + self._offset(guild_id)
+            if self.next_due[guild_id] <= now:
+                due.append((self.next_due[guild_id], guild_id, channel_id))
+        due.sort()  # Most overdue first
+        return due
+
+    async def tick(self):
+        """Refresh the cards that are due this tick; returns how many were edited"""
+        now = time.monotonic()
+        per_channel = {}
+        batch = []
+        for _, guild_id, channel_id in self._due(now):
+            if len(batch) >= CARD_PROGRESS_MAX_EDITS_PER_TICK:
+                self.deferred += 1
+                continue
+            if per_channel.get(channel_id, 0) >= CARD_PROGRESS_EDITS_PER_CHANNEL:
+                self.deferred += 1
+                continue
+            per_channel[channel_id] = per_channel.get(channel_id, 0) + 1
+            batch.append(guild_id)
+            self.next_due[guild_id] = now + CARD_PROGRESS_INTERVAL_SECONDS
+
+        if batch:
+            await asyncio.gather(*(self.player.update_card(guild_id) for guild_id in batch))
+            self.edits += len(batch)
+        return len(batch)
+
+    def stats(self):
+        return {
+            'clocks': len(self.clocks),
+            'scheduled_cards': len(self.next_due),
+            'edits': self.edits,
+            'deferred': self.deferred,
+        }
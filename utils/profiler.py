@@ -0,0 +1,178 @@
+"""
+On-demand sampling profiler.
+
+Nothing runs until an admin starts a profile: then a sampler thread reads
+every thread's current Python stack (event loop and executor workers alike)
+PROFILER_SAMPLE_HZ times a second for the requested duration, and exits.
+Stacks are counted in collapsed form (`thread;outer;...;inner count`), which
+flamegraph.pl, speedscope and inferno read directly. Every few samples the
+loop's tasks are walked too, recording which coroutine each task is awaiting,
+so time spent waiting (on yt-dlp, the DB executor, Discord) shows up as well
+as time spent running.
+"""
+import os
+import re
+import sys
+import time
+import asyncio
+import threading
+from collections import Counter
+from config.settings import PROFILER_SAMPLE_HZ
+from utils.logging_setup import get_logger
+
+log = get_logger('profiler')
+
+AWAIT_SAMPLE_EVERY = 10  # Task await chains are walked on every n-th sample
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Leaf functions (file, qualified name) of threads parked waiting for work
+_IDLE_LEAVES = {
+    ('threading.py', 'Condition.wait'), ('threading.py', 'Event.wait'), ('queue.py', 'Queue.get'),
+    ('thread.py', '_worker'), ('threading.py', 'Thread._wait_for_tstate_lock'),
+}
+# ...and of the event loop waiting for I/O or timers
+_LOOP_IDLE_LEAVES = {('selectors.py', 'EpollSelector.select'), ('selectors.py', 'KqueueSelector.select'),
+                     ('selectors.py', 'PollSelector.select'), ('selectors.py', 'SelectSelector.select')}
+
+_running = None  # The profile in progress; only one at a time
+
+class Profile:
+    def __init__(self):
+        self.stacks = Counter()  # Collapsed thread stack -> samples
+        self.idle_stacks = set()  # Stacks of the event loop waiting in select()
+        self.awaits = Counter()  # Collapsed task await chain -> samples
+        self.awaiting = Counter()  # Innermost coroutine of a task's await chain -> samples
+        self.samples = 0
+        self.loop_samples = 0
+        self.loop_busy = 0
+        self.seconds = 0.0
+        self._labels = {}  # code object -> frame label
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            path = code.co_filename
+            if path.startswith(_ROOT):
+                path = os.path.relpath(path, _ROOT)
+            else:
+                path = os.path.basename(path)
+            label = self._labels[code] = f"{code.co_qualname} ({path}:{code.co_firstlineno})"
+        return label
+
+    def add_stack(self, thread_name, frame, is_loop):
+        codes = []
+        while frame is not None:
+            codes.append(frame.f_code)
+            frame = frame.f_back
+        if not codes:
+            return
+        leaf = (os.path.basename(codes[0].co_filename), codes[0].co_qualname)
+        idle = False
+        if is_loop:
+            self.loop_samples += 1
+            idle = leaf in _LOOP_IDLE_LEAVES
+            self.loop_busy += not idle
+        elif leaf in _IDLE_LEAVES:
+            return  # Parked worker threads would drown out everything else
+        stack = ';'.join([thread_name] + [self._label(code) for code in reversed(codes)])
+        self.stacks[stack] += 1
+        if idle:
+            self.idle_stacks.add(stack)
+
+    def add_awaits(self, loop):
+        try:
+            tasks = asyncio.all_tasks(loop)
+        except RuntimeError:
+            return  # Task set changed while it was read from this thread; skip this round
+        for task in tasks:
+            chain = []
+            innermost = None
+            awaited = task.get_coro()
+            while awaited is not None and len(chain) < 64:
+                code = getattr(awaited, 'cr_code', None) or getattr(awaited, 'gi_code', None)
+                if code is None:
+                    chain.append('[Future]')  # Waiting on a future (executor job, I/O, another task...)
+                    break
+                innermost = self._label(code)
+                chain.append(innermost)
+                awaited = getattr(awaited, 'cr_await', None) or getattr(awaited, 'gi_yieldfrom', None)
+            if innermost is not None:
+                self.awaits[';'.join(['await'] + chain)] += 1
+                self.awaiting[innermost] += 1
+
+    def collapsed(self):
+        """Collapsed stacks (thread stacks, then task await chains), one `stack count` per line"""
+        lines = [f"{stack} {count}" for stack, count in self.stacks.most_common()]
+        lines += [f"{stack} {count}" for stack, count in self.awaits.most_common()]
+        return '\n'.join(lines) + '\n'
+
+    def top_functions(self, top):
+        """(label, self samples, total samples) of the hottest functions outside idle waits"""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            if stack in self.idle_stacks:
+                continue
+            frames = stack.split(';')[1:]
+            own[frames[-1]] += count
+            for label in set(frames):
+                total[label] += count
+        return [(label, samples, total[label]) for label, samples in own.most_common(top)]
+
+    def top_awaits(self, top):
+        """(innermost awaiting coroutine, task samples) - where tasks spend their time suspended"""
+        return self.awaiting.most_common(top)
+
+def _thread_names():
+    # Executor workers are numbered (ThreadPoolExecutor-0_3); fold them into one root per pool
+    return {thread.ident: re.sub(r'_\d+$', '', thread.name) for thread in threading.enumerate()}
+
+def _sample(profile, seconds, loop, loop_thread, done):
+    interval = 1 / PROFILER_SAMPLE_HZ
+    me = threading.get_ident()
+    names = _thread_names()
+    start = time.perf_counter()
+    deadline = start + seconds
+    next_at = start
+    while next_at < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            if ident not in names:
+                names = _thread_names()
+            is_loop = ident == loop_thread
+            profile.add_stack('event-loop' if is_loop else names.get(ident, f"thread-{ident}"), frame, is_loop)
+        if profile.samples % AWAIT_SAMPLE_EVERY == 0:
+            profile.add_awaits(loop)
+        profile.samples += 1
+        next_at += interval
+        delay = next_at - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            next_at = time.perf_counter()  # Fell behind; don't burst to catch up
+    profile.seconds = time.perf_counter() - start
+    loop.call_soon_threadsafe(_finish, done, profile)
+
+def _finish(done, profile):
+    if not done.done():  # The command may have been cancelled meanwhile
+        done.set_result(profile)
+
+def is_running():
+    return _running is not None
+
+async def profile_for(seconds):
+    """Sample every thread for `seconds` and return the Profile (call from the event loop)"""
+    global _running
+    if _running is not None:
+        raise RuntimeError("A profile is already running")
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    profile = Profile()
+    _running = profile
+    try:
+        threading.Thread(target=_sample, args=(profile, seconds, loop, threading.get_ident(), done),
+                         name='profiler', daemon=True).start()
+        log.info("🔬 Profiling for %ss at %s Hz", seconds, PROFILER_SAMPLE_HZ)
+        return await done
+    finally:
+        _running = None
@@ -0,0 +1,149 @@
+"""
+Hedged music search - queries Spotify and YouTube concurrently with
+per-provider deadlines and returns the first acceptable result. Tracks the
+guild has played before are answered from its play history first.
+"""
+import time
+import asyncio
+from utils.music_sources import YTDLSource, SpotifyMusicSource
+from utils import play_history
+from config.settings import SEARCH_PROVIDER_DEADLINES, SEARCH_PREFERENCE_GRACE, SEARCH_PROVIDER_COOLDOWN
+from utils.logging_setup import get_logger
+
+log = get_logger('search')
+
+class ProviderHealth:
+    """Skips a provider for a cooldown after repeated failures or timeouts"""
+
+    def __init__(self, max_failures=3, cooldown=SEARCH_PROVIDER_COOLDOWN):
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.failures = {}
+        self.down_until = {}
+
+    def healthy(self, provider):
+        return time.monotonic() >= self.down_until.get(provider, 0)
+
+    def record(self, provider, ok):
+        if ok:
+            self.failures[provider] = 0
+            return
+        self.failures[provider] = self.failures.get(provider, 0) + 1
+        if self.failures[provider] >= self.max_failures:
+            self.down_until[provider] = time.monotonic() + self.cooldown
+            self.failures[provider] = 0
+            log.warning("🔍 Search provider %s marked down for %ss", provider, self.cooldown)
+
+provider_health = ProviderHealth()
+
+async def _search_spotify(query, guild_id=None):
+    url, title, duration, thumbnail, artist, popularity = await SpotifyMusicSource.search_spotify(query)
+    if not url:
+        return None
+    return {
+        'provider': 'spotify',
+        'url': url,
+        'title': title,
+        'duration': duration,
+        'thumbnail': thumbnail,
+        'artist': artist,
+        'popularity': popularity,
+    }
+
+async def _search_youtube(query, guild_id=None):
+    url, title, duration, thumbnail, uploader, view_count = await YTDLSource.search_youtube(query, guild_id=guild_id)
+    if not url:
+        return None
+    return {
+        'provider': 'youtube',
+        'url': url,
+        'title': title,
+        'duration': duration,
+        'thumbnail': thumbnail,
+        'artist': uploader,
+        'view_count': view_count,
+    }
+
+PROVIDERS = {
+    'spotify': _search_spotify,
+    'youtube': _search_youtube,
+}
+
+def _acceptable(result):
+    return bool(result and result.get('url') and result.get('title'))
+
+async def _run(provider, query, guild_id):
+    deadline = SEARCH_PROVIDER_DEADLINES.get(provider, 5.0)
+    try:
+        result = await asyncio.wait_for(PROVIDERS[provider](query, guild_id), timeout=deadline)
+    except asyncio.TimeoutError:
+        log.info("🔍 %s search missed its %ss deadline", provider, deadline)
+        provider_health.record(provider, False)
+        return None
+    except Exception as e:
+        log.warning("🔍 %s search failed: %s", provider, e)
+        provider_health.record(provider, False)
+        return None
+    provider_health.record(provider, True)
+    return result
+
+async def _race(query, providers, prefer, guild_id):
+    tasks = {asyncio.ensure_future(_run(provider, query, guild_id)): provider for provider in providers}
+    pending = set(tasks)
+    fallback = None
+
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if not _acceptable(result):
+                    continue
+                if tasks[task] == prefer or prefer not in [tasks[other] for other in pending]:
+                    return result
+                fallback = fallback or result
+
+            if fallback is not None:
+                # Give the preferred provider a short grace period, then settle
+                preferred = [task for task in pending if tasks[task] == prefer]
+                done, _ = await asyncio.wait(preferred, timeout=SEARCH_PREFERENCE_GRACE)
+                for task in done:
+                    if _acceptable(task.result()):
+                        return task.result()
+                return fallback
+        return fallback
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+async def hedged_search(query, providers=('spotify', 'youtube'), prefer=None, guild_id=None, fallbacks=()):
+    """Search all healthy providers at once and return the first acceptable result.
+
+    If `prefer` names a provider that is still running when another one
+    answers, it gets SEARCH_PREFERENCE_GRACE more seconds to win. Losing
+    searches are cancelled. Providers in `fallbacks` are only searched once
+    every one in `providers` has failed or missed its deadline (or is marked
+    down) - for callers that would rather wait for a directly playable
+    result than race a provider whose answer costs another lookup. Returns
+    None if every provider fails. A match in the guild's play history skips
+    the network.
+    """
+    local = await play_history.best_match(guild_id, query)
+    if local is not None:
+        return local
+
+    known = [provider for provider in providers if provider in PROVIDERS]
+    backups = [provider for provider in fallbacks if provider in PROVIDERS]
+    active = [provider for provider in known if provider_health.healthy(provider)]
+    if not active:
+        if any(provider_health.healthy(provider) for provider in backups):
+            return await _race(query, backups, prefer, guild_id)
+        # Everything is marked down - try anyway rather than fail outright
+        active = known + backups
+        backups = []
+
+    result = await _race(query, active, prefer, guild_id)
+    if result is None and backups:
+        result = await _race(query, backups, prefer, guild_id)
+    return result
@@ -0,0 +1,74 @@
+"""
+Startup pipeline - times each startup phase and warms heavy subsystems
+(yt-dlp, Spotify, Gemini) in the background once the bot is ready.
+"""
+import time
+import asyncio
+from contextlib import contextmanager
+from utils.logging_setup import get_logger
+
+log = get_logger('startup')
+
+PROCESS_START = time.perf_counter()
+
+class StartupTimer:
+    """Records (phase, seconds) pairs relative to process start"""
+
+    def __init__(self):
+        self.phases = []
+        self.marks = {}
+        self.background = {}  # name -> asyncio.Task for deferred phases
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def mark(self, name):
+        """Record a milestone (seconds since process start), first occurrence wins"""
+        self.marks.setdefault(name, time.perf_counter() - PROCESS_START)
+
+    def run_in_background(self, name, func):
+        """Run a blocking startup step in the executor without holding up the gateway connect"""
+        async def runner():
+            with self.phase(name):
+                await asyncio.get_running_loop().run_in_executor(None, func)
+        task = asyncio.get_running_loop().create_task(runner())
+        self.background[name] = task
+        return task
+
+    async def wait_for(self, name):
+        """Wait for a background startup step (returns immediately once it's done)"""
+        task = self.background.get(name)
+        if task is not None and not task.done():
+            await asyncio.shield(task)
+
+    def report(self):
+        lines = [f"  {name:<24} {seconds * 1000:8.1f} ms" for name, seconds in self.phases]
+        lines += [f"  @{name:<23} {seconds:8.2f} s" for name, seconds in self.marks.items()]
+        return "⏱️ Startup timings:\n" + "\n".join(lines)
+
+startup_timer = StartupTimer()
+
+def _warm_music():
+    from utils.music_sources import get_ytdl, get_spotify
+    get_ytdl()
+    get_spotify()
+
+def _warm_search():
+    from utils.helpers import get_gemini_model
+    get_gemini_model()
+
+async def warm_up():
+    """Load heavy subsystems after on_ready so first use doesn't pay for them"""
+    loop = asyncio.get_running_loop()
+    for name, func in (('warm_music', _warm_music), ('warm_search', _warm_search)):
+        with startup_timer.phase(name):
+            try:
+                await loop.run_in_executor(None, func)
+            except Exception as e:
+                log.warning("Warm-up step %s failed: %s", name, e)
+    log.info("%s", startup_timer.report())
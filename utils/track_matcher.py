@@ -0,0 +1,148 @@
+"""
+Spotify -> YouTube track matching.
+
+A Spotify track is matched once: several flat YouTube candidates are scored
+on duration, title/artist similarity and channel type, and the winner is
+stored in SQLite so every later play of that track skips searching.
+"""
+import re
+import asyncio
+from difflib import SequenceMatcher
+from utils.database import get_track_match, save_track_match, delete_track_match
+from utils.music_sources import YTDLSource
+from utils.extraction_pool import NOW_PLAYING, PREFETCH
+from utils.extraction_strategy import youtube_video_id, classify_error
+from utils.logging_setup import get_logger
+
+log = get_logger('music')
+
+MATCH_CANDIDATES = 5
+MIN_MATCH_SCORE = 0.45  # Below this the best candidate isn't stored, so it's retried next time
+
+# Words that mark a different version of a song, unless the Spotify title has them too
+VERSION_MARKERS = ('live', 'cover', 'karaoke', 'instrumental', 'remix', 'sped up',
+                   'slowed', 'nightcore', 'reverb', '8d', 'acoustic', 'lyrics video')
+
+_SPOTIFY_TRACK_RE = re.compile(r'open\.spotify\.com/(?:intl-\w+/)?track/([A-Za-z0-9]+)')
+
+def spotify_track_id(url):
+    """Extract the track ID from a Spotify track URL"""
+    match = _SPOTIFY_TRACK_RE.search(url or '')
+    return match.group(1) if match else None
+
+def _normalize(text):
+    text = re.sub(r'[\(\[].*?[\)\]]', ' ', (text or '').lower())  # Drop (Official Video) etc.
+    return re.sub(r'[^\w\s]', ' ', text).split()
+
+def score_candidate(candidate, title, artist, duration):
+    """Score a YouTube candidate against Spotify metadata (roughly 0..1)"""
+    video_title = candidate['title'].lower()
+    channel = candidate['channel'].lower()
+    # Spotify appends versions after " - " ("Song - Remastered 2011")
+    title_words = ' '.join(_normalize((title or '').split(' - ')[0]))
+    video_words = ' '.join(_normalize(candidate['title']))
+
+    # Duration: within a few seconds is a strong signal, past 30s almost never the same recording
+    if duration and candidate.get('duration'):
+        delta = abs(candidate['duration'] - duration)
+        duration_score = max(0.0, 1.0 - delta / 30.0)
+    else:
+        duration_score = 0.3
+    score = 0.4 * duration_score
+
+    # Title similarity, with full containment counting as a match
+    if title_words and title_words in video_words:
+        title_score = 1.0
+    else:
+        title_score = SequenceMatcher(None, title_words, video_words).ratio()
+    score += 0.35 * title_score
+
+    # Artist appears in the channel name or video title
+    artists = [name.strip().lower() for name in (artist or '').split(',') if name.strip()]
+    if artists and any(name in channel or name in video_title for name in artists):
+        score += 0.15
+
+    # Auto-generated "Artist - Topic" and VEVO channels carry the studio recording
+    if channel.endswith(' - topic') or 'vevo' in channel:
+        score += 0.1
+
+    spotify_title = (title or '').lower()
+    for marker in VERSION_MARKERS:
+        if marker in video_title and marker not in spotify_title:
+            score -= 0.2
+            break
+
+    return score
+
+def rank_candidates(candidates, title, artist, duration):
+    """Candidates sorted best first as (score, candidate) pairs"""
+    scored = [(score_candidate(candidate, title, artist, duration), candidate) for candidate in candidates]
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+    return scored
+
+async def match_spotify_track(spotify_id, title, artist, duration, *, guild_id=None, priority=NOW_PLAYING):
+    """Get the YouTube URL for a Spotify track, searching only on a cache miss"""
+    loop = asyncio.get_running_loop()
+    youtube_id = await loop.run_in_executor(None, get_track_match, spotify_id)
+    if youtube_id:
+        return f"https://www.youtube.com/watch?v={youtube_id}"
+
+    candidates = await YTDLSource.search_youtube_candidates(f"{title} {artist}", count=MATCH_CANDIDATES,
+                                                            guild_id=guild_id, priority=priority)
+    if not candidates:
+        return None
+
+    best_score, best = rank_candidates(candidates, title, artist, duration)[0]
+    if best_score >= MIN_MATCH_SCORE:
+        await loop.run_in_executor(None, save_track_match, spotify_id, best['id'], best_score,
+                                   best['title'], best.get('duration'))
+    return best['url']
+
+async def forget_spotify_match(spotify_id):
+    """Drop a stored match whose video failed to play so it's re-matched next time"""
+    await asyncio.get_running_loop().run_in_executor(None, delete_track_match, spotify_id)
+
+def is_gone_video_error(error):
+    """Whether an extraction error means the video itself is gone (removed or private).
+
+    Only then is a stored match wrong - voice, ffmpeg and transient yt-dlp
+    errors say nothing about the match.
+    """
+    return classify_error(error) in ('unavailable', 'private')
+
+async def resolve_audio_url(song_info, *, guild_id=None, priority=NOW_PLAYING):
+    """Resolve the YouTube URL to stream for a queued song.
+
+    Direct YouTube links are used as-is, Spotify tracks go through the match
+    table, and anything else falls back to a plain title/artist search.
+    A URL already found by prefetch_next is reused.
+    """
+    url = song_info.get('url', '')
+    if youtube_video_id(url):
+        return url
+    if song_info.get('resolved_url'):
+        return song_info['resolved_url']
+
+    spotify_id = song_info.get('spotify_id') or spotify_track_id(song_info.get('spotify_url') or url)
+    if spotify_id:
+        return await match_spotify_track(spotify_id, song_info['title'], song_info.get('uploader', ''),
+                                         song_info.get('duration_seconds'), guild_id=guild_id, priority=priority)
+
+    search_query = f"{song_info['title']} {song_info.get('uploader', '')}"
+    return await YTDLSource.search_youtube_for_audio(search_query, guild_id=guild_id, priority=priority)
+
+async def prefetch_next(song_info, guild_id):
+    """Resolve the next queued song's page URL ahead of time at prefetch priority.
+
+    Only the page URL is kept - stream URLs expire, so from_url still runs
+    when the song starts, but the search/match step is already done.
+    """
+    if song_info.get('resolved_url') or youtube_video_id(song_info.get('url', '')):
+        return
+    try:
+        resolved = await resolve_audio_url(song_info, guild_id=guild_id, priority=PREFETCH)
+    except Exception as e:
+        log.warning("Prefetch failed for %s: %s", song_info.get('title'), e)
+        return
+    if resolved:
+        song_info['resolved_url'] = resolved
@@ -0,0 +1,115 @@
+"""
+Ogg/Opus track store - cached tracks are kept pre-encoded at Discord's
+frame size (48 kHz stereo, 20 ms) so playback just hands Opus packets from a
+memory-mapped file to the voice client, without spawning ffmpeg or encoding.
+"""
+import os
+import mmap
+import audioop
+import subprocess
+import discord
+from discord.oggparse import OggStream
+from config.settings import OPUS_STORE_BITRATE, FFMPEG_OPTIONS
+from utils.logging_setup import get_logger
+
+log = get_logger('cache')
+
+# MusicPlayer's default volume is baked into stored tracks, so playback at the
+# default volume is pure passthrough
+STORE_GAIN = 0.5
+
+OPUS_EXTENSION = '.opus'
+
+def encode_opus(source_path, target_path, gain=STORE_GAIN):
+    """Transcode a downloaded track into the store format (blocking).
+
+    gain is baked into the stored audio - STORE_GAIN times the track's
+    loudness normalization factor. Writes to a temporary name and renames
+    it into place, so a crash never leaves a truncated track behind.
+    Returns False if ffmpeg isn't usable.
+    """
+    partial_path = target_path + '.part'
+    command = [
+        FFMPEG_OPTIONS.get('executable', 'ffmpeg'), '-nostdin', '-loglevel', 'error', '-y',
+        '-i', source_path, '-vn', '-map_metadata', '-1',
+        '-af', f"volume={gain:.4f}",
+        '-c:a', 'libopus', '-b:a', f"{OPUS_STORE_BITRATE}k", '-vbr', 'on',
+        '-ar', '48000', '-ac', '2', '-frame_duration', '20', '-application', 'audio',
+        '-f', 'ogg', partial_path,
+    ]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+        os.replace(partial_path, target_path)
+        return True
+    except (subprocess.CalledProcessError, FileNotFoundError) as e:
+        stderr = getattr(e, 'stderr', b'') or b''
+        log.warning("Opus transcode failed for %s: %s %s", source_path, e, stderr.decode(errors='ignore')[-200:])
+        try:
+            os.remove(partial_path)
+        except FileNotFoundError:
+            pass
+        return False
+
+class OpusTrackSource(discord.AudioSource):
+    """Plays a stored Ogg/Opus track straight from a memory-mapped file.
+
+    Mirrors YTDLSource's attributes (data, title, url, duration, volume) so
+    the player and views can treat both the same. At the default volume
+    packets pass through untouched; any other volume decodes, scales and
+    re-encodes frames inside the source, which keeps is_opus() constant for
+    the whole track (the voice client only sets up an encoder for non-Opus
+    sources at play time).
+    """
+
+    def __init__(self, path, *, data, volume=STORE_GAIN):
+        self.data = data
+        self.title = data.get('title')
+        self.url = data.get('url')
+        self.duration = data.get('duration')
+        self.thumbnail = data.get('thumbnail')
+        self.volume = volume
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._packets = OggStream(self._map).iter_packets()
+        self._decoder = None
+        self._encoder = None
+
+    @property
+    def volume(self):
+        return self._volume
+
+    @volume.setter
+    def volume(self, value):
+        self._volume = max(value, 0.0)
+
+    def is_opus(self):
+        return True
+
+    def _next_packet(self):
+        for packet in self._packets:
+            # Skip the OpusHead/OpusTags header packets
+            if packet.startswith((b'OpusHead', b'OpusTags')):
+                continue
+            return packet
+        return b''
+
+    def read(self):
+        packet = self._next_packet()
+        if not packet or abs(self._volume - STORE_GAIN) < 1e-3:
+            return packet
+
+        if self._decoder is None:
+            self._decoder = discord.opus.Decoder()
+            self._encoder = discord.opus.Encoder()
+        pcm = self._decoder.decode(packet, fec=False)
+        pcm = audioop.mul(pcm, 2, min(self._volume, 2.0) / STORE_GAIN)
+        return self._encoder.encode(pcm, self._encoder.SAMPLES_PER_FRAME)
+
+    def cleanup(self):
+        self._packets = iter(())
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
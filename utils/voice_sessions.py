@@ -0,0 +1,124 @@
+"""
+Voice session lifecycle - pauses playback when everyone leaves the bot's
+channel, disconnects sessions that stay empty or idle past their grace
+period, and frees the guild's music state when they go.
+"""
+import time
+from config.settings import VOICE_ALONE_GRACE_SECONDS, VOICE_IDLE_GRACE_SECONDS, VOICE_PAUSED_GRACE_SECONDS
+from utils.logging_setup import get_logger
+
+log = get_logger('voice')
+
+class VoiceSessionManager:
+    """Tracks when each voice session became empty or idle"""
+
+    def __init__(self, player):
+        self.player = player
+        self.alone_since = {}  # guild_id -> when the last listener left
+        self.idle_since = {}  # guild_id -> when playback stopped or was paused
+        self.auto_paused = set()  # Guilds we paused ourselves because the channel emptied
+        self.reaped = 0
+
+    def _listeners(self, voice_client):
+        channel = voice_client.channel
+        return [member for member in getattr(channel, 'members', []) if not member.bot]
+
+    async def on_voice_state_update(self, member, before, after):
+        guild_id = member.guild.id
+        voice_client = self.player.voice_clients.get(guild_id)
+
+        if member.id == self.player.bot.user.id:
+            if after.channel is None and voice_client is not None:
+                # Kicked or disconnected from outside the bot
+                await self.player.disconnect(guild_id, reason='disconnected externally')
+            return
+
+        if voice_client is None or voice_client.channel is None:
+            return
+        if voice_client.channel not in (before.channel, after.channel):
+            return
+
+        if self._listeners(voice_client):
+            self.alone_since.pop(guild_id, None)
+            if guild_id in self.auto_paused:
+                self.auto_paused.discard(guild_id)
+                if voice_client.is_paused():
+                    self.player.resume(guild_id)
+                    self.idle_since.pop(guild_id, None)
+                    log.info("▶️ Listener back in %s, resumed playback", voice_client.channel)
+        elif guild_id not in self.alone_since:
+            self.alone_since[guild_id] = time.monotonic()
+            if voice_client.is_playing():
+                self.player.pause(guild_id)
+                self.auto_paused.add(guild_id)
+                log.info("⏸️ %s is empty, paused playback", voice_client.channel)
+
+    def forget(self, guild_id):
+        self.alone_since.pop(guild_id, None)
+        self.idle_since.pop(guild_id, None)
+        self.auto_paused.discard(guild_id)
+
+    async def reap(self):
+        """Disconnect sessions past their grace period; returns how many were closed"""
+        now = time.monotonic()
+        closed = 0
+        for guild_id, voice_client in list(self.player.voice_clients.items()):
+            if not voice_client.is_connected():
+                await self.player.disconnect(guild_id, reason='connection lost')
+                closed += 1
+                continue
+
+            if voice_client.is_playing():
+                self.idle_since.pop(guild_id, None)
+            elif voice_client.is_paused() or not self.player.queues.get(guild_id):
+                self.idle_since.setdefault(guild_id, now)
+            else:
+                self.idle_since.pop(guild_id, None)  # Between songs, the next one is loading
+
+            alone_for = now - self.alone_since[guild_id] if guild_id in self.alone_since else 0
+            idle_for = now - self.idle_since.get(guild_id, now)
+            grace = VOICE_PAUSED_GRACE_SECONDS if voice_client.is_paused() else VOICE_IDLE_GRACE_SECONDS
+
+            if alone_for >= VOICE_ALONE_GRACE_SECONDS:
+                await self.player.disconnect(guild_id, reason=f"channel empty for {alone_for:.0f}s")
+            elif idle_for >= grace:
+                await self.player.disconnect(guild_id, reason=f"idle for {idle_for:.0f}s")
+            else:
+                continue
+            closed += 1
+        self.reaped += closed
+        return closed
+
+    def report(self):
+        """Live resource counts for the music subsystem"""
+        player = self.player
+        sessions = list(player.voice_clients.values())
+        ffmpeg_processes = 0
+        opus_sources = 0
+        for voice_client in sessions:
+            source = voice_client.source
+            original = getattr(source, 'original', source)
+            process = getattr(original, '_process', None)
+            if process is not None and process.poll() is None:
+                ffmpeg_processes += 1
+            elif source is not None and source.is_opus():
+                opus_sources += 1
+        return {
+            'sessions': len(sessions),
+            'playing': sum(1 for voice_client in sessions if voice_client.is_playing()),
+            'paused': sum(1 for voice_client in sessions if voice_client.is_paused()),
+            'alone': len(self.alone_since),
+            'idle': len(self.idle_since),
+            'ffmpeg_processes': ffmpeg_processes,
+            'opus_sources': opus_sources,
+            'queued_songs': sum(len(queue) for queue in player.queues.values()),
+            'state_entries': {
+                'queues': len(player.queues),
+                'current_songs': len(player.current_songs),
+                'volumes': len(player.volumes),
+                'loop_modes': len(player.loop_modes),
+                'music_cards': len(player.music_cards),
+                'progress_clocks': len(player.progress.clocks),
+            },
+            'reaped': self.reaped,
+        }